@@ -20,7 +20,7 @@ import {
 //     2. paket yang dilapor berasal dari node ini (item_transits.source_node_id = node_id)
 //   - Jika node_id tidak diberikan: tampilkan semua reports (untuk super admin)
 export async function GET(request: NextRequest) {
-  return handleApiError(async () => {
+  return handleApiError(async (timing) => {
     const { searchParams } = new URL(request.url);
     const paginationParams = getPaginationParams(searchParams);
     const page = paginationParams.page || 1;
@@ -80,7 +80,7 @@ export async function GET(request: NextRequest) {
       query = query.order('created_at', { ascending: false });
     }
 
-    const { data, error, count } = await query;
+    const { data, error, count } = await timing.measure('db', () => query);
 
     if (error) {
       console.error('Reports fetch error:', error);
@@ -88,7 +88,7 @@ export async function GET(request: NextRequest) {
     }
 
     // Transform dan filter data
-    let formattedReports = (data || []).map((report: any) => ({
+    let formattedReports = await timing.measure('transform', () => (data || []).map((report: any) => ({
       id: report.id,
       type: report.type,
       status: report.status,
@@ -117,7 +117,7 @@ export async function GET(request: NextRequest) {
           item_type: report.item_transits.item_instances.item_types?.item_type || null
         } : null
       } : null
-    }));
+    })));
 
     // Filter jika node_id diberikan
     if (nodeIdFilter) {
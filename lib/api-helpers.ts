@@ -156,19 +156,82 @@ export const ITEM_TRANSIT_FIELD_MAPPING = {
 //   'qr_url': 'qr_url',
 // }
 
+// Server-Timing Helpers
+// Routes report where their time goes in a Server-Timing response header, which the testing
+// harness parses into per-sample columns (testing/server_timing.py). The header exposes internal
+// timings to any client, so it is only sent when the server runs with SERVER_TIMING=1 (e.g.
+// `SERVER_TIMING=1 npx next start -p 3001` for a test run). Metric names:
+//   app       - the whole route handler (added by handleApiError)
+//   db        - Supabase queries
+//   transform - shaping database rows into the API response
+//   mw        - the updateSession middleware (added in middleware.ts)
+export const SERVER_TIMING_ENABLED = process.env.SERVER_TIMING === '1';
+
+export class ServerTiming {
+  private entries: { name: string; duration: number; description?: string }[] = [];
+
+  add(name: string, duration: number, description?: string) {
+    this.entries.push({ name, duration, description });
+  }
+
+  async measure<T>(name: string, operation: () => PromiseLike<T> | T, description?: string): Promise<Awaited<T>> {
+    const start = performance.now();
+    try {
+      return await operation();
+    } finally {
+      this.add(name, performance.now() - start, description);
+    }
+  }
+
+  toHeader(): string {
+    return this.entries
+      .map(({ name, duration, description }) =>
+        `${name};dur=${duration.toFixed(1)}${description ? `;desc="${escapeQuoted(description)}"` : ''}`)
+      .join(', ');
+  }
+}
+
+// A quoted-string parameter value: backslash and double quote are escaped (RFC 9110)
+function escapeQuoted(value: string): string {
+  return value.replace(/[\\"]/g, '\\$&');
+}
+
+export function appendServerTiming<R extends Response>(response: R, timing: ServerTiming): R {
+  if (!SERVER_TIMING_ENABLED) {
+    return response;
+  }
+  const header = timing.toHeader();
+  if (header) {
+    response.headers.append('Server-Timing', header);
+  }
+  return response;
+}
+
 // Error handling wrapper
+// The operation receives a ServerTiming to record its phases; the total handler time is
+// added as 'app' and the header is attached to the returned response.
 export async function handleApiError<T>(
-  operation: () => Promise<T>
+  operation: (timing: ServerTiming) => Promise<T>
 ): Promise<T | NextResponse> {
+  const timing = new ServerTiming();
+  const start = performance.now();
+  let result: T | NextResponse;
+
   try {
-    return await operation();
+    result = await operation(timing);
   } catch (error) {
     console.error('API Error:', error);
     
     if (error instanceof Error) {
-      return createErrorResponse(error.message, 500);
+      result = createErrorResponse(error.message, 500);
+    } else {
+      result = createErrorResponse('An unexpected error occurred', 500);
     }
-    
-    return createErrorResponse('An unexpected error occurred', 500);
   }
-}
\ No newline at end of file
+
+  timing.add('app', performance.now() - start);
+  if (result instanceof Response) {
+    appendServerTiming(result, timing);
+  }
+  return result;
+}
@@ -2,7 +2,13 @@ import { type NextRequest } from "next/server";
 import { updateSession } from "@/utils/supabase/middleware";
 
 export async function middleware(request: NextRequest) {
-  return await updateSession(request);
+  const start = performance.now();
+  const response = await updateSession(request);
+  // Reported next to the route's own Server-Timing metrics, only with SERVER_TIMING=1 (see lib/api-helpers.ts)
+  if (process.env.SERVER_TIMING === '1') {
+    response.headers.append('Server-Timing', `mw;dur=${(performance.now() - start).toFixed(1)};desc="updateSession"`);
+  }
+  return response;
 }
 
 export const config = {
@@ -0,0 +1,116 @@
+"""
+Adaptive Sampling
+Keeps sampling each test until its median and p95 are known precisely enough, instead of a fixed count
+
+A fixed NUM_ITERATIONS spends the same number of samples on every test: a stable endpoint is
+measured long after its percentiles stopped moving, while a noisy one (Generate QR) ends with a
+wide, unreliable estimate. AdaptiveSampler decides per test, after every round:
+
+- fewer than min_samples successful samples: keep sampling
+- bootstrap confidence interval of every tracked percentile no wider than target_width times the
+  percentile itself (e.g. 0.20 = the p95 is known to within about ±10%): converged, stop
+- max_samples attempts (failed ones included): stop at the budget, reported as not converged
+
+The intervals are bootstrapped the same way as in compare_runs.py, so a converged run is also a
+good input for the regression gate. Tail percentiles need more samples than the median to
+converge, which is exactly where the sampling time should go.
+"""
+
+import numpy as np
+
+# Configuration
+ADAPTIVE_PERCENTILES = (50, 95)  # Percentiles whose confidence interval must converge
+ADAPTIVE_TARGET_WIDTH = 0.20  # Largest CI width relative to the percentile (0.20 = ±10%)
+ADAPTIVE_MIN_SAMPLES = 20  # Successful samples before convergence is checked (a p95 of fewer is ~the max)
+ADAPTIVE_MAX_SAMPLES = 100  # Attempts per test before sampling stops regardless
+BOOTSTRAP_RESAMPLES = 2000  # Resamples per convergence check
+CONFIDENCE_LEVEL = 0.95
+BOOTSTRAP_SEED = 1234
+
+
+def bootstrap_intervals(samples, percentiles, rng, resamples=BOOTSTRAP_RESAMPLES, confidence=CONFIDENCE_LEVEL):
+    """Point estimate and bootstrap CI of each percentile: {percentile: (estimate, low, high)}"""
+    samples = np.asarray(samples, dtype=float)
+    resampled = np.percentile(rng.choice(samples, size=(resamples, len(samples))), percentiles, axis=1)
+    tail = (1 - confidence) / 2 * 100
+    bounds = np.percentile(resampled, [tail, 100 - tail], axis=1)
+    estimates = np.percentile(samples, percentiles)
+    return {p: (estimates[i], bounds[0][i], bounds[1][i]) for i, p in enumerate(percentiles)}
+
+
+class AdaptiveSampler:
+    """Tracks the samples of every test and decides which tests still need another round"""
+
+    def __init__(self, target_width=ADAPTIVE_TARGET_WIDTH, min_samples=ADAPTIVE_MIN_SAMPLES,
+                 max_samples=ADAPTIVE_MAX_SAMPLES, percentiles=ADAPTIVE_PERCENTILES):
+        if min_samples < 2 or max_samples < min_samples:
+            raise ValueError("Adaptive sampling needs 2 <= min_samples <= max_samples")
+        self.target_width = target_width
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.percentiles = tuple(percentiles)
+        self.samples = {}  # test -> successful latencies (ms)
+        self.attempts = {}  # test -> samples taken, failures included
+        self.widths = {}  # test -> {percentile: relative CI width} at the last check
+        self.stopped = {}  # test -> "converged" or "budget"
+        self.rng = np.random.default_rng(BOOTSTRAP_SEED)
+
+    def record(self, test, latency_ms):
+        """Count one sample of a test; negative latencies are failed samples"""
+        self.attempts[test] = self.attempts.get(test, 0) + 1
+        if latency_ms >= 0:
+            self.samples.setdefault(test, []).append(latency_ms)
+
+    def _check(self, test):
+        samples = self.samples.get(test, [])
+        if len(samples) >= self.min_samples:
+            intervals = bootstrap_intervals(samples, self.percentiles, self.rng)
+            self.widths[test] = {p: (high - low) / estimate if estimate > 0 else float("inf")
+                                 for p, (estimate, low, high) in intervals.items()}
+            if max(self.widths[test].values()) <= self.target_width:
+                return "converged"
+        if self.attempts.get(test, 0) >= self.max_samples:
+            return "budget"
+        return None
+
+    def active(self, tests):
+        """The tests that need another sample; the others are stopped for the rest of the run"""
+        remaining = []
+        for test in tests:
+            if test not in self.stopped:
+                outcome = self._check(test)
+                if outcome:
+                    self.stopped[test] = outcome
+                else:
+                    remaining.append(test)
+        return remaining
+
+    def print_summary(self, fixed_samples=None):
+        """Print the samples spent per test and how precisely its percentiles are known
+
+        fixed_samples is the per-test count of a fixed-iteration run, to show what was saved.
+        """
+        tests = list(self.attempts)
+        if not tests:
+            return
+        columns = " ".join(f"{f'p{p} CI ±%':<10}" for p in self.percentiles)
+        print("\n" + "=" * 96)
+        print(f"ADAPTIVE SAMPLING (target CI width {self.target_width * 100:.0f}% of the percentile, "
+              f"{self.min_samples}-{self.max_samples} samples per test)")
+        print("=" * 96)
+        print(f"{'Test':<44} {'Samples':<8} {columns} {'Result':<10}")
+        print("-" * 96)
+        for test in sorted(tests, key=lambda t: -self.attempts[t]):
+            widths = self.widths.get(test, {})
+            shown = " ".join(f"{widths[p] * 50:<10.1f}" if p in widths else f"{'-':<10}" for p in self.percentiles)
+            label = f"{test[0]}: {test[1]}" if isinstance(test, tuple) else str(test)
+            print(f"{label[:43]:<44} {self.attempts[test]:<8} {shown} {self.stopped.get(test, 'running'):<10}")
+
+        total = sum(self.attempts.values())
+        converged = sum(outcome == "converged" for outcome in self.stopped.values())
+        print(f"\n  {converged}/{len(tests)} tests converged, {total} samples taken", end="")
+        if fixed_samples:
+            fixed = fixed_samples * len(tests)
+            print(f" ({total / fixed * 100:.0f}% of the {fixed} a fixed {fixed_samples}-iteration run takes)")
+        else:
+            print()
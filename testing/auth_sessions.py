@@ -0,0 +1,229 @@
+"""
+Login-Once Session Manager
+Logs in once per role and reuses the session for API calls and browser page visits
+
+The protected pages are guarded on the client: RouteGuard reads the `userData` and `isSuperAdmin`
+entries the login flow leaves in localStorage, and the page's data requests are authenticated by
+the Supabase auth cookies. A fresh browser context has neither, so without a session every
+/super-admin and /node-admin visit only measures the "Checking authentication..." shell before
+the redirect to /login.
+
+SessionManager posts /api/login once per role and builds from the response:
+
+- the cookie jar (Supabase sb-*-auth-token cookies), for requests sessions
+- a Playwright storage_state (the same cookies plus the localStorage entries), for browser contexts
+
+Both are cached in AUTH_STATE_DIR, so later runs start without logging in either. A session is
+reused until it expires (the earliest cookie expiry or the access token's expires_at, minus
+REFRESH_MARGIN) and only then logged in again. The cache files hold live tokens: they are
+gitignored and should not be shared.
+"""
+
+import base64
+import binascii
+import json
+import os
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+
+from http_timing import TimedSession
+
+# Configuration
+ROLE_CREDENTIALS = {
+    "admin_pusat": {"email": "admin.pusat@despro.com", "password": "admin123"},
+    "admin_node": {"email": "admin.node@despro.com", "password": "admin123"},
+}
+AUTH_STATE_DIR = os.path.join("results", ".auth")  # Cached sessions, one JSON file per role
+REFRESH_MARGIN = 60  # Seconds before expiry at which a cached session is renewed
+DEFAULT_SESSION_TTL = 3600  # Assumed lifetime when neither the cookies nor the token carry an expiry
+LOGIN_TIMEOUT = 10
+TOKEN_REFRESH_MARGIN = 90  # supabase-js refreshes sessions expiring within this many seconds
+
+# The matcher of middleware.ts: the paths updateSession runs on (all but static files, image
+# optimization, the favicon and images)
+MIDDLEWARE_MATCHER = re.compile(r"^/(?!_next/static|_next/image|favicon.ico|.*\.(?:svg|png|jpg|jpeg|gif|webp)$).*")
+
+_AUTH_COOKIE = re.compile(r"^sb-.+-auth-token(?:\.(\d+))?$")
+_EXPIRES_AT = re.compile(r'("expires_at"\s*:\s*)\d+')
+
+
+def _b64decode(value):
+    """Decode the unpadded base64url body of a "base64-" cookie value"""
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)).decode("utf-8", "replace")
+
+
+def _auth_session(cookies):
+    """The Supabase session stored in the (possibly chunked) auth cookie, if readable"""
+    chunks = sorted((int(match.group(1) or 0), cookie["value"]) for cookie in cookies
+                    if (match := _AUTH_COOKIE.match(cookie["name"])))
+    value = "".join(chunk for _, chunk in chunks)
+    try:
+        if value.startswith("base64-"):
+            value = _b64decode(value[len("base64-"):])
+        session = json.loads(value)
+    except (ValueError, binascii.Error):  # Truncated or malformed cookie
+        return None
+    return session if isinstance(session, dict) else None
+
+
+def _token_expires_at(cookies):
+    """expires_at of the Supabase session stored in the auth cookie, if readable"""
+    session = _auth_session(cookies)
+    return session.get("expires_at") if session else None
+
+
+def with_token_expiry(cookies, expires_at):
+    """The auth cookie chunks as {name: value}, with the session's expires_at set to the given time
+
+    The session JSON is edited in place, so the value keeps its length and is split over the
+    same chunks (sb-*-auth-token.0, .1, ...) the server wrote. Empty when there is no readable
+    auth cookie.
+    """
+    chunks = sorted((int(match.group(1) or 0), cookie["name"], cookie["value"]) for cookie in cookies
+                    if (match := _AUTH_COOKIE.match(cookie["name"])))
+    value = "".join(chunk for _, _, chunk in chunks)
+    encoded = value.startswith("base64-")
+    if encoded:
+        try:
+            value = _b64decode(value[len("base64-"):])
+        except (ValueError, binascii.Error):  # Truncated or malformed cookie
+            return {}
+    value, replaced = _EXPIRES_AT.subn(rf"\g<1>{int(expires_at)}", value, count=1)
+    if not replaced:
+        return {}
+    if encoded:
+        value = "base64-" + base64.urlsafe_b64encode(value.encode("utf-8")).decode("ascii").rstrip("=")
+    rewritten = {}
+    for index, (_, name, chunk) in enumerate(chunks):
+        last = index == len(chunks) - 1
+        rewritten[name], value = (value, "") if last else (value[:len(chunk)], value[len(chunk):])
+    return rewritten
+
+
+def session_role(cookies, credentials=None):
+    """Role whose account the auth cookie belongs to (by email), or None"""
+    session = _auth_session(cookies)
+    email = (session.get("user") or {}).get("email") if session else None
+    for role, account in (credentials or ROLE_CREDENTIALS).items():
+        if email and account["email"] == email:
+            return role
+    return None
+
+
+def session_expires_at(cookies, now=None):
+    """When a logged-in session stops being usable (epoch seconds)"""
+    now = now or time.time()
+    candidates = [cookie["expires"] for cookie in cookies if cookie.get("expires", -1) > 0]
+    token_expiry = _token_expires_at(cookies)
+    if token_expiry:
+        candidates.append(token_expiry)
+    return min(candidates) if candidates else now + DEFAULT_SESSION_TTL
+
+
+class SessionManager:
+    """Logs in once per role and hands out its cookies and Playwright storage state"""
+
+    def __init__(self, base_url, credentials=None, state_dir=AUTH_STATE_DIR, persist=True):
+        self.base_url = base_url.rstrip("/")
+        self.credentials = credentials or ROLE_CREDENTIALS
+        self.state_dir = state_dir
+        self.persist = persist
+        self.logins = 0  # Logins actually performed (cache misses and expiries)
+        self._sessions = {}  # role -> {"expires_at", "cookies", "storage_state"}
+        self._lock = threading.Lock()  # Browser contexts ask for states from worker threads
+
+    def _state_path(self, role):
+        host = urlparse(self.base_url).netloc.replace(":", "_")
+        return os.path.join(self.state_dir, f"{role}_{host}.json")
+
+    def _valid(self, session):
+        return session is not None and session["expires_at"] - REFRESH_MARGIN > time.time()
+
+    def get(self, role):
+        """The cached session of a role, logging in first if it is missing or about to expire"""
+        with self._lock:
+            session = self._sessions.get(role)
+            if not self._valid(session) and self.persist:
+                session = self._load(role)
+            if not self._valid(session):
+                session = self._login(role)
+            self._sessions[role] = session
+            return session
+
+    def _load(self, role):
+        """The session cached on disk by an earlier run (or another worker), if any"""
+        try:
+            with open(self._state_path(role), encoding="utf-8") as f:
+                session = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return session if session.get("base_url") == self.base_url else None
+
+    def invalidate(self, role):
+        """Forget a session the server no longer accepts, so the next get() logs in again"""
+        with self._lock:
+            self._sessions.pop(role, None)
+            if self.persist and os.path.exists(self._state_path(role)):
+                os.remove(self._state_path(role))
+
+    def _login(self, role):
+        if role not in self.credentials:
+            raise ValueError(f"No credentials for role '{role}', expected one of {list(self.credentials)}")
+        with requests.Session() as session:
+            response = session.post(f"{self.base_url}/api/login", json=self.credentials[role], timeout=LOGIN_TIMEOUT)
+            if response.status_code != 200:
+                raise RuntimeError(f"Login as {role} failed with status {response.status_code}")
+            data = response.json()["data"]
+            jar = session.cookies
+        self.logins += 1
+
+        host = urlparse(self.base_url).hostname
+        cookies = [{
+            "name": cookie.name,
+            "value": cookie.value,
+            # Host-only cookies are stored by requests as "<host>.local"; Playwright wants the host
+            "domain": cookie.domain if cookie.domain_specified else host,
+            "path": cookie.path or "/",
+            "expires": cookie.expires if cookie.expires else -1,
+            "httpOnly": bool(cookie.has_nonstandard_attr("HttpOnly")),
+            "secure": bool(cookie.secure),
+            "sameSite": "Lax",
+        } for cookie in jar]
+        # The entries useAuth().login() writes after a successful login (lib/useAuth.ts)
+        local_storage = [
+            {"name": "userData", "value": json.dumps({"user": data["user"], "node": data["node"]})},
+            {"name": "isSuperAdmin", "value": json.dumps(data["isSuperAdmin"])},
+        ]
+        state = {
+            "role": role,
+            "base_url": self.base_url,
+            "expires_at": session_expires_at(cookies),
+            "cookies": cookies,
+            "storage_state": {"cookies": cookies, "origins": [{"origin": self.base_url, "localStorage": local_storage}]},
+        }
+        if self.persist:
+            # Written to a temporary file first: parallel workers may be reading the cache
+            os.makedirs(self.state_dir, exist_ok=True)
+            temp_path = f"{self._state_path(role)}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(temp_path, self._state_path(role))
+        return state
+
+    def storage_state(self, role):
+        """Playwright storage_state for browser.new_context(storage_state=...)"""
+        return self.get(role)["storage_state"]
+
+    def expires_at(self, role):
+        return self.get(role)["expires_at"]
+
+    def requests_session(self, role, session=None):
+        """A TimedSession (or the given requests session) carrying the role's cookies"""
+        session = session or TimedSession()
+        for cookie in self.get(role)["cookies"]:
+            session.cookies.set(cookie["name"], cookie["value"], path=cookie["path"])
+        return session
@@ -0,0 +1,150 @@
+"""
+Reusable Chromium Browser Pool
+Keeps one Chromium process alive and hands out isolated browser contexts for page measurements
+
+Launching Chromium costs far more than loading one of our pages, so the pool starts the browser
+once per run and spreads measurements across a configurable number of contexts in parallel.
+
+Context modes:
+- cold: every measurement gets a brand new BrowserContext (empty cache, no cookies), closed afterwards
+- warm: a fixed set of contexts is reused, so the HTTP cache and cookies persist between visits
+
+With a SessionManager (auth_sessions.py) pages can be borrowed for a role: the context starts
+from that role's cached storage_state, so protected pages are measured logged in without going
+through the login form. Warm contexts are kept per role and recreated once their session expires.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from playwright.async_api import async_playwright
+
+from auth_sessions import REFRESH_MARGIN
+
+# Configuration
+BROWSER_POOL_SIZE = 4  # Browser contexts measuring pages in parallel (1 = sequential)
+CONTEXT_MODES = ("cold", "warm")
+
+
+class BrowserPool:
+    def __init__(self, size=BROWSER_POOL_SIZE, mode="warm", headless=True, sessions=None):
+        if mode not in CONTEXT_MODES:
+            raise ValueError(f"Unknown context mode '{mode}', expected one of {CONTEXT_MODES}")
+        self.size = size
+        self.mode = mode
+        self.headless = headless
+        self.sessions = sessions  # SessionManager for role-authenticated contexts
+        self._playwright = None
+        self.browser = None
+        self._contexts = {}  # context -> (role, session expiry or None)
+        self._idle = {}  # role -> queue of idle warm contexts, created on first use
+        self._slots = None
+
+    async def __aenter__(self):
+        self._playwright = await async_playwright().start()
+        self.browser = await self._playwright.chromium.launch(headless=self.headless)
+        self._slots = asyncio.Semaphore(self.size)
+        if self.mode == "warm":
+            await self._fill(None)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        for context in self._contexts:
+            await context.close()
+        self._contexts = {}
+        if self.browser:
+            await self.browser.close()
+        if self._playwright:
+            await self._playwright.stop()
+
+    async def _new_context(self, role):
+        """A context logged in as role (anonymous for None), with one open page"""
+        if role is None:
+            context, expires_at = await self.browser.new_context(), None
+        else:
+            if self.sessions is None:
+                raise ValueError(f"Page for role '{role}' requested but the pool has no SessionManager")
+            # The first request for a role may log in, which blocks; keep it off the event loop
+            session = await asyncio.to_thread(self.sessions.get, role)
+            context = await self.browser.new_context(storage_state=session["storage_state"])
+            expires_at = session["expires_at"]
+        await context.new_page()
+        self._contexts[context] = (role, expires_at)
+        return context
+
+    async def _fill(self, role):
+        """Create the warm contexts of a role the first time it is used"""
+        if role not in self._idle:
+            self._idle[role] = asyncio.Queue()
+            for context in await asyncio.gather(*(self._new_context(role) for _ in range(self.size))):
+                self._idle[role].put_nowait(context)
+        return self._idle[role]
+
+    async def _fresh(self, context):
+        """The context itself, or a replacement when its session is about to expire"""
+        role, expires_at = self._contexts[context]
+        if expires_at is None or expires_at - REFRESH_MARGIN > time.time():
+            return context
+        del self._contexts[context]
+        await context.close()
+        return await self._new_context(role)
+
+    @asynccontextmanager
+    async def page(self, role=None):
+        """Borrow a page from the pool for one measurement, logged in as role when given"""
+        async with self._slots:
+            if self.mode == "cold":
+                context = await self._new_context(role)
+                try:
+                    yield context.pages[0]
+                finally:
+                    del self._contexts[context]
+                    await context.close()
+            else:
+                idle = await self._fill(role)
+                context = await self._fresh(await idle.get())
+                try:
+                    yield context.pages[0]
+                finally:
+                    idle.put_nowait(context)
+
+    async def warm_up(self, urls, timeout_ms=10000, visit=None):
+        """Visit every URL once in every warm context so measured visits hit a primed cache
+
+        urls are plain URLs (anonymous) or (url, role) pairs, visited in the contexts of that role.
+        visit(page, url) replaces the plain page.goto, e.g. to record what the first visit loads.
+        """
+        if self.mode != "warm":
+            return
+        by_role = {}
+        for entry in urls:
+            url, role = (entry, None) if isinstance(entry, str) else entry
+            by_role.setdefault(role, []).append(url)
+
+        async def visit_all(context, role_urls):
+            for url in role_urls:
+                try:
+                    if visit:
+                        await visit(context.pages[0], url)
+                    else:
+                        await context.pages[0].goto(url, wait_until="load", timeout=timeout_ms)
+                except Exception:
+                    pass  # Warm-up failures surface again in the measured visit
+
+        for role in by_role:
+            await self._fill(role)
+        await asyncio.gather(*(visit_all(context, by_role[role]) for context, (role, _) in list(self._contexts.items())
+                               if role in by_role))
+
+    async def map(self, func, items, role=None):
+        """Run func(page, item) for every item, spread across the pool in parallel
+
+        role is None for anonymous pages, a role name, or a callable giving the role of an item.
+        """
+
+        async def run(item):
+            async with self.page(role(item) if callable(role) else role) as page:
+                return await func(page, item)
+
+        return await asyncio.gather(*(run(item) for item in items))
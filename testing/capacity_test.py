@@ -0,0 +1,283 @@
+"""
+Capacity Finder
+Ramps concurrency or arrival rate in stages until p95 latency or the error rate breaks an SLO
+
+The sequential tester measures an idle server and load_test.py measures one load level; neither
+says how many concurrent node admins and couriers one instance can serve. This script runs the
+load models of load_test.py as a step ramp:
+
+1. each stage holds one load level (virtual users or requests per second) and is cut into
+   WINDOW_SECONDS windows; it ends once the last STEADY_WINDOWS windows agree on throughput and
+   p95 within STEADY_TOLERANCE (steady state), or after STAGE_MAX_SECONDS
+2. the stage is measured over those last windows only, so ramp-up transients are excluded
+3. the ramp stops at the first stage whose p95 exceeds --slo-p95 or whose error rate exceeds
+   --slo-errors, or at --max
+
+The report has throughput vs latency per stage, the maximum sustainable throughput (the best stage
+that still met the SLO) and the knee of the latency curve: the stage where p95 starts to grow faster
+than the load (largest distance below the chord of the normalized load/p95 curve, as in Kneedle).
+
+    python capacity_test.py --mode users --start 5 --factor 1.5 --slo-p95 1000
+    python capacity_test.py --mode rate --start 10 --step 10 --mix "Nodes API=3,Reports API=1"
+"""
+
+import argparse
+import asyncio
+import csv
+import os
+import statistics
+import time
+from datetime import datetime
+
+import aiohttp
+
+from auth_sessions import ROLE_CREDENTIALS
+from latency_histogram import HistogramRecorder
+from load_test import BASE_URL, LOAD_ENDPOINTS, REQUEST_TIMEOUT, RESULTS_DIR, LoadTester
+from scenario import weighted_sequence
+
+# Configuration
+START_LOAD = 5  # Virtual users or requests per second of the first stage
+LOAD_FACTOR = 1.5  # Each stage multiplies the load by this (unless --step is given)
+MAX_LOAD = 500  # Highest load level tried
+SLO_P95_MS = 1000  # p95 latency the service must stay under
+SLO_ERROR_PCT = 1.0  # Error rate (%) the service must stay under
+WINDOW_SECONDS = 5  # Length of each measurement window within a stage
+STEADY_WINDOWS = 3  # Consecutive windows that must agree for steady state; also the measured span
+STEADY_TOLERANCE = 0.15  # Largest coefficient of variation of throughput and p95 across those windows
+STAGE_MAX_SECONDS = 60  # A stage that never settles is measured over its last windows after this long
+
+
+def weighted_endpoints(mix, endpoints=LOAD_ENDPOINTS):
+    """Endpoint sequence with each endpoint appearing as often as its weight, evenly interleaved
+
+    mix is "Name=weight,Name=weight"; endpoints that are not mentioned are left out. Uses smooth
+    weighted round-robin, so a 3:1 mix sends A A B A rather than A A A B.
+    """
+    if not mix:
+        return list(endpoints)
+    by_name = {api_info["name"]: api_info for api_info in endpoints}
+    weighted = []
+    for part in mix.split(","):
+        name, _, weight = part.rpartition("=")
+        name = name.strip()
+        if name not in by_name:
+            raise ValueError(f"Unknown endpoint '{name}' in mix, expected one of {list(by_name)}")
+        weighted.append({**by_name[name], "weight": int(weight)})
+    return weighted_sequence(weighted)
+
+
+def find_knee(loads, latencies):
+    """Index of the knee of an increasing, convex latency curve (None with fewer than 3 points)"""
+    if len(loads) < 3 or max(latencies) == min(latencies):
+        return None
+    x = [(load - loads[0]) / (loads[-1] - loads[0]) for load in loads]
+    y = [(latency - min(latencies)) / (max(latencies) - min(latencies)) for latency in latencies]
+    distances = [xi - yi for xi, yi in zip(x, y)]
+    knee = max(range(len(distances)), key=distances.__getitem__)
+    return knee if distances[knee] > 0 else None
+
+
+class StageTester(LoadTester):
+    """LoadTester for one stage: keeps a histogram per window to detect steady state"""
+
+    def __init__(self, base_url=BASE_URL, endpoints=None, credentials=None, window=WINDOW_SECONDS):
+        super().__init__(base_url=base_url, endpoints=endpoints, credentials=credentials)
+        self.keep_samples = False
+        self.window = window
+        self.windows = []  # HistogramRecorder per window, keyed by (name, status)
+        self._start = None
+
+    def _record(self, result):
+        super()._record(result)
+        if self._start is None:
+            return
+        index = int((time.perf_counter() - self._start) // self.window)
+        while len(self.windows) <= index:
+            self.windows.append(HistogramRecorder())
+        self.windows[index].record((result["Name"], result["Status"]), result["Load Time (ms)"])
+
+    def _window_stats(self, recorders):
+        merged = HistogramRecorder()
+        for recorder in recorders:
+            merged.merge(recorder)
+        ok = merged.grouped(lambda key: key[1] == "OK").get(True)
+        requests = merged.total_count
+        return {
+            "requests": requests,
+            "throughput": (ok.count if ok else 0) / (len(recorders) * self.window),
+            "error_rate": (requests - (ok.count if ok else 0)) / requests * 100 if requests else 0,
+            "p50": ok.percentile(50) if ok else None,
+            "p95": ok.percentile(95) if ok else None,
+            "p99": ok.percentile(99) if ok else None,
+        }
+
+    def steady(self, closed):
+        """Whether the last STEADY_WINDOWS of the closed windows agree on throughput and p95"""
+        if closed <= STEADY_WINDOWS:
+            return False  # The first window holds the logins and the ramp-up, never part of the measurement
+        while len(self.windows) < closed:
+            self.windows.append(HistogramRecorder())  # A window without completed requests
+        recent = [self._window_stats([recorder]) for recorder in self.windows[closed - STEADY_WINDOWS:closed]]
+        for metric in ("throughput", "p95"):
+            values = [stats[metric] for stats in recent]
+            if None in values or not statistics.mean(values):
+                return False
+            if statistics.pstdev(values) / statistics.mean(values) > STEADY_TOLERANCE:
+                return False
+        return True
+
+    async def run_stage(self, mode, load, think_time=0):
+        """Hold one load level until steady state (or STAGE_MAX_SECONDS); returns the stage stats"""
+        self._start = time.perf_counter()
+        if mode == "users":
+            run = self.run_virtual_users(int(load), STAGE_MAX_SECONDS, think_time)
+        else:
+            run = self.run_arrival_rate(load, STAGE_MAX_SECONDS, num_users=max(1, min(int(load), 50)))
+        task = asyncio.create_task(run)
+
+        closed, steady = 0, False
+        while not task.done():
+            boundary = self._start + (closed + 1) * self.window
+            await asyncio.wait([task], timeout=max(0, boundary - time.perf_counter()))
+            if time.perf_counter() >= boundary:
+                closed += 1
+                steady = self.steady(closed)
+                if steady:
+                    task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+        measured = self.windows[max(0, closed - STEADY_WINDOWS):closed] or self.windows[:1] or [HistogramRecorder()]
+        return {**self._window_stats(measured), "load": load, "seconds": closed * self.window, "steady": steady}
+
+
+class CapacityFinder:
+    def __init__(self, base_url=BASE_URL, mode="users", endpoints=None, credentials=None,
+                 slo_p95=SLO_P95_MS, slo_errors=SLO_ERROR_PCT):
+        self.base_url = base_url
+        self.mode = mode
+        self.endpoints = endpoints or LOAD_ENDPOINTS
+        self.credentials = credentials
+        self.slo_p95 = slo_p95
+        self.slo_errors = slo_errors
+        self.stages = []
+
+    def _meets_slo(self, stage):
+        return stage["p95"] is not None and stage["p95"] <= self.slo_p95 and stage["error_rate"] <= self.slo_errors
+
+    async def ramp(self, start=START_LOAD, factor=LOAD_FACTOR, step=None, max_load=MAX_LOAD, think_time=0):
+        """Run stages of increasing load until one breaks the SLO"""
+        unit = "users" if self.mode == "users" else "req/s"
+        load = start
+        while load <= max_load:
+            print(f"\n🪜 Stage {len(self.stages) + 1}: {load:g} {unit}")
+            tester = StageTester(self.base_url, self.endpoints, self.credentials)
+            stage = await tester.run_stage(self.mode, load, think_time)
+            stage["slo"] = self._meets_slo(stage)
+            self.stages.append(stage)
+            print(f"  {'steady' if stage['steady'] else 'not steady'} after {stage['seconds']}s: "
+                  f"{stage['throughput']:.1f} req/s, p95 {stage['p95'] or 0:.1f} ms, {stage['error_rate']:.1f}% errors "
+                  f"{'✅' if stage['slo'] else '❌ SLO broken'}")
+            if not stage["slo"]:
+                break
+            next_load = load + step if step else load * factor
+            load = max(load + 1, round(next_load)) if self.mode == "users" else round(next_load, 2)
+
+    def print_report(self):
+        if not self.stages:
+            print("No stages were run!")
+            return
+        unit = "Users" if self.mode == "users" else "Offered/s"
+        print("\n" + "=" * 96)
+        print(f"CAPACITY RAMP ({self.mode} mode, SLO: p95 <= {self.slo_p95:g} ms and errors <= {self.slo_errors:g}%)")
+        print("=" * 96)
+        print(f"{'Stage':<6} {unit:<10} {'Seconds':<8} {'Steady':<7} {'Req/s':<9} {'p50':<9} {'p95':<9} {'p99':<9} "
+              f"{'Errors %':<9} {'SLO':<5}")
+        print("-" * 96)
+        for number, stage in enumerate(self.stages, start=1):
+            print(f"{number:<6} {stage['load']:<10g} {stage['seconds']:<8} {'yes' if stage['steady'] else 'no':<7} "
+                  f"{stage['throughput']:<9.1f} {stage['p50'] or 0:<9.1f} {stage['p95'] or 0:<9.1f} {stage['p99'] or 0:<9.1f} "
+                  f"{stage['error_rate']:<9.2f} {'ok' if stage['slo'] else 'FAIL':<5}")
+
+        passing = [stage for stage in self.stages if stage["slo"]]
+        print()
+        if passing:
+            best = max(passing, key=lambda stage: stage["throughput"])
+            print(f"🏁 Maximum sustainable throughput: {best['throughput']:.1f} req/s at {best['load']:g} "
+                  f"{unit.lower()} (p95 {best['p95']:.1f} ms)")
+        else:
+            print("🏁 Even the first stage broke the SLO; lower --start")
+        if self.stages[-1]["slo"]:
+            print("ℹ️  The SLO never broke; raise --max to find the limit")
+
+        measured = [stage for stage in self.stages if stage["p95"] is not None]
+        knee = find_knee([stage["load"] for stage in measured], [stage["p95"] for stage in measured])
+        if knee is not None:
+            stage = measured[knee]
+            print(f"📐 Latency knee: {stage['load']:g} {unit.lower()} ({stage['throughput']:.1f} req/s, "
+                  f"p95 {stage['p95']:.1f} ms); beyond it p95 grows faster than the load")
+
+    def save_results(self):
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filepath = os.path.join(RESULTS_DIR, f"capacity_test_{self.mode}_{timestamp}.csv")
+        fieldnames = ["Stage", "Load", "Seconds", "Steady", "Throughput (req/s)", "p50 (ms)", "p95 (ms)", "p99 (ms)",
+                      "Error Rate (%)", "Requests", "Meets SLO"]
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(filepath, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            for number, stage in enumerate(self.stages, start=1):
+                writer.writerow({
+                    "Stage": number, "Load": stage["load"], "Seconds": stage["seconds"], "Steady": int(stage["steady"]),
+                    "Throughput (req/s)": round(stage["throughput"], 2),
+                    "p50 (ms)": round(stage["p50"], 2) if stage["p50"] is not None else None,
+                    "p95 (ms)": round(stage["p95"], 2) if stage["p95"] is not None else None,
+                    "p99 (ms)": round(stage["p99"], 2) if stage["p99"] is not None else None,
+                    "Error Rate (%)": round(stage["error_rate"], 2), "Requests": stage["requests"],
+                    "Meets SLO": int(stage["slo"]),
+                })
+        print(f"\nStages saved to {filepath}")
+        return filepath
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Step-ramp load until a p95/error-rate SLO breaks")
+    parser.add_argument("--mode", choices=["users", "rate"], default="users",
+                        help="users: ramp concurrent virtual users, rate: ramp the arrival rate")
+    parser.add_argument("--start", type=float, default=START_LOAD, help="Load of the first stage")
+    parser.add_argument("--factor", type=float, default=LOAD_FACTOR, help="Multiply the load by this each stage")
+    parser.add_argument("--step", type=float, help="Add this to the load each stage instead of multiplying")
+    parser.add_argument("--max", type=float, default=MAX_LOAD, help="Highest load level to try")
+    parser.add_argument("--slo-p95", type=float, default=SLO_P95_MS, help="p95 latency SLO (ms)")
+    parser.add_argument("--slo-errors", type=float, default=SLO_ERROR_PCT, help="Error rate SLO (%%)")
+    parser.add_argument("--mix", help='Weighted endpoint mix, e.g. "Nodes API=3,Reports API=1" (default: all, equal)')
+    parser.add_argument("--role", choices=sorted(ROLE_CREDENTIALS), default="admin_pusat", help="Account the load logs in as")
+    parser.add_argument("--think-time", type=float, default=0, help="Pause between requests per virtual user")
+    parser.add_argument("--base-url", default=BASE_URL)
+    args = parser.parse_args()
+
+    print("🧗 Capacity Finder Starting...")
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)) as session:
+            async with session.get(args.base_url):
+                pass
+        print(f"✅ Server is running at {args.base_url}")
+    except Exception:
+        print(f"❌ Server is not responding at {args.base_url}")
+        print("Please start your Next.js app with: npx next start -p 3001")
+        return
+
+    finder = CapacityFinder(args.base_url, args.mode, weighted_endpoints(args.mix), ROLE_CREDENTIALS[args.role],
+                            args.slo_p95, args.slo_errors)
+    try:
+        await finder.ramp(args.start, args.factor, args.step, args.max, args.think_time)
+    finally:
+        finder.save_results()
+        finder.print_report()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
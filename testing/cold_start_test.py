@@ -0,0 +1,348 @@
+"""
+Cold Start Test
+Starts and stops the server itself to measure time-to-ready and first-hit vs warm latency per route
+
+Every other script expects `npx next start -p 3001` to be running already, so it only ever sees a
+warm server. After a deploy or a scale-out the first requests also pay for starting the process,
+loading and initialising each route handler, and creating the Supabase client (getSupabaseClient
+in lib/supabaseClient.ts). With `next dev` the first hit of a route also compiles it.
+
+For each of --boots cold boots this script:
+
+1. starts the server command and times spawn -> port accepting connections (time to ready; the
+   "Ready in" time Next.js prints is recorded too)
+2. requests every page (the HTML document, no browser) and API route of the scenario --hits times,
+   all first hits before any second hit. The route order rotates every boot, so the cost the very
+   first request pays for shared initialisation is spread over the routes and reported separately
+3. stops the server (the whole process group) and waits for the port to be released
+
+An unmeasured priming boot comes first: it logs in every role the scenario uses (auth_sessions.py
+caches the cookies, which stay valid across restarts) and loads the build from disk once.
+
+The report shows time to ready over the boots and, per route, the first-hit and steady-state
+latency (the second half of the hits), the cold penalty, the warm-up curve (median latency per hit
+number) and after how many hits the route is within WARM_TOLERANCE of its steady state.
+
+    npx next build && python cold_start_test.py --boots 10
+    python cold_start_test.py --dev --scenario quick         # first-hit compilation of next dev
+    python cold_start_test.py --server-command "python stub_server.py --port {port} --first-hit-ms 800" --app-dir .
+"""
+
+import argparse
+import csv
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+from http.cookiejar import DefaultCookiePolicy
+
+from auth_sessions import SessionManager
+from http_timing import TimedSession
+from latency_histogram import HistogramRecorder, LatencyHistogram
+from scenario import classify_status, load_scenario
+
+# Configuration
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # The Next.js project root
+SERVER_COMMAND = "npx next start -p {port}"
+DEV_SERVER_COMMAND = "npx next dev -p {port}"
+PORT = 3001
+RESULTS_DIR = "results"
+COLD_BOOTS = 10  # Measured boots
+HITS_PER_ROUTE = 10  # Requests per route in every boot; the first one is the cold hit
+COLD_SCENARIO = "quick"
+READY_TIMEOUT = 180  # Seconds a boot may take before the run is aborted (next dev compiles first)
+STOP_TIMEOUT = 15  # Seconds to wait for the server to exit before it is killed
+READY_POLL_INTERVAL = 0.02  # Seconds between connection attempts while the server starts
+REQUEST_TIMEOUT = 60  # A first hit under next dev can take long
+WARM_TOLERANCE = 1.25  # A route counts as warm once its median is within 25% of the steady state
+CURVE_HITS = 8  # Hit numbers shown in the warm-up curve
+
+READY_LINE = re.compile(r"Ready in ([\d.]+)\s*(ms|s)\b")
+
+
+def _port_open(port, host="127.0.0.1"):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.settimeout(READY_POLL_INTERVAL * 5)
+        return sock.connect_ex((host, port)) == 0
+
+
+class ManagedServer:
+    """The server under test as a child process, started and stopped once per boot"""
+
+    def __init__(self, command, port=PORT, app_dir=APP_DIR, log_path=None):
+        self.command = command.format(port=port)
+        self.port = port
+        self.app_dir = app_dir
+        self.log_path = log_path
+        self.process = None
+        self._log = None
+        self._log_offset = 0
+
+    def start(self):
+        """Start the server and block until it accepts connections; returns time to ready (ms)"""
+        if _port_open(self.port):
+            raise RuntimeError(f"Port {self.port} is already in use - stop the running server first, "
+                               "otherwise a warm server would be measured")
+        self._log = open(self.log_path, "a", encoding="utf-8") if self.log_path else subprocess.DEVNULL
+        if self.log_path:
+            self._log.flush()
+            self._log_offset = self._log.tell()
+        # A process group of its own, so stopping it also stops what npx started
+        group = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP} if os.name == "nt" else {"start_new_session": True}
+        start = time.perf_counter()
+        self.process = subprocess.Popen(self.command, shell=True, cwd=self.app_dir, stdout=self._log,
+                                        stderr=subprocess.STDOUT, **group)
+        while not _port_open(self.port):
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server exited with code {self.process.returncode} before it was ready"
+                                   f"{f' (see {self.log_path})' if self.log_path else ''}")
+            if time.perf_counter() - start > READY_TIMEOUT:
+                self.stop()
+                raise RuntimeError(f"Server not ready after {READY_TIMEOUT}s")
+            time.sleep(READY_POLL_INTERVAL)
+        return (time.perf_counter() - start) * 1000
+
+    def reported_ready_ms(self):
+        """The "Ready in" time the server printed during this boot, if any"""
+        if not self.log_path:
+            return None
+        self._log.flush()
+        with open(self.log_path, encoding="utf-8", errors="replace") as f:
+            f.seek(self._log_offset)
+            match = READY_LINE.search(f.read())
+        if not match:
+            return None
+        return float(match.group(1)) * (1000 if match.group(2) == "s" else 1)
+
+    def stop(self):
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            if os.name == "nt":
+                subprocess.run(["taskkill", "/T", "/F", "/PID", str(self.process.pid)], capture_output=True)
+            else:
+                os.killpg(self.process.pid, signal.SIGTERM)
+            try:
+                self.process.wait(STOP_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                os.killpg(self.process.pid, signal.SIGKILL)
+                self.process.wait()
+        deadline = time.perf_counter() + STOP_TIMEOUT
+        while _port_open(self.port) and time.perf_counter() < deadline:
+            time.sleep(READY_POLL_INTERVAL)  # Children may still hold the port for a moment
+        if self.log_path:
+            self._log.close()
+        self.process = None
+
+
+class ColdStartTester:
+    def __init__(self, server, scenario, boots=COLD_BOOTS, hits=HITS_PER_ROUTE):
+        self.server = server
+        self.base_url = f"http://localhost:{server.port}"
+        self.routes = [("Page", {**page, "method": "GET", "endpoint": page["path"]}) for page in scenario["pages"]] + \
+                      [("API", api_info) for api_info in scenario["endpoints"]]
+        self.boots = boots
+        self.hits = hits
+        self.sessions = SessionManager(self.base_url)
+        self.recorder = HistogramRecorder()  # Answered (non-5xx) samples per (type, name, hit)
+        self.first_requests = HistogramRecorder()  # First hits per (type, name, first request of the boot)
+        self.ready = LatencyHistogram()
+        self.errors = {}  # (type, name) -> samples that failed or got a 5xx
+        self.samples = []
+        self.boot_rows = []
+
+    def _clients(self):
+        """Fresh sessions (no pooled connections to the previous server process) with the cached logins"""
+        public = TimedSession()
+        public.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        clients = {None: public}
+        for role in {route.get("role") for _, route in self.routes} - {None}:
+            clients[role] = self.sessions.requests_session(role)
+        return clients
+
+    def _prime(self):
+        """Unmeasured boot: log in every role once and load the build from disk"""
+        roles = sorted({route.get("role") for _, route in self.routes} - {None})
+        print(f"🔥 Priming boot (not measured): caching logins for {', '.join(roles) or 'no roles'}")
+        self.server.start()
+        try:
+            for role in roles:
+                self.sessions.get(role)
+        finally:
+            self.server.stop()
+
+    def _measure(self, clients, boot, kind, route, hit, position):
+        url = f"{self.base_url}{route['endpoint']}"
+        try:
+            response = clients[route.get("role")].request(route["method"], url, json=route.get("data"),
+                                                          timeout=REQUEST_TIMEOUT, allow_redirects=False)
+            latency_ms = response.timings["total_ms"]
+            ttfb_ms = response.timings["ttfb_ms"]
+            code, status = response.status_code, classify_status(route, response.status_code)
+        except Exception as e:
+            latency_ms, ttfb_ms, code, status = -1, None, None, f"Error: {type(e).__name__}"
+
+        # Any answer the route itself gave (an invalid login's 401 too) shows its warm-up; 5xx do not
+        if code is not None and code < 500:
+            self.recorder.record((kind, route["name"], hit), latency_ms)
+            if hit == 1:
+                self.first_requests.record((kind, route["name"], position == 0), latency_ms)
+        else:
+            self.errors[(kind, route["name"])] = self.errors.get((kind, route["name"]), 0) + 1
+        self.samples.append({
+            "Boot": boot, "Type": kind, "Name": route["name"], "Hit": hit, "Position": position,
+            "Load Time (ms)": round(latency_ms, 2), "TTFB (ms)": ttfb_ms, "Status": status,
+            "Timestamp": datetime.now().isoformat(),
+        })
+
+    def run(self):
+        print(f"🧊 {self.boots} cold boots of `{self.server.command}`, {len(self.routes)} routes x {self.hits} hits")
+        self._prime()
+        for boot in range(1, self.boots + 1):
+            ready_ms = self.server.start()
+            reported = self.server.reported_ready_ms()
+            self.ready.record(ready_ms)
+            self.boot_rows.append({"Boot": boot, "Ready (ms)": round(ready_ms, 1), "Reported Ready (ms)": reported})
+            try:
+                clients = self._clients()
+                offset = (boot - 1) % len(self.routes)
+                order = self.routes[offset:] + self.routes[:offset]  # A different route goes first every boot
+                position = 0
+                for hit in range(1, self.hits + 1):
+                    for kind, route in order:
+                        self._measure(clients, boot, kind, route, hit, position)
+                        position += 1
+                for client in clients.values():
+                    client.close()
+            finally:
+                self.server.stop()
+            first = self.samples[-len(self.routes) * self.hits]
+            print(f"  Boot {boot}/{self.boots}: ready in {ready_ms:.0f}ms"
+                  f"{f' (server reported {reported:.0f}ms)' if reported is not None else ''}, "
+                  f"first request {first['Name']} {first['Load Time (ms)']:.0f}ms")
+
+    def _steady(self, kind, name):
+        """Histogram of the second half of the hits: the warm latency"""
+        steady_from = self.hits // 2 + 1
+        return self.recorder.grouped(lambda key: key[:2] if key[:2] == (kind, name) and key[2] >= steady_from
+                                     else None).get((kind, name))
+
+    def print_summary(self):
+        if not self.ready.count:
+            print("No boots to summarize!")
+            return
+        histograms = self.recorder.histograms
+
+        print("\n" + "=" * 96)
+        print(f"COLD START SUMMARY ({self.boots} boots, {self.hits} hits per route)")
+        print("=" * 96)
+        reported = [row["Reported Ready (ms)"] for row in self.boot_rows if row["Reported Ready (ms)"] is not None]
+        print(f"⏱️  Time to ready: p50 {self.ready.percentile(50):.0f}ms, p95 {self.ready.percentile(95):.0f}ms, "
+              f"min {self.ready.min:.0f}ms, max {self.ready.max:.0f}ms"
+              f"{f' (server reported p50 {sorted(reported)[len(reported) // 2]:.0f}ms)' if reported else ''}")
+
+        print(f"\n🥶 FIRST HIT VS STEADY STATE (steady = hits {self.hits // 2 + 1}-{self.hits}):")
+        print("-" * 96)
+        print(f"{'Route':<30} {'First p50':<10} {'First p95':<10} {'Steady p50':<11} {'Steady p95':<11} "
+              f"{'Penalty':<9} {'x':<6} {'Warm at':<8}")
+        print("-" * 96)
+        curves = {}
+        for kind, route in self.routes:
+            first, steady = histograms.get((kind, route["name"], 1)), self._steady(kind, route["name"])
+            label = f"{kind}: {route['name']}"
+            if not first or not steady:
+                print(f"{label[:29]:<30} {'(no answered samples)':<30} errors: {self.errors.get((kind, route['name']), 0)}")
+                continue
+            curve = [histograms[(kind, route["name"], hit)].percentile(50)
+                     if (kind, route["name"], hit) in histograms else None for hit in range(1, self.hits + 1)]
+            curves[label] = curve
+            warm_at = next((hit for hit, value in enumerate(curve, start=1)
+                            if value is not None and value <= steady.percentile(50) * WARM_TOLERANCE), None)
+            penalty = first.percentile(50) - steady.percentile(50)
+            print(f"{label[:29]:<30} {first.percentile(50):<10.1f} {first.percentile(95):<10.1f} "
+                  f"{steady.percentile(50):<11.1f} {steady.percentile(95):<11.1f} {penalty:<9.1f} "
+                  f"{first.percentile(50) / steady.percentile(50):<6.1f} {f'hit {warm_at}' if warm_at else '-':<8}")
+
+        shown = min(self.hits, CURVE_HITS)
+        print("\n📈 WARM-UP CURVE (median ms by hit number):")
+        print("-" * 96)
+        print(f"{'Route':<30} " + " ".join(f"{'#' + str(hit):<7}" for hit in range(1, shown + 1)))
+        print("-" * 96)
+        for label, curve in curves.items():
+            print(f"{label[:29]:<30} " + " ".join(f"{value:<7.1f}" if value is not None else f"{'-':<7}"
+                                                  for value in curve[:shown]))
+
+        # The first request of a boot also pays for what every route shares (module loading, the
+        # Supabase client); compare each route's first hit as the boot's first request vs later
+        shared = []
+        for kind, route in self.routes:
+            opening = self.first_requests.histograms.get((kind, route["name"], True))
+            later = self.first_requests.histograms.get((kind, route["name"], False))
+            if opening and later:
+                shared.append(opening.percentile(50) - later.percentile(50))
+        if shared:
+            print(f"\n🧱 First request of a boot: +{sorted(shared)[len(shared) // 2]:.0f}ms (median over {len(shared)} routes) "
+                  f"on top of the route's own first-hit cost (shared initialisation)")
+        if self.errors:
+            print("\n❌ Failed or 5xx responses: "
+                  + ", ".join(f"{name} x{count}" for (_, name), count in self.errors.items()))
+
+    def save_results(self):
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        paths = []
+        for name, rows in (("results", self.samples), ("boots", self.boot_rows)):
+            if not rows:
+                continue
+            path = os.path.join(RESULTS_DIR, f"cold_start_{name}_{timestamp}.csv")
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+                writer.writeheader()
+                writer.writerows(rows)
+            paths.append(path)
+        if paths:
+            print(f"Results saved to {', '.join(paths)}")
+        return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to ready and first-hit vs warm latency over repeated cold boots")
+    parser.add_argument("--boots", type=int, default=COLD_BOOTS, help="Measured cold boots")
+    parser.add_argument("--hits", type=int, default=HITS_PER_ROUTE, help="Requests per route in every boot")
+    parser.add_argument("--scenario", default=COLD_SCENARIO, help="Scenario whose pages and endpoints are measured")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--dev", action="store_true", help=f"Measure `{DEV_SERVER_COMMAND}` (first-hit compilation)")
+    parser.add_argument("--server-command", help="Server command, {port} is filled in "
+                                                 f"(default `{SERVER_COMMAND}`)")
+    parser.add_argument("--app-dir", default=APP_DIR, help="Directory the server command runs in")
+    args = parser.parse_args()
+
+    command = args.server_command or (DEV_SERVER_COMMAND if args.dev else SERVER_COMMAND)
+    if command == SERVER_COMMAND and not os.path.isdir(os.path.join(args.app_dir, ".next")):
+        print(f"⚠️  No build in {args.app_dir}/.next - run `npx next build` first, `next start` serves the build")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    log_path = os.path.join(RESULTS_DIR, f"cold_start_server_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
+    server = ManagedServer(command, args.port, args.app_dir, log_path)
+    tester = ColdStartTester(server, load_scenario(args.scenario), args.boots, args.hits)
+    try:
+        tester.run()
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+    except KeyboardInterrupt:
+        print("\n⏹️  Interrupted, reporting the boots measured so far")
+    finally:
+        server.stop()
+    print(f"Server output saved to {log_path}")
+    tester.save_results()
+    tester.print_summary()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
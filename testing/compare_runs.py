@@ -0,0 +1,209 @@
+"""
+Regression Gate
+Compares a candidate run against a baseline run and fails when a test got significantly slower
+
+For every test (Type + Name) present in both runs:
+
+- median and p95 latency of both runs, with the relative change and a bootstrap confidence
+  interval for that change (both runs resampled with replacement BOOTSTRAP_RESAMPLES times)
+- a Mann-Whitney U test for a shift of the whole distribution (the median verdict)
+- a bootstrap p-value for the p95 difference (percentiles have no closed-form test)
+- the error rate of both runs
+
+A change counts as a regression when it is larger than the threshold, its confidence interval
+excludes zero and it is significant at SIGNIFICANCE_LEVEL. The exit code is 1 when any test
+regressed, so the script can gate a deploy:
+
+    python compare_runs.py results/baseline.csv results/candidate.csv || exit 1
+"""
+
+import argparse
+import csv
+import math
+import sys
+
+import numpy as np
+
+from results_writer import load_results
+from scenario import is_success_status
+
+# Configuration
+BOOTSTRAP_RESAMPLES = 10000  # Resamples per test for the confidence intervals
+CONFIDENCE_LEVEL = 0.95  # Width of the bootstrap confidence intervals
+SIGNIFICANCE_LEVEL = 0.05  # p-value below which a difference is significant
+REGRESSION_THRESHOLD_PCT = 10.0  # Smallest median/p95 slowdown that fails the gate
+ERROR_RATE_THRESHOLD_PCT = 5.0  # Smallest error rate increase (percentage points) that fails the gate
+MIN_SAMPLES = 5  # Tests with fewer latency samples in either run are reported but not judged
+BOOTSTRAP_SEED = 1234
+
+
+def mann_whitney_u(baseline, candidate):
+    """Two-sided Mann-Whitney U test (normal approximation with tie correction); returns (U, p-value)"""
+    n1, n2 = len(baseline), len(candidate)
+    combined = np.concatenate([baseline, candidate])
+    order = combined.argsort(kind="mergesort")
+    ranks = np.empty(len(combined))
+    sorted_values = combined[order]
+    # Average ranks over ties
+    _, first, counts = np.unique(sorted_values, return_index=True, return_counts=True)
+    average_ranks = first + (counts + 1) / 2
+    ranks[order] = np.repeat(average_ranks, counts)
+
+    u_candidate = ranks[n1:].sum() - n2 * (n2 + 1) / 2
+    mean_u = n1 * n2 / 2
+    n = n1 + n2
+    tie_term = (counts ** 3 - counts).sum() / (n * (n - 1)) if n > 1 else 0
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term)
+    if variance <= 0:
+        return u_candidate, 1.0
+    z = (abs(u_candidate - mean_u) - 0.5) / math.sqrt(variance)  # continuity correction
+    return u_candidate, min(1.0, math.erfc(max(z, 0) / math.sqrt(2)))
+
+
+def bootstrap_change(baseline, candidate, percentile, rng, resamples=BOOTSTRAP_RESAMPLES):
+    """Bootstrap the relative change of a percentile; returns (change %, CI low %, CI high %, p-value)"""
+    base_stats = np.percentile(rng.choice(baseline, size=(resamples, len(baseline))), percentile, axis=1)
+    cand_stats = np.percentile(rng.choice(candidate, size=(resamples, len(candidate))), percentile, axis=1)
+    changes = (cand_stats / base_stats - 1) * 100
+
+    point = (np.percentile(candidate, percentile) / np.percentile(baseline, percentile) - 1) * 100
+    tail = (1 - CONFIDENCE_LEVEL) / 2 * 100
+    low, high = np.percentile(changes, [tail, 100 - tail])
+    # Two-sided p-value: how often the resampled difference lands on the other side of zero
+    p_value = min(1.0, 2 * min((changes <= 0).mean(), (changes >= 0).mean()))
+    return point, low, high, p_value
+
+
+def _verdict(change, low, high, p_value, threshold):
+    if p_value >= SIGNIFICANCE_LEVEL:
+        return "No change"
+    if change > threshold and low > 0:
+        return "REGRESSION"
+    if change < -threshold and high < 0:
+        return "Improvement"
+    return "Minor change"
+
+
+def compare_runs(baseline_df, candidate_df, threshold=REGRESSION_THRESHOLD_PCT, resamples=BOOTSTRAP_RESAMPLES):
+    """Compare every test present in both runs; returns one result dict per test"""
+    rng = np.random.default_rng(BOOTSTRAP_SEED)
+    results = []
+    keys = sorted(set(zip(baseline_df["Type"], baseline_df["Name"])) & set(zip(candidate_df["Type"], candidate_df["Name"])))
+    for test_type, name in keys:
+        base = baseline_df[(baseline_df["Type"] == test_type) & (baseline_df["Name"] == name)]
+        cand = candidate_df[(candidate_df["Type"] == test_type) & (candidate_df["Name"] == name)]
+        base_ok = base["Status"].map(is_success_status).to_numpy(dtype=bool)
+        cand_ok = cand["Status"].map(is_success_status).to_numpy(dtype=bool)
+        # Latency is only compared on successful rows: failures end early (or late) for other reasons
+        base_times = base["Load Time (ms)"].to_numpy(dtype=float)[base_ok]
+        cand_times = cand["Load Time (ms)"].to_numpy(dtype=float)[cand_ok]
+        base_times, cand_times = base_times[base_times >= 0], cand_times[cand_times >= 0]
+
+        base_errors = (~base_ok).mean() * 100
+        cand_errors = (~cand_ok).mean() * 100
+        result = {
+            "Type": test_type,
+            "Name": name,
+            "Baseline N": len(base_times),
+            "Candidate N": len(cand_times),
+            "Baseline Errors %": round(base_errors, 1),
+            "Candidate Errors %": round(cand_errors, 1),
+            "Error Verdict": "REGRESSION" if cand_errors - base_errors > ERROR_RATE_THRESHOLD_PCT else "OK",
+        }
+        if min(len(base_times), len(cand_times)) < MIN_SAMPLES:
+            result.update({"Median Verdict": "Too few samples", "p95 Verdict": "Too few samples"})
+            results.append(result)
+            continue
+
+        _, mw_p = mann_whitney_u(base_times, cand_times)
+        for label, percentile in (("Median", 50), ("p95", 95)):
+            change, low, high, boot_p = bootstrap_change(base_times, cand_times, percentile, rng, resamples)
+            p_value = mw_p if percentile == 50 else boot_p
+            result.update({
+                f"Baseline {label} (ms)": round(float(np.percentile(base_times, percentile)), 2),
+                f"Candidate {label} (ms)": round(float(np.percentile(cand_times, percentile)), 2),
+                f"{label} Change %": round(float(change), 1),
+                f"{label} CI Low %": round(float(low), 1),
+                f"{label} CI High %": round(float(high), 1),
+                f"{label} p-value": round(float(p_value), 4),
+                f"{label} Verdict": _verdict(change, low, high, p_value, threshold),
+            })
+        results.append(result)
+    return results
+
+
+def print_comparison(results, baseline_label, candidate_label):
+    print("\n" + "="*128)
+    print(f"REGRESSION CHECK: {candidate_label} vs baseline {baseline_label}")
+    print("="*128)
+    print(f"{'Test Name':<38} {'Median (ms)':<18} {'Change % [CI]':<24} {'p':<8} "
+          f"{'p95 (ms)':<18} {'Change % [CI]':<24} {'p':<8}")
+    print("-" * 128)
+    for result in sorted(results, key=lambda r: -(r.get("p95 Change %") or 0)):
+        if "Median Change %" not in result:
+            print(f"{result['Name'][:37]:<38} too few samples ({result['Baseline N']} / {result['Candidate N']})")
+            continue
+        cells = []
+        for label in ("Median", "p95"):
+            marker = {"REGRESSION": "🔴", "Improvement": "🟢"}.get(result[f"{label} Verdict"], "  ")
+            cells.append(f"{result[f'Baseline {label} (ms)']:.0f} -> {result[f'Candidate {label} (ms)']:.0f}".ljust(18) + " "
+                         + f"{marker}{result[f'{label} Change %']:+.1f} [{result[f'{label} CI Low %']:+.0f}, {result[f'{label} CI High %']:+.0f}]".ljust(24) + " "
+                         + f"{result[f'{label} p-value']:<8.3f}")
+        print(f"{result['Name'][:37]:<38} " + " ".join(cells))
+
+    regressions = [r for r in results if "REGRESSION" in (r.get("Median Verdict"), r.get("p95 Verdict"), r["Error Verdict"])]
+    improvements = [r for r in results if r not in regressions and "Improvement" in (r.get("Median Verdict"), r.get("p95 Verdict"))]
+    error_regressions = [r for r in results if r["Error Verdict"] == "REGRESSION"]
+
+    print(f"\n📊 {len(results)} tests compared: {len(regressions)} regressions, {len(improvements)} improvements")
+    for result in error_regressions:
+        print(f"  ❌ {result['Name']}: error rate {result['Baseline Errors %']}% -> {result['Candidate Errors %']}%")
+    for result in regressions:
+        if result not in error_regressions:
+            print(f"  🔴 {result['Name']}: median {result.get('Median Change %', 0):+.1f}%, p95 {result.get('p95 Change %', 0):+.1f}%")
+    return regressions
+
+
+def save_comparison(results, filepath):
+    fieldnames = list(dict.fromkeys(key for result in results for key in result))
+    with open(filepath, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(results)
+    print(f"Comparison saved to {filepath}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail when a candidate run regressed against a baseline run")
+    parser.add_argument("baseline", help="Results CSV of the baseline run")
+    parser.add_argument("candidate", help="Results CSV of the run to check")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD_PCT,
+                        help="Smallest median/p95 slowdown in percent that fails the gate")
+    parser.add_argument("--resamples", type=int, default=BOOTSTRAP_RESAMPLES)
+    parser.add_argument("--type", choices=["Page", "API"], help="Only compare tests of this type")
+    parser.add_argument("--output", help="Also write the comparison table to this CSV")
+    args = parser.parse_args()
+
+    baseline_df = load_results([args.baseline])
+    candidate_df = load_results([args.candidate])
+    if args.type:
+        baseline_df = baseline_df[baseline_df["Type"] == args.type]
+        candidate_df = candidate_df[candidate_df["Type"] == args.type]
+
+    results = compare_runs(baseline_df, candidate_df, args.threshold, args.resamples)
+    if not results:
+        print("❌ The runs have no tests in common")
+        return 2
+    regressions = print_comparison(results, args.baseline, args.candidate)
+    if args.output:
+        save_comparison(results, args.output)
+
+    if regressions:
+        print(f"\n❌ Regression gate failed ({len(regressions)} tests over {args.threshold:.0f}%)")
+        return 1
+    print("\n✅ No significant regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,367 @@
+"""
+Write Contention Test
+Fires bursts of conflicting writes at the same rows, then checks that the data is still consistent
+
+Every other benchmark reads, or writes rows nobody else touches, but production incidents come
+from concurrent writes to shared rows. The write routes below read a row, decide in the route and
+write the result back in a separate statement, so requests that interleave can lose updates or
+act twice:
+
+- cook: node admins cooking the same recipe at the same node (POST /api/item-instance/cook). Each
+  cook reads the ingredient stock and writes back the remainder it computed.
+- approve: admins approving the same local recipe (PUT /api/recipes/[recipeId]/approve).
+- transit: a transit in flight, delivered by second QR scans (POST /api/qr/scan/[qrId]) racing
+  transit completions (POST /api/item-transit/[id]/complete).
+
+A burst starts BURST_SIZE conflicting requests at the same instant, one logged-in session per
+racer, and records the latency of each. Throughput is completed writes per second of burst time.
+After every burst the rows are read back and checked:
+
+- cook: stock consumed = successful cooks x ingredient need, no stock below zero, no more
+  successful cooks than the stock covered (STOCK_COVERAGE of the burst), one cooked item each
+- approve: every request succeeds, the recipe ends global, exactly one request promoted it
+- transit: exactly one scan delivered, the destination stock grew by the transit count once, and
+  the transit ends inactive with time_arrival set
+
+Fixtures (a node pair, ingredient stock, a local recipe per approve burst, a transit per transit
+burst) are created through the API, so every invariant starts from known values. The exit code is
+1 when an invariant is violated.
+
+Note: this creates nodes, stock, recipes and transits. Run it against a test database or the
+offline stub server (stub_server.py), not production.
+"""
+
+import argparse
+import asyncio
+import csv
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+from auth_sessions import ROLE_CREDENTIALS
+from load_test import BASE_URL, RESULTS_DIR, LoadTester
+from scenario import lookup
+
+# Configuration
+BURST_SIZE = 10  # Conflicting requests started at the same instant
+BURSTS = 5  # Bursts per scenario, each on fresh rows
+CONTENTION_SCENARIOS = ("cook", "approve", "transit")
+COOK_SERVINGS = 1  # Servings per cook request
+INGREDIENT_QUANTITIES = (1, 2)  # Per-serving quantity of each fixture ingredient
+STOCK_COVERAGE = 0.5  # Share of a cook burst the added stock covers; the other cooks must be refused
+TRANSIT_ITEMS = 5  # Items moved by each contended transit
+PAGE_SIZE = 100  # Largest page the list endpoints return
+
+PROMOTED_MESSAGE = "Recipe promoted to global successfully"
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class ContentionTester(LoadTester):
+    def __init__(self, base_url=BASE_URL, credentials=None, burst_size=BURST_SIZE, bursts=BURSTS):
+        super().__init__(base_url=base_url, credentials=credentials)
+        self.burst_size = burst_size
+        self.bursts = bursts
+        self.run_id = uuid.uuid4().hex[:8]
+        self.fixtures = {}
+        self.burst_stats = {}  # scenario -> {"bursts", "requests", "ok", "seconds"}
+        self.invariants = []  # {"Scenario", "Burst", "Invariant", "Expected", "Actual", "Holds"}
+
+    async def _call(self, session, method, path, body=None, params=None):
+        """Unmeasured setup or verification request; raises when it fails"""
+        async with session.request(method, f"{self.base_url}{path}", json=body, params=params) as response:
+            payload = await response.json(content_type=None)
+        if response.status >= 400:
+            raise RuntimeError(f"{method} {path} -> {response.status}: {lookup(payload, 'message')}")
+        return payload.get("data")
+
+    async def _instances(self, session, node_id, item_type_id):
+        """Every item instance of a type at a node, whatever its status"""
+        rows, page = [], 1
+        while True:
+            data = await self._call(session, "GET", "/api/item-instances", params={
+                "node_id": node_id, "item_type_id": item_type_id, "status": "all",
+                "page": str(page), "page_size": str(PAGE_SIZE)})
+            rows += data.get("item_instances") or []
+            if not lookup(data, "pagination.has_next"):
+                return rows
+            page += 1
+
+    async def _stock(self, session, node_id, item_type_id):
+        return sum(row.get("item_count") or 0 for row in await self._instances(session, node_id, item_type_id))
+
+    async def _setup(self, session):
+        """Create the node pair and pick the item types every scenario works on"""
+        data = await self._call(session, "GET", "/api/item-types", params={"page_size": str(PAGE_SIZE)})
+        item_types = [(t.get("id") or t.get("item_id"), t.get("name") or t.get("item_name"))
+                      for t in data.get("item_types") or []]
+        if len(item_types) < len(INGREDIENT_QUANTITIES) + 1:
+            raise RuntimeError(f"Need at least {len(INGREDIENT_QUANTITIES) + 1} item types, found {len(item_types)}")
+        node = await self._call(session, "POST", "/api/node", {
+            "node_name": f"Perf Contention {self.run_id}", "node_type": "Assembly"})
+        destination = await self._call(session, "POST", "/api/node", {
+            "node_name": f"Perf Contention {self.run_id} Destination", "node_type": "Distribution"})
+        self.fixtures = {
+            "node_id": node.get("id") or node.get("node_id"),
+            "destination_id": destination.get("id") or destination.get("node_id"),
+            "ingredients": list(zip(item_types, INGREDIENT_QUANTITIES)),
+            "result": item_types[len(INGREDIENT_QUANTITIES)],
+        }
+        print(f"  🧱 Fixtures: node {self.fixtures['node_id']}, destination {self.fixtures['destination_id']}")
+
+    async def _recipe(self, session, name, local=True):
+        data = await self._call(session, "POST", "/api/recipes", {
+            "name": name,
+            "node_id": self.fixtures["node_id"] if local else None,
+            "result_id": self.fixtures["result"][0],
+            "instructions": "Created by contention_test.py",
+            "ingredients": [{"item_id": item_type_id, "quantity": quantity}
+                            for (item_type_id, _), quantity in self.fixtures["ingredients"]],
+        })
+        return data["id"]
+
+    async def _burst(self, scenario, requests):
+        """Send (session, name, method, path, body) requests at the same instant; returns [(name, status, payload)]"""
+        gate = asyncio.Event()
+
+        async def send(session, name, method, path, body):
+            await gate.wait()
+            start_time = time.perf_counter()
+            try:
+                async with session.request(method, f"{self.base_url}{path}", json=body) as response:
+                    raw = await response.read()
+                    payload = await response.json(content_type=None) if raw else {}
+                elapsed_ms = (time.perf_counter() - start_time) * 1000
+                if response.status < 400:
+                    status = "OK"
+                elif response.status < 500:
+                    status = f"Rejected ({response.status})"  # The losing side of a conflict
+                else:
+                    status = f"Error {response.status}"
+                code = response.status
+            except Exception as e:
+                elapsed_ms, raw, payload, code, status = -1, b"", {}, None, f"Error: {type(e).__name__}"
+            self._record({
+                "Type": "Contention",
+                "Name": name,
+                "Load Time (ms)": round(elapsed_ms, 2),
+                "Size (KB)": round(len(raw) / 1024, 2),
+                "Status": status,
+                "Virtual User": scenario,
+                "Timestamp": datetime.now().isoformat(),
+            })
+            return name, code, payload
+
+        tasks = [asyncio.create_task(send(*request)) for request in requests]
+        await asyncio.sleep(0)  # Let every task reach the gate before opening it
+        start = time.perf_counter()
+        gate.set()
+        results = await asyncio.gather(*tasks)
+        stats = self.burst_stats.setdefault(scenario, {"bursts": 0, "requests": 0, "ok": 0, "seconds": 0.0})
+        stats["bursts"] += 1
+        stats["requests"] += len(results)
+        stats["ok"] += sum(code is not None and code < 400 for _, code, _ in results)
+        stats["seconds"] += time.perf_counter() - start
+        return results
+
+    def _check(self, scenario, burst, invariant, expected, actual, holds=None):
+        holds = expected == actual if holds is None else holds
+        self.invariants.append({"Scenario": scenario, "Burst": burst, "Invariant": invariant,
+                                "Expected": expected, "Actual": actual, "Holds": int(holds)})
+        if not holds:
+            print(f"    ❌ {invariant}: expected {expected}, got {actual}")
+
+    async def _cook_burst(self, sessions, burst):
+        admin = sessions[0]
+        node_id, (result_id, _) = self.fixtures["node_id"], self.fixtures["result"]
+        covered = max(1, round(self.burst_size * STOCK_COVERAGE))
+        needs = {}
+        for (item_type_id, name), quantity in self.fixtures["ingredients"]:
+            needs[item_type_id] = (name, quantity * COOK_SERVINGS)
+            await self._call(admin, "POST", "/api/item-instance", {
+                "item_type_id": item_type_id, "node_id": node_id, "item_count": quantity * COOK_SERVINGS * covered})
+        before = {item_type_id: await self._stock(admin, node_id, item_type_id) for item_type_id in needs}
+        cooked_before = len(await self._instances(admin, node_id, result_id))
+
+        body = {"recipe_id": self.fixtures["recipe_id"], "node_id": node_id, "quantity": COOK_SERVINGS}
+        results = await self._burst("cook", [(session, "Cook", "POST", "/api/item-instance/cook", body)
+                                             for session in sessions])
+        cooks = sum(code is not None and code < 400 for _, code, _ in results)
+
+        capacity = min(before[item_type_id] // need for item_type_id, (_, need) in needs.items())
+        self._check("cook", burst, "Cooks within available stock", f"<= {capacity}", cooks, holds=cooks <= capacity)
+        counts = []
+        for item_type_id, (name, need) in needs.items():
+            instance_counts = [row.get("item_count") or 0 for row in await self._instances(admin, node_id, item_type_id)]
+            self._check("cook", burst, f"Stock consumed = cooks x need ({name})",
+                        cooks * need, before[item_type_id] - sum(instance_counts))
+            counts += instance_counts
+        lowest = min(counts, default=0)
+        self._check("cook", burst, "No negative stock", ">= 0", lowest, holds=lowest >= 0)
+        cooked = len(await self._instances(admin, node_id, result_id)) - cooked_before
+        self._check("cook", burst, "One cooked item per cook", cooks, cooked)
+
+    async def _approve_burst(self, sessions, burst):
+        admin = sessions[0]
+        recipe_id = await self._recipe(admin, f"Perf Contention {self.run_id} Approve {burst}")
+        results = await self._burst("approve", [(session, "Recipe Approve", "PUT", f"/api/recipes/{recipe_id}/approve", None)
+                                                for session in sessions])
+        approved = sum(code is not None and code < 400 for _, code, _ in results)
+        promoted = sum(lookup(payload, "message") == PROMOTED_MESSAGE for _, _, payload in results)
+        recipe = await self._call(admin, "GET", f"/api/recipes/{recipe_id}")
+
+        self._check("approve", burst, "Every approval succeeds", len(results), approved)
+        self._check("approve", burst, "Recipe ends global", None, recipe.get("node_id"))
+        self._check("approve", burst, "Promoted exactly once", 1, promoted)
+
+    async def _transit_burst(self, sessions, burst):
+        admin = sessions[0]
+        node_id, destination_id = self.fixtures["node_id"], self.fixtures["destination_id"]
+        item_type_id = self.fixtures["ingredients"][0][0][0]
+        # A source instance holding exactly the transit count, so completing (which moves the
+        # source instance to the destination) adds nothing on top of the delivered stock
+        instance = await self._call(admin, "POST", "/api/item-instance", {
+            "item_type_id": item_type_id, "node_id": node_id, "item_count": TRANSIT_ITEMS})
+        qr = await self._call(admin, "POST", "/api/qr/create", {
+            "item_instance_id": instance.get("id") or instance.get("item_instance_id"),
+            "source_id": node_id, "destination_id": destination_id, "item_count": TRANSIT_ITEMS})
+        courier = {"courier_name": f"Perf Courier {burst}", "courier_phone": f"0812{burst:07d}"}
+        pickup = await self._call(admin, "POST", f"/api/qr/scan/{qr['qr_id']}", courier)
+        transit_id = pickup["item_transit_id"]
+        stock_before = await self._stock(admin, destination_id, item_type_id)
+
+        requests = []
+        for i, session in enumerate(sessions):
+            if i % 2 == 0:
+                requests.append((session, "QR Scan (Delivery)", "POST", f"/api/qr/scan/{qr['qr_id']}", courier))
+            else:
+                requests.append((session, "Transit Complete", "POST", f"/api/item-transit/{transit_id}/complete",
+                                 {"time_arrival": _now_iso()}))
+        results = await self._burst("transit", requests)
+        deliveries = sum(lookup(payload, "data.action") == "item_delivered" for _, _, payload in results)
+        transit = await self._call(admin, "GET", f"/api/item-transit/{transit_id}")
+        grown = await self._stock(admin, destination_id, item_type_id) - stock_before
+
+        self._check("transit", burst, "Delivered exactly once", 1, deliveries)
+        self._check("transit", burst, "Destination stock grows once", TRANSIT_ITEMS, grown)
+        self._check("transit", burst, "Transit ends inactive", "inactive", transit.get("status"))
+        self._check("transit", burst, "Arrival time recorded", "set", "set" if transit.get("time_arrival") else None)
+
+    async def run(self, scenarios=CONTENTION_SCENARIOS):
+        """Run every burst of every scenario; sessions are logged in once and shared by all bursts"""
+        self.mode = "contention"
+        print(f"\n⚔️  {self.bursts} bursts of {self.burst_size} conflicting writes per scenario: {', '.join(scenarios)}")
+        connector = self._new_connector()
+        sessions = await self._open_sessions(connector, self.burst_size)
+        try:
+            await self._setup(sessions[0])
+            if "cook" in scenarios:
+                self.fixtures["recipe_id"] = await self._recipe(sessions[0], f"Perf Contention {self.run_id} Cook")
+            start = time.perf_counter()
+            for scenario in scenarios:
+                run_burst = getattr(self, f"_{scenario}_burst")
+                for burst in range(1, self.bursts + 1):
+                    print(f"  💥 {scenario} burst {burst}/{self.bursts}")
+                    await run_burst(sessions, burst)
+            self.duration = time.perf_counter() - start
+        finally:
+            await asyncio.gather(*(session.close() for session in sessions))
+            await connector.close()
+
+    @property
+    def violations(self):
+        return [check for check in self.invariants if not check["Holds"]]
+
+    def print_summary(self):
+        """Latency and throughput per write under contention, then the invariant report"""
+        if not self.recorder.total_count:
+            print("No results to summarize!")
+            return
+
+        attempts = {name: h.count for name, h in self.recorder.grouped(lambda key: key[1]).items()}
+        for name, count in self.recorder.failures_by(lambda key: key[1]).items():
+            attempts[name] = attempts.get(name, 0) + count
+        ok = self.recorder.grouped(lambda key: key[1] if key[2] == "OK" else None)
+        rejected = self.recorder.grouped(lambda key: key[1] if key[2].startswith("Rejected") else None)
+        latencies = self.recorder.grouped(lambda key: key[1])
+
+        print("\n" + "="*96)
+        print(f"WRITE CONTENTION SUMMARY ({self.bursts} bursts of {self.burst_size} concurrent writes)")
+        print("="*96)
+        print(f"{'Write':<24} {'Requests':<9} {'OK':<6} {'Rejected':<9} {'Errors':<7} {'p50':<8} {'p95':<8} {'p99':<8} {'Max':<8}")
+        print("-" * 96)
+        for name, count in attempts.items():
+            histogram = latencies.get(name)
+            ok_count = ok[name].count if name in ok else 0
+            rejected_count = rejected[name].count if name in rejected else 0
+            timings = (f"{histogram.percentile(50):<8.1f} {histogram.percentile(95):<8.1f} "
+                       f"{histogram.percentile(99):<8.1f} {histogram.max:<8.1f}") if histogram else "(no timed samples)"
+            print(f"{name[:23]:<24} {count:<9} {ok_count:<6} {rejected_count:<9} {count - ok_count - rejected_count:<7} {timings}")
+
+        print("\n🚦 Throughput under contention (burst wall time):")
+        for scenario, stats in self.burst_stats.items():
+            print(f"  {scenario:<8} {stats['requests'] / stats['seconds']:>8.1f} writes/s attempted, "
+                  f"{stats['ok'] / stats['seconds']:>8.1f} completed/s ({stats['seconds'] / stats['bursts'] * 1000:.0f} ms per burst)")
+
+        print("\n🔒 INVARIANTS:")
+        print("-" * 96)
+        print(f"{'Scenario':<9} {'Invariant':<48} {'Held':<10} {'First violation':<27}")
+        print("-" * 96)
+        checks = {}
+        for check in self.invariants:
+            checks.setdefault((check["Scenario"], check["Invariant"]), []).append(check)
+        for (scenario, invariant), results in checks.items():
+            failed = [check for check in results if not check["Holds"]]
+            first = (f"burst {failed[0]['Burst']}: {failed[0]['Actual']} (expected {failed[0]['Expected']})"
+                     if failed else "-")
+            held = f"{len(results) - len(failed)}/{len(results)}"
+            print(f"{scenario:<9} {invariant[:47]:<48} {held:<10} {first[:27]:<27}{' ❌' if failed else ''}")
+
+        if self.violations:
+            print(f"\n❌ {len(self.violations)} invariant violations: the write paths are not safe under contention")
+        else:
+            print("\n✅ Every invariant held under contention")
+
+    def save_invariants(self):
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filepath = os.path.join(RESULTS_DIR, f"contention_test_invariants_{timestamp}.csv")
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(filepath, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=["Scenario", "Burst", "Invariant", "Expected", "Actual", "Holds"])
+            writer.writeheader()
+            writer.writerows(self.invariants)
+        print(f"Invariant checks saved to {filepath}")
+        return filepath
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Bursts of conflicting writes with consistency checks afterwards")
+    parser.add_argument("--scenarios", nargs="+", choices=CONTENTION_SCENARIOS, default=list(CONTENTION_SCENARIOS),
+                        help="Write paths to contend")
+    parser.add_argument("--burst-size", type=int, default=BURST_SIZE, help="Concurrent conflicting requests per burst")
+    parser.add_argument("--bursts", type=int, default=BURSTS, help="Bursts per scenario")
+    parser.add_argument("--role", choices=sorted(ROLE_CREDENTIALS), default="admin_node", help="Account every racer logs in as")
+    parser.add_argument("--base-url", default=BASE_URL)
+    args = parser.parse_args()
+
+    print("⚔️  Write Contention Test Starting...")
+    print("⚠️  This creates nodes, stock, recipes and transits - use a test database or stub_server.py")
+
+    tester = ContentionTester(args.base_url, ROLE_CREDENTIALS[args.role], args.burst_size, args.bursts)
+    try:
+        await tester.run(args.scenarios)
+    except RuntimeError as e:
+        print(f"❌ Setup failed: {e}")
+        return 1
+    tester.save_results(filename=f"contention_test_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+    tester.save_invariants()
+    tester.print_summary()
+    return 1 if tester.violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
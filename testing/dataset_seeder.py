@@ -0,0 +1,212 @@
+"""
+Synthetic Dataset Seeder
+Bulk-generates nodes, item instances and item transits and loads them into a backend
+
+Rows are generated in vectorized batches with NumPy (random choices, timestamps and counts are
+drawn for a whole batch at once), which keeps generating a million rows in the seconds range.
+The same generators feed both targets:
+
+- StubSeeder:     asks the offline stub server (stub_server.py) to rebuild its in-memory tables
+- SupabaseSeeder: bulk-inserts the rows through Supabase's REST API (PostgREST), batch by batch;
+                  needs NEXT_PUBLIC_SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY in the environment
+
+Seeded rows are tagged (node names and courier names start with SEED_TAG) so they can be
+removed again with cleanup().
+"""
+
+import os
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+# Configuration
+SEED_TAG = "perf-seed"
+SEED_BATCH_SIZE = 5000  # Rows per generated batch / REST insert
+BASE_TIME = np.datetime64(datetime(2025, 11, 29), "s")
+NODE_TYPES = ["Gudang", "Dapur", "Sekolah"]
+
+
+def nodes_for_level(item_instances):
+    """Number of nodes seeded alongside a given number of item instances"""
+    return max(10, item_instances // 1000)
+
+
+def _uuids(rng, count):
+    raw = rng.integers(0, 256, size=(count, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    return [str(uuid.UUID(bytes=row.tobytes())) for row in raw]
+
+
+def _timestamps(rng, count, days_back=90, days_ahead=0):
+    offsets = rng.integers(-days_back * 86400, days_ahead * 86400 + 1, size=count)
+    return [f"{value}Z" for value in np.datetime_as_string(BASE_TIME + offsets.astype("timedelta64[s]"))]
+
+
+def generate_nodes(count, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = _uuids(rng, count)
+    types = rng.choice(NODE_TYPES, size=count).tolist()
+    latitudes = np.round(-6.2 + rng.uniform(-0.1, 0.1, count), 6).tolist()
+    longitudes = np.round(106.8 + rng.uniform(-0.1, 0.1, count), 6).tolist()
+    created = _timestamps(rng, count)
+    return [{
+        "node_id": ids[i],
+        "node_name": f"{SEED_TAG} node {i + 1}",
+        "node_type": types[i],
+        "node_address": f"Jl. Seed No. {i + 1}, Jakarta",
+        "node_latitude": latitudes[i],
+        "node_longitude": longitudes[i],
+        "node_status": "Active",
+        "created_at": created[i],
+    } for i in range(count)]
+
+
+def generate_item_instances(count, node_ids, item_type_ids, seed=0, batch_size=SEED_BATCH_SIZE):
+    """Yield batches of item instance rows (80% Active, expiry dates 60 days either side of BASE_TIME)"""
+    rng = np.random.default_rng(seed)
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        ids = _uuids(rng, size)
+        types = rng.choice(item_type_ids, size=size).tolist()
+        nodes = rng.choice(node_ids, size=size).tolist()
+        counts = rng.integers(1, 201, size=size).tolist()
+        statuses = np.where(rng.random(size) < 0.8, "Active", "Inactive").tolist()
+        expires = _timestamps(rng, size, days_back=60, days_ahead=60)
+        created = _timestamps(rng, size)
+        yield [{
+            "item_instance_id": ids[i],
+            "item_type_id": types[i],
+            "node_id": nodes[i],
+            "item_count": counts[i],
+            "expire_date": expires[i],
+            "status": statuses[i],
+            "created_at": created[i],
+        } for i in range(size)]
+
+
+def generate_item_transits(count, item_instance_ids, node_ids, seed=0, batch_size=SEED_BATCH_SIZE):
+    """Yield batches of item transit rows (70% delivered, the rest still active)"""
+    rng = np.random.default_rng(seed)
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        instances = rng.choice(item_instance_ids, size=size).tolist()
+        sources = rng.integers(0, len(node_ids), size=size)
+        # Pick a different destination by shifting the source index
+        dests = (sources + rng.integers(1, max(2, len(node_ids)), size=size)) % len(node_ids)
+        delivered = rng.random(size) < 0.7
+        departures = _timestamps(rng, size)
+        arrivals = _timestamps(rng, size)
+        qr_ids = _uuids(rng, size)
+        counts = rng.integers(1, 21, size=size).tolist()
+        phones = rng.integers(100000000, 1000000000, size=size).tolist()
+        yield [{
+            "item_instance_id": instances[i],
+            "source_node_id": node_ids[sources[i]],
+            "dest_node_id": node_ids[dests[i]],
+            "time_departure": departures[i],
+            "time_arrival": arrivals[i] if delivered[i] else None,
+            "courier_name": f"{SEED_TAG} courier",
+            "courier_phone": f"08{phones[i]}",
+            "qr_url": qr_ids[i],
+            "status": "inactive" if delivered[i] else "active",
+            "item_transit_count": counts[i],
+        } for i in range(size)]
+
+
+class StubSeeder:
+    """Rebuilds the stub server's tables at the requested size"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    async def seed(self, session, item_instances, item_transits=None):
+        counts = {
+            "item_instances": item_instances,
+            "item_transits": item_transits if item_transits is not None else item_instances,
+            "nodes": nodes_for_level(item_instances),
+        }
+        async with session.post(f"{self.base_url}/__stub/seed", json=counts) as response:
+            if response.status != 200:
+                raise RuntimeError(f"Stub seeding failed with status {response.status}")
+            payload = await response.json()
+        return payload["data"]["node_ids"]
+
+    async def cleanup(self, session):
+        async with session.post(f"{self.base_url}/__stub/seed", json={}) as response:
+            await response.read()
+
+
+class SupabaseSeeder:
+    """Bulk-inserts generated rows through PostgREST, growing the tables level by level"""
+
+    def __init__(self, supabase_url=None, service_key=None):
+        self.supabase_url = (supabase_url or os.environ.get("NEXT_PUBLIC_SUPABASE_URL", "")).rstrip("/")
+        self.service_key = service_key or os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+        if not self.supabase_url or not self.service_key:
+            raise ValueError("Set NEXT_PUBLIC_SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY to seed Supabase")
+        self.headers = {
+            "apikey": self.service_key,
+            "Authorization": f"Bearer {self.service_key}",
+            "Content-Type": "application/json",
+            "Prefer": "return=minimal",
+        }
+        self.node_ids = []
+        self.item_instance_ids = []
+        self.seeded_instances = 0
+        self.seeded_transits = 0
+
+    async def _insert(self, session, table, rows):
+        async with session.post(f"{self.supabase_url}/rest/v1/{table}", json=rows, headers=self.headers) as response:
+            if response.status >= 300:
+                raise RuntimeError(f"Insert into {table} failed ({response.status}): {await response.text()}")
+
+    async def _item_type_ids(self, session):
+        async with session.get(f"{self.supabase_url}/rest/v1/item_types", params={"select": "item_id"},
+                               headers=self.headers) as response:
+            rows = await response.json()
+        if not rows:
+            raise RuntimeError("Seeding needs at least one existing item type")
+        return [row["item_id"] for row in rows]
+
+    async def seed(self, session, item_instances, item_transits=None):
+        """Insert only the rows missing to reach the requested table sizes"""
+        item_transits = item_transits if item_transits is not None else item_instances
+        if not self.node_ids:
+            nodes = generate_nodes(nodes_for_level(item_instances), seed=1)
+            for start in range(0, len(nodes), SEED_BATCH_SIZE):
+                await self._insert(session, "nodes", nodes[start:start + SEED_BATCH_SIZE])
+            self.node_ids = [node["node_id"] for node in nodes]
+
+        item_type_ids = await self._item_type_ids(session)
+        missing = item_instances - self.seeded_instances
+        if missing > 0:
+            for batch in generate_item_instances(missing, self.node_ids, item_type_ids, seed=self.seeded_instances + 2):
+                await self._insert(session, "item_instances", batch)
+                self.item_instance_ids.extend(row["item_instance_id"] for row in batch)
+            self.seeded_instances = item_instances
+
+        missing = item_transits - self.seeded_transits
+        if missing > 0:
+            for batch in generate_item_transits(missing, self.item_instance_ids, self.node_ids, seed=self.seeded_transits + 3):
+                await self._insert(session, "item_transits", batch)
+            self.seeded_transits = item_transits
+        return self.node_ids
+
+    async def cleanup(self, session):
+        """Delete every seeded transit, item instance and node"""
+        headers = {**self.headers, "Prefer": "return=minimal"}
+        async with session.delete(f"{self.supabase_url}/rest/v1/item_transits",
+                                  params={"courier_name": f"eq.{SEED_TAG} courier"}, headers=headers) as response:
+            await response.read()
+        for start in range(0, len(self.node_ids), 100):
+            node_filter = f"in.({','.join(self.node_ids[start:start + 100])})"
+            async with session.delete(f"{self.supabase_url}/rest/v1/item_instances",
+                                      params={"node_id": node_filter}, headers=headers) as response:
+                await response.read()
+            async with session.delete(f"{self.supabase_url}/rest/v1/nodes",
+                                      params={"node_id": node_filter}, headers=headers) as response:
+                await response.read()
+        self.node_ids, self.item_instance_ids = [], []
+        self.seeded_instances = self.seeded_transits = 0
@@ -0,0 +1,387 @@
+"""
+Distributed Load Workers
+Spreads the load and page testers over several processes (and machines) and merges their results
+
+One Python process runs a single event loop under the GIL, so past a few hundred requests per
+second the client, not the server, becomes the bottleneck. In this mode a coordinator splits the
+virtual users (or the arrival rate, or the page iterations) across worker processes:
+
+- local workers are started as separate processes on this machine (--workers)
+- remote workers connect over a socket from other machines (--remote-workers on the coordinator,
+  --connect on each worker machine); connections are authenticated with a shared key
+
+Messages between coordinator and workers are pickled, so whoever holds the key can run code on
+the other side. There is no default key: the coordinator generates a random one per run, prints
+it when it listens on a non-loopback address, and remote workers must pass it with --authkey.
+
+Every worker streams a snapshot of its latency histograms back every REPORT_INTERVAL seconds and
+a final one when it is done. The coordinator merges them into one LoadTester summary and reports
+per-worker skew: requests, latency, CPU use and event-loop lag of every worker. A worker with a
+saturated CPU or a lagging event loop measures its own queueing, so its latencies are not
+evidence of a slow server.
+
+Usage:
+    python distributed_load.py --workers 4 --users 200 --duration 60
+    python distributed_load.py --workers 8 --mode rate --rps 500
+    python distributed_load.py --workers 2 --kind pages --iterations 30
+    python distributed_load.py --workers 2 --remote-workers 2 --listen 0.0.0.0:6010   # coordinator
+    python distributed_load.py --connect coordinator-host:6010 --authkey <printed key> # each remote machine
+"""
+
+import argparse
+import asyncio
+import ipaddress
+import multiprocessing
+import os
+import queue
+import secrets
+import socket
+import statistics
+import sys
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener, wait
+
+from latency_histogram import HistogramRecorder, LatencyHistogram
+from server_timing import ServerTimingRecorder
+from load_test import BASE_URL, NUM_VIRTUAL_USERS, TARGET_RPS, TEST_DURATION, THINK_TIME, LoadTester
+
+# Configuration
+NUM_WORKERS = os.cpu_count() or 2  # Local worker processes
+LISTEN_ADDRESS = "127.0.0.1:0"  # Coordinator address; use 0.0.0.0:<port> to accept remote workers
+ACCEPT_TIMEOUT = 120  # Seconds the coordinator waits for every worker to connect
+REPORT_INTERVAL = 2  # Seconds between histogram snapshots sent by each worker
+CONNECT_TIMEOUT = 30  # Seconds a remote worker keeps retrying to reach the coordinator
+LOOP_LAG_INTERVAL = 0.05  # Seconds between event-loop lag probes
+LOOP_LAG_WARN_MS = 20  # Worker p99 event-loop lag above this means it could not keep up
+CPU_WARN_PCT = 85  # Worker CPU use above this means it was saturated
+SKEW_WARN_PCT = 25  # Worker p50 further than this from the median worker p50 is flagged
+
+
+def _parse_address(address):
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def _is_loopback(host):
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return host == "localhost"
+
+
+def split_jobs(args, workers):
+    """One job per worker: users and arrival rate are divided, page iterations dealt round-robin"""
+    jobs = []
+    for index in range(workers):
+        job = {"worker": index, "kind": args.kind, "base_url": args.base_url, "duration": args.duration}
+        if args.kind == "pages":
+            job["iterations"] = list(range(1, args.iterations + 1))[index::workers]
+        else:
+            share = args.users // workers + (1 if index < args.users % workers else 0)
+            job.update({"mode": args.mode, "users": max(1, share), "rps": args.rps / workers,
+                        "poisson": args.poisson, "think_time": args.think_time})
+        jobs.append(job)
+    return jobs
+
+
+# --- Worker side ---
+
+async def _probe_event_loop(lag, stop):
+    """Record how late the event loop wakes up; a busy loop delays every timed request too"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        lag.record(max(0.0, (time.perf_counter() - start - LOOP_LAG_INTERVAL) * 1000))
+
+
+async def _run_pages(job):
+    from browser_pool import BROWSER_POOL_SIZE, BrowserPool
+    from performance_test import CONTEXT_MODE, REQUEST_TIMEOUT, RESULTS_DIR, PerformanceTester
+
+    results_path = os.path.join(RESULTS_DIR, f"distributed_pages_{job['run_id']}_worker{job['worker']}.csv")
+    tester = PerformanceTester(base_url=job["base_url"], results_path=results_path)
+    job["tester"] = tester
+    try:
+        async with BrowserPool(size=BROWSER_POOL_SIZE, mode=CONTEXT_MODE, sessions=tester.sessions) as pool:
+            await pool.warm_up([(f"{tester.base_url}{page_info['path']}", page_info.get("role"))
+                                for page_info in tester.pages], timeout_ms=REQUEST_TIMEOUT * 1000)
+            await tester.test_page_load_times(pool, iterations=job["iterations"])
+    finally:
+        tester.save_results()
+
+
+async def _run_job(job, connection):
+    """Run one job while streaming histogram snapshots to the coordinator"""
+    tester = LoadTester(base_url=job["base_url"])
+    tester.keep_samples = False
+    job["tester"] = tester
+    lag = LatencyHistogram()
+    stop = asyncio.Event()
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+
+    def report(message_type):
+        source = job["tester"]
+        elapsed = time.perf_counter() - wall_start
+        connection.send({
+            "type": message_type,
+            "worker": job["worker"],
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "users": job.get("users", len(job.get("iterations", []))),
+            "recorder": source.recorder.to_dict(),
+            "phases": getattr(source, "phases", HistogramRecorder()).to_dict(),
+            "reused": getattr(source, "reused", {}),
+            "server_timing": getattr(source, "server_timing", ServerTimingRecorder()).to_dict(),
+            "loop_lag": lag.to_dict(),
+            "cpu_pct": (time.process_time() - cpu_start) / elapsed * 100 if elapsed else 0,
+            "duration": getattr(source, "duration", 0) or elapsed,
+        })
+
+    async def reporter():
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), REPORT_INTERVAL)
+            except asyncio.TimeoutError:
+                report("progress")
+
+    background = [asyncio.create_task(_probe_event_loop(lag, stop)), asyncio.create_task(reporter())]
+    try:
+        if job["kind"] == "pages":
+            await _run_pages(job)
+        elif job["mode"] == "rate":
+            await tester.run_arrival_rate(job["rps"], job["duration"], job["users"], job["poisson"])
+        else:
+            await tester.run_virtual_users(job["users"], job["duration"], job["think_time"])
+    finally:
+        stop.set()
+        await asyncio.gather(*background)
+        report("done")
+
+
+def run_worker(address, authkey, retry_for=0):
+    """Connect to the coordinator, run the job it sends and stream the results back"""
+    deadline = time.monotonic() + retry_for
+    while True:
+        try:
+            connection = Client(address, authkey=authkey)
+            break
+        except (ConnectionRefusedError, OSError):
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(1)
+    with connection:
+        job = connection.recv()
+        asyncio.run(_run_job(job, connection))
+
+
+# --- Coordinator side ---
+
+class LoadCoordinator:
+    def __init__(self, local_workers=NUM_WORKERS, remote_workers=0, listen=LISTEN_ADDRESS, authkey=None):
+        self.local_workers = local_workers
+        self.remote_workers = remote_workers
+        self.address = _parse_address(listen)
+        self.authkey = (authkey or secrets.token_hex(16)).encode()
+        self.announce_key = authkey is None and not _is_loopback(self.address[0])
+        self.snapshots = {}  # worker index -> latest message from that worker
+
+    @property
+    def total_workers(self):
+        return self.local_workers + self.remote_workers
+
+    def run(self, jobs):
+        """Start local workers, wait for remote ones, hand out the jobs and collect snapshots"""
+        run_id = time.strftime("%Y%m%d_%H%M%S")
+        context = multiprocessing.get_context("spawn")
+        with Listener(self.address, authkey=self.authkey) as listener:
+            processes = [context.Process(target=run_worker, args=(listener.address, self.authkey), daemon=True)
+                         for _ in range(self.local_workers)]
+            for process in processes:
+                process.start()
+            host, port = listener.address
+            if self.announce_key:
+                print(f"  🔑 Generated authkey for this run: {self.authkey.decode()}")
+            if self.remote_workers:
+                key = self.authkey.decode() if self.announce_key else "<key>"
+                print(f"  📡 Waiting for {self.remote_workers} remote workers on {host}:{port} "
+                      f"(run: python distributed_load.py --connect <this-host>:{port} --authkey {key})")
+
+            try:
+                connections = self._accept(listener, processes)
+            except RuntimeError:
+                for process in processes:
+                    process.terminate()
+                raise
+            print(f"  🤝 {len(connections)} workers connected, starting...")
+            for connection, job in zip(connections, jobs):
+                connection.send({**job, "run_id": run_id})
+
+            pending = list(connections)
+            while pending:
+                for connection in wait(pending, timeout=REPORT_INTERVAL * 2):
+                    try:
+                        message = connection.recv()
+                    except EOFError:
+                        pending.remove(connection)
+                        continue
+                    self.snapshots[message["worker"]] = message
+                    if message["type"] == "done":
+                        pending.remove(connection)
+                self._print_progress()
+
+            for connection in connections:
+                connection.close()
+            for process in processes:
+                process.join(timeout=10)
+
+    def _accept(self, listener, processes):
+        """Accept every worker, failing when a local worker dies first or ACCEPT_TIMEOUT passes"""
+        accepted = queue.Queue()
+
+        def accept_all():
+            while True:
+                try:
+                    accepted.put(listener.accept())
+                except AuthenticationError:
+                    print("  ⚠️  Rejected a connection with the wrong authkey")
+                except OSError:
+                    return  # Listener closed
+
+        threading.Thread(target=accept_all, daemon=True).start()
+        deadline = time.monotonic() + ACCEPT_TIMEOUT
+        connections = []
+        while len(connections) < self.total_workers:
+            try:
+                connections.append(accepted.get(timeout=1))
+                continue
+            except queue.Empty:
+                pass
+            dead = [process for process in processes if process.exitcode is not None]
+            if dead:
+                raise RuntimeError(f"{len(dead)} local workers exited before connecting")
+            if time.monotonic() >= deadline:
+                raise RuntimeError(f"Only {len(connections)}/{self.total_workers} workers connected "
+                                   f"within {ACCEPT_TIMEOUT}s")
+        return connections
+
+    def _print_progress(self):
+        recorder = self.merged_recorder()
+        ok = recorder.grouped(lambda key: "OK" if key[2] == "OK" else None).get("OK")
+        if not ok:
+            return
+        done = sum(1 for message in self.snapshots.values() if message["type"] == "done")
+        elapsed = max(message["duration"] for message in self.snapshots.values())
+        print(f"  ⏱️  {recorder.total_count} requests, {recorder.total_count / elapsed:.0f} req/s, "
+              f"p50 {ok.percentile(50):.1f}ms, p95 {ok.percentile(95):.1f}ms ({done}/{self.total_workers} workers done)")
+
+    def merged_recorder(self, field="recorder"):
+        merged = HistogramRecorder()
+        for message in self.snapshots.values():
+            merged.merge(HistogramRecorder.from_dict(message[field]))
+        return merged
+
+    def merged_tester(self, base_url, mode):
+        """A LoadTester holding every worker's merged histograms, so its summary covers the whole run"""
+        tester = LoadTester(base_url=base_url)
+        tester.keep_samples = False
+        tester.mode = f"distributed_{mode}"
+        tester.recorder = self.merged_recorder()
+        tester.phases = self.merged_recorder("phases")
+        for message in self.snapshots.values():
+            for name, (reused, timed) in message["reused"].items():
+                counts = tester.reused.setdefault(name, [0, 0])
+                counts[0] += reused
+                counts[1] += timed
+        for message in self.snapshots.values():
+            tester.server_timing.merge(ServerTimingRecorder.from_dict(message["server_timing"]))
+        tester.duration = max((message["duration"] for message in self.snapshots.values()), default=0)
+        return tester
+
+    def print_worker_skew(self):
+        """Per-worker load, latency and client health, flagging workers that were the bottleneck"""
+        rows = []
+        for index, message in sorted(self.snapshots.items()):
+            recorder = HistogramRecorder.from_dict(message["recorder"])
+            ok = recorder.grouped(lambda key: "OK" if key[2] == "OK" else None).get("OK")
+            lag = LatencyHistogram.from_dict(message["loop_lag"])
+            rows.append((index, message, recorder.total_count, ok, lag))
+
+        worker_p50s = [ok.percentile(50) for _, _, _, ok, _ in rows if ok]
+        median_p50 = statistics.median(worker_p50s) if worker_p50s else 0
+
+        print(f"\n🧵 PER-WORKER SKEW ({len(rows)} workers):")
+        print("-" * 112)
+        print(f"{'Worker':<8} {'Host':<18} {'Users':<7} {'Requests':<9} {'Req/s':<8} {'p50':<8} {'p95':<8} "
+              f"{'CPU %':<7} {'Lag p99':<8} {'Flags'}")
+        print("-" * 112)
+        bottlenecked = 0
+        for index, message, requests, ok, lag in rows:
+            flags = []
+            if message["cpu_pct"] > CPU_WARN_PCT:
+                flags.append("CPU saturated")
+            if lag.count and lag.percentile(99) > LOOP_LAG_WARN_MS:
+                flags.append("event loop lag")
+            if ok and median_p50 and abs(ok.percentile(50) / median_p50 - 1) * 100 > SKEW_WARN_PCT:
+                flags.append(f"p50 {(ok.percentile(50) / median_p50 - 1) * 100:+.0f}% vs workers")
+            bottlenecked += any(flag in ("CPU saturated", "event loop lag") for flag in flags)
+            rate = requests / message["duration"] if message["duration"] else 0
+            p50 = f"{ok.percentile(50):<8.1f}" if ok else f"{'-':<8}"
+            p95 = f"{ok.percentile(95):<8.1f}" if ok else f"{'-':<8}"
+            lag_p99 = lag.percentile(99) if lag.count else 0
+            print(f"{index:<8} {message['host'][:17]:<18} {message['users']:<7} {requests:<9} {rate:<8.1f} {p50} {p95} "
+                  f"{message['cpu_pct']:<7.0f} {lag_p99:<8.1f} {', '.join(flags) or '✅'}")
+
+        if bottlenecked:
+            print(f"\n⚠️  {bottlenecked} workers were client-bound (CPU or event loop); their latencies include "
+                  f"client queueing. Add workers or machines before reading this as server slowness.")
+        else:
+            print("\n✅ No worker was client-bound; latencies reflect the server")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the load or page testers across several worker processes/machines")
+    parser.add_argument("--connect", metavar="HOST:PORT", help="Run as a remote worker of the coordinator at this address")
+    parser.add_argument("--kind", choices=["api", "pages"], default="api",
+                        help="api: load_test.py virtual users / arrival rate, pages: performance_test.py page loads")
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS, help="Local worker processes")
+    parser.add_argument("--remote-workers", type=int, default=0, help="Remote workers to wait for")
+    parser.add_argument("--listen", default=LISTEN_ADDRESS, help="Coordinator address (0.0.0.0:<port> for remote workers)")
+    parser.add_argument("--authkey", help="Shared secret between coordinator and workers (required with --connect; "
+                                           "the coordinator generates one when omitted)")
+    parser.add_argument("--mode", choices=["users", "rate"], default="users")
+    parser.add_argument("--users", type=int, default=NUM_VIRTUAL_USERS, help="Total virtual users, split across workers")
+    parser.add_argument("--rps", type=float, default=TARGET_RPS, help="Total arrival rate for --mode rate")
+    parser.add_argument("--poisson", action="store_true")
+    parser.add_argument("--duration", type=float, default=TEST_DURATION)
+    parser.add_argument("--think-time", type=float, default=THINK_TIME)
+    parser.add_argument("--iterations", type=int, default=30, help="Page iterations for --kind pages")
+    parser.add_argument("--base-url", default=BASE_URL, help="App URL, reachable from every worker machine")
+    args = parser.parse_args()
+
+    if args.connect:
+        if not args.authkey:
+            parser.error("--connect requires --authkey (printed by the coordinator)")
+        print(f"🛰️  Worker connecting to coordinator at {args.connect}...")
+        run_worker(_parse_address(args.connect), args.authkey.encode(), retry_for=CONNECT_TIMEOUT)
+        print("✅ Worker finished")
+        return
+
+    coordinator = LoadCoordinator(args.workers, args.remote_workers, args.listen, args.authkey)
+    print(f"🚀 Distributed {args.kind} test: {coordinator.total_workers} workers against {args.base_url}")
+    try:
+        coordinator.run(split_jobs(args, coordinator.total_workers))
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+
+    tester = coordinator.merged_tester(args.base_url, args.mode if args.kind == "api" else "pages")
+    tester.save_results()
+    tester.print_summary()
+    coordinator.print_worker_skew()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
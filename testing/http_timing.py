@@ -0,0 +1,165 @@
+"""
+HTTP Phase Timing
+Splits every HTTP sample into connect, time-to-first-byte and download phases
+
+A single wall-clock number mixes DNS, TCP connect, request upload, server time and body
+download, and whether the request reused a keep-alive connection changes it a lot. Both HTTP
+clients used by the testers are instrumented with the monotonic perf_counter_ns clock:
+
+- TimedSession: a requests.Session whose urllib3 connections time their own connect() and whose
+  responses carry a `timings` dict (used by performance_test.py and quick_test.py)
+- aiohttp_trace_config(): an aiohttp TraceConfig filling a per-request timing dict passed as
+  trace_request_ctx (used by the async load testers)
+
+Phases (milliseconds):
+    DNS (ms)       name resolution, aiohttp only (requests includes it in Connect)
+    Connect (ms)   opening the connection (TCP and TLS handshake); 0 when the connection was reused
+    TTFB (ms)      request sent until the response headers arrived, i.e. mostly server time
+    Download (ms)  reading the response body
+"""
+
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Per-sample phase columns, shared with the page Navigation Timing columns of the same name
+PHASE_COLUMNS = ["DNS (ms)", "Connect (ms)", "TTFB (ms)", "Download (ms)", "Connection Reused"]
+
+
+def _ms(nanoseconds):
+    return round(nanoseconds / 1_000_000, 3)
+
+
+def phase_row(timings):
+    """Phase columns of a result row from a timings dict (empty values when there are none)"""
+    if not timings:
+        return {column: None for column in PHASE_COLUMNS}
+    return {
+        "DNS (ms)": timings.get("dns_ms"),
+        "Connect (ms)": timings["connect_ms"],
+        "TTFB (ms)": timings["ttfb_ms"],
+        "Download (ms)": timings["download_ms"],
+        "Connection Reused": int(timings["reused"]),
+    }
+
+
+class _TimedConnectionMixin:
+    """Remembers how long connect() took until the first request on the connection claims it"""
+
+    connect_ns = None
+
+    def connect(self):
+        start = time.perf_counter_ns()
+        super().connect()
+        self.connect_ns = time.perf_counter_ns() - start
+
+    def claim_connect_ns(self):
+        """Return the connect time if this is the connection's first request, otherwise None"""
+        connect_ns, self.connect_ns = self.connect_ns, None
+        return connect_ns
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """Transport adapter that attaches a `timings` dict to every response"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _TimedHTTPConnectionPool, "https": _TimedHTTPSConnectionPool}
+
+    def send(self, request, stream=False, **kwargs):
+        start = time.perf_counter_ns()
+        # Always stream so the headers (TTFB) and the body (download) can be timed separately
+        response = super().send(request, stream=True, **kwargs)
+        headers_at = time.perf_counter_ns()
+
+        connection = getattr(response.raw, "_connection", None)
+        connect_ns = connection.claim_connect_ns() if isinstance(connection, _TimedConnectionMixin) else None
+        if not stream:
+            response.content  # Read the body now, as requests does for non-streamed responses
+        end = time.perf_counter_ns()
+
+        response.timings = {
+            "dns_ms": None,
+            "connect_ms": _ms(connect_ns or 0),
+            "ttfb_ms": _ms(headers_at - start - (connect_ns or 0)),
+            "download_ms": _ms(end - headers_at),
+            "total_ms": _ms(end - start),
+            "reused": connect_ns is None,
+        }
+        return response
+
+
+class TimedSession(requests.Session):
+    """requests.Session with keep-alive pooling whose responses carry per-phase timings"""
+
+    def __init__(self):
+        super().__init__()
+        adapter = TimedHTTPAdapter()
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+
+def aiohttp_trace_config():
+    """TraceConfig that fills the dict passed as trace_request_ctx with phase timestamps
+
+    Usage:
+        timing = {}
+        async with session.get(url, trace_request_ctx=timing) as response:
+            body = await response.read()
+        timings = finish_aiohttp_timing(timing)
+    """
+    import aiohttp
+
+    def mark(name):
+        async def handler(session, context, params):
+            if isinstance(context.trace_request_ctx, dict):
+                context.trace_request_ctx.setdefault(name, time.perf_counter_ns())
+        return handler
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(mark("start"))
+    trace_config.on_dns_resolvehost_start.append(mark("dns_start"))
+    trace_config.on_dns_resolvehost_end.append(mark("dns_end"))
+    trace_config.on_connection_create_start.append(mark("connect_start"))
+    trace_config.on_connection_create_end.append(mark("connect_end"))
+    trace_config.on_connection_queued_end.append(mark("queued_end"))
+    trace_config.on_request_end.append(mark("headers"))
+    return trace_config
+
+
+def finish_aiohttp_timing(timing):
+    """Turn the timestamps collected by aiohttp_trace_config() into a timings dict (call after reading the body)"""
+    end = time.perf_counter_ns()
+    if "start" not in timing or "headers" not in timing:
+        return None
+    dns_ns = timing["dns_end"] - timing["dns_start"] if "dns_end" in timing else 0
+    connect_ns = timing["connect_end"] - timing["connect_start"] if "connect_end" in timing else 0
+    # Time queued for a pooled connection is neither connect nor server time
+    request_sent = max(timing.get(name, timing["start"]) for name in ("queued_end", "connect_end"))
+    return {
+        "dns_ms": _ms(dns_ns) if "dns_end" in timing else None,
+        "connect_ms": _ms(connect_ns - dns_ns),
+        "ttfb_ms": _ms(timing["headers"] - request_sent),
+        "download_ms": _ms(end - timing["headers"]),
+        "total_ms": _ms(end - timing["start"]),
+        "reused": "connect_end" not in timing,
+    }
@@ -0,0 +1,232 @@
+"""
+QR Transit Journey Test
+Runs the multi-step QR lifecycle per virtual user and times every step and the whole journey
+
+The hot production path is not a list call but the QR lifecycle a courier goes through:
+
+1. POST /api/qr/create                          node admin generates the QR for an item instance
+2. POST /api/qr/scan/[qrId]                     first scan: stock is taken out and a transit starts
+3. POST /api/qr/scan/[qrId]                     second scan: transit becomes inactive, time_arrival set
+4. POST /api/item-transit/[id]/complete         transit is completed and the item moves node
+
+Each step is declared as a JourneyStep. IDs returned by a step (qr_id, item_transit_id) are
+extracted from its JSON response into the journey context and substituted into later steps.
+A journey stops at its first failing step.
+
+Reports per-step and end-to-end latency percentiles and completed transits per second.
+
+Note: this creates real QR codes and transits and moves stock between nodes. Run it against a
+test database or the offline stub server (stub_server.py), not production.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from load_test import BASE_URL, NUM_VIRTUAL_USERS, TEST_DURATION, LoadTester
+from scenario import lookup
+
+# Configuration
+ITEMS_PER_JOURNEY = 1  # Stock moved by every journey
+CANDIDATE_PAGE_SIZE = 100  # Item instances fetched to pick journey sources from
+
+
+@dataclass
+class JourneyStep:
+    name: str
+    method: str
+    path: str  # Formatted with the journey context, e.g. "/api/qr/scan/{qr_id}"
+    body: Optional[Callable[[dict], dict]] = None  # Builds the JSON body from the journey context
+    extract: dict = field(default_factory=dict)  # Context key -> dotted path in the JSON response
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+QR_TRANSIT_JOURNEY = [
+    JourneyStep("QR Create", "POST", "/api/qr/create",
+                body=lambda ctx: {"item_instance_id": ctx["item_instance_id"], "source_id": ctx["source_id"],
+                                  "destination_id": ctx["destination_id"], "item_count": ctx["item_count"]},
+                extract={"qr_id": "data.qr_id"}),
+    JourneyStep("QR Scan (Pickup)", "POST", "/api/qr/scan/{qr_id}",
+                body=lambda ctx: {"courier_name": ctx["courier_name"], "courier_phone": ctx["courier_phone"]},
+                extract={"item_transit_id": "data.item_transit_id"}),
+    JourneyStep("QR Scan (Delivery)", "POST", "/api/qr/scan/{qr_id}",
+                body=lambda ctx: {"courier_name": ctx["courier_name"], "courier_phone": ctx["courier_phone"]}),
+    JourneyStep("Transit Complete", "POST", "/api/item-transit/{item_transit_id}/complete",
+                body=lambda ctx: {"time_arrival": _now_iso()}),
+]
+
+
+class JourneyTester(LoadTester):
+    def __init__(self, base_url=BASE_URL, steps=None, journey_name="QR Transit Journey"):
+        super().__init__(base_url=base_url)
+        self.steps = steps or QR_TRANSIT_JOURNEY
+        self.journey_name = journey_name
+        self.candidates = []
+        self.node_ids = []
+
+    async def _load_candidates(self, session):
+        """Fetch item instances with stock and the node list to build journey contexts from"""
+        async with session.get(f"{self.base_url}/api/item-instances",
+                               params={"page_size": str(CANDIDATE_PAGE_SIZE), "status": "active"}) as response:
+            payload = await response.json(content_type=None)
+        instances = lookup(payload, "data.item_instances") or []
+        self.candidates = [item for item in instances if (item.get("item_count") or 0) >= ITEMS_PER_JOURNEY]
+
+        async with session.get(f"{self.base_url}/api/nodes") as response:
+            payload = await response.json(content_type=None)
+        nodes = lookup(payload, "data.nodes") or []
+        self.node_ids = [node.get("id") or node.get("node_id") for node in nodes]
+
+        print(f"  📦 {len(self.candidates)} item instances with stock, {len(self.node_ids)} nodes")
+        return bool(self.candidates) and len(self.node_ids) > 1
+
+    def _new_context(self, user_id):
+        item = random.choice(self.candidates)
+        source_id = item.get("node_id")
+        return {
+            "item_instance_id": item.get("id") or item.get("item_instance_id"),
+            "source_id": source_id,
+            "destination_id": random.choice([node for node in self.node_ids if node != source_id]),
+            "item_count": ITEMS_PER_JOURNEY,
+            "courier_name": f"Perf Courier {user_id}",
+            "courier_phone": f"0812{user_id:07d}",
+        }
+
+    async def _run_journey(self, session, user_id):
+        """Run every step in order, threading extracted IDs into the next step"""
+        context = self._new_context(user_id)
+        journey_start = time.perf_counter()
+        for step in self.steps:
+            url = f"{self.base_url}{step.path.format(**context)}"
+            body = step.body(context) if step.body else None
+            start_time = time.perf_counter()
+            try:
+                async with session.request(step.method, url, json=body) as response:
+                    raw = await response.read()
+                    payload = await response.json(content_type=None) if raw else {}
+                step_ms = (time.perf_counter() - start_time) * 1000
+                status = "OK" if response.status < 400 else f"Error {response.status}"
+                for key, path in step.extract.items():
+                    context[key] = lookup(payload, path)
+                    if context[key] is None and status == "OK":
+                        status = f"Missing {key}"
+            except Exception as e:
+                step_ms, raw, status = -1, b"", f"Error: {type(e).__name__}"
+
+            self._record({
+                "Type": "Journey Step",
+                "Name": step.name,
+                "Load Time (ms)": round(step_ms, 2),
+                "Size (KB)": round(len(raw) / 1024, 2),
+                "Status": status,
+                "Virtual User": user_id,
+                "Timestamp": datetime.now().isoformat(),
+            })
+            if status != "OK":
+                break
+
+        self._record({
+            "Type": "Journey",
+            "Name": self.journey_name,
+            "Load Time (ms)": round((time.perf_counter() - journey_start) * 1000, 2),
+            "Size (KB)": 0,
+            "Status": "OK" if status == "OK" else f"Failed at {step.name}",
+            "Virtual User": user_id,
+            "Timestamp": datetime.now().isoformat(),
+        })
+        return status == "OK"
+
+    async def run_journeys(self, num_users=NUM_VIRTUAL_USERS, duration=TEST_DURATION, journeys_per_user=None):
+        """Each virtual user repeats the journey until the duration (or its journey budget) runs out"""
+        self.mode = "journey"
+        budget = f"{journeys_per_user} journeys each" if journeys_per_user else f"{duration}s"
+        print(f"\n🚚 Running '{self.journey_name}' with {num_users} virtual users ({budget})...")
+        connector = self._new_connector()
+        sessions = await self._open_sessions(connector, num_users)
+
+        async def virtual_user(user_id, session):
+            completed = 0
+            while time.perf_counter() < deadline and (journeys_per_user is None or completed < journeys_per_user):
+                await self._run_journey(session, user_id)
+                completed += 1
+
+        try:
+            if not await self._load_candidates(sessions[0]):
+                print("  ❌ Need at least one item instance with stock and two nodes to run journeys")
+                return
+            start = time.perf_counter()
+            deadline = start + duration if journeys_per_user is None else float("inf")
+            await asyncio.gather(*(virtual_user(i, session) for i, session in enumerate(sessions)))
+            self.duration = time.perf_counter() - start
+        finally:
+            await asyncio.gather(*(session.close() for session in sessions))
+            await connector.close()
+
+    def print_summary(self):
+        """Print per-step and end-to-end latency plus completed transit throughput"""
+        if not self.recorder.total_count or not self.duration:
+            print("No results to summarize!")
+            return
+
+        ok = self.recorder.grouped(lambda key: key[:2] if key[2] == "OK" else None)
+        attempts = {key: h.count for key, h in self.recorder.grouped(lambda key: key[:2]).items()}
+        for key, count in self.recorder.failures_by(lambda key: key[:2]).items():
+            attempts[key] = attempts.get(key, 0) + count
+
+        print("\n" + "="*96)
+        print(f"JOURNEY TEST SUMMARY ({self.journey_name}, {self.duration:.1f}s)")
+        print("="*96)
+        print(f"{'Step':<24} {'Requests':<9} {'Errors %':<9} {'Mean':<8} {'p50':<8} {'p90':<8} {'p95':<8} {'p99':<8} {'Max':<8}")
+        print("-" * 96)
+        rows = [("Journey Step", step.name) for step in self.steps] + [("Journey", self.journey_name)]
+        for key in rows:
+            if key not in attempts:
+                continue
+            latencies = ok.get(key)
+            ok_count = latencies.count if latencies else 0
+            error_rate = (attempts[key] - ok_count) / attempts[key] * 100
+            label = "End-to-end" if key[0] == "Journey" else key[1]
+            if latencies:
+                print(f"{label[:23]:<24} {attempts[key]:<9} {error_rate:<9.1f} {latencies.mean:<8.1f} "
+                      f"{latencies.percentile(50):<8.1f} {latencies.percentile(90):<8.1f} {latencies.percentile(95):<8.1f} "
+                      f"{latencies.percentile(99):<8.1f} {latencies.max:<8.1f}")
+            else:
+                print(f"{label[:23]:<24} {attempts[key]:<9} {error_rate:<9.1f} (no successful samples)")
+
+        journey_key = ("Journey", self.journey_name)
+        completed = ok[journey_key].count if journey_key in ok else 0
+        print(f"\n📊 Completed transits: {completed} of {attempts.get(journey_key, 0)} journeys, "
+              f"{completed / self.duration:.2f} transits/s")
+
+        failures = self.recorder.grouped(lambda key: key[2] if key[0] == "Journey" and key[2] != "OK" else None)
+        for reason, histogram in failures.items():
+            if reason is not None:
+                print(f"  ❌ {reason}: {histogram.count} journeys")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="QR transit journey test (create -> pickup scan -> delivery scan -> complete)")
+    parser.add_argument("--users", type=int, default=NUM_VIRTUAL_USERS, help="Concurrent virtual users (couriers)")
+    parser.add_argument("--duration", type=float, default=TEST_DURATION, help="Seconds to keep running journeys")
+    parser.add_argument("--journeys", type=int, help="Run exactly this many journeys per user instead of a duration")
+    parser.add_argument("--base-url", default=BASE_URL)
+    args = parser.parse_args()
+
+    print("🚀 QR Transit Journey Test Starting...")
+    print("⚠️  This creates QR codes and transits and moves stock - use a test database or stub_server.py")
+
+    tester = JourneyTester(base_url=args.base_url)
+    await tester.run_journeys(args.users, args.duration, args.journeys)
+    tester.save_results()
+    tester.print_summary()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,210 @@
+"""
+Streaming Latency Histograms
+Constant-memory latency recording with fixed relative precision (HDR histogram style)
+
+Values are counted in logarithmic buckets whose width grows with the value, so every recorded
+value is reproduced within RELATIVE_PRECISION of itself no matter whether it is 2 ms or 20 s.
+Recording is O(1), memory depends only on the range of values seen (a few hundred buckets for
+typical latencies) and not on the number of samples, and histograms can be merged across
+workers and serialized to JSON.
+
+Mean and standard deviation are tracked exactly alongside the buckets (Welford's algorithm),
+so only percentiles are approximated.
+"""
+
+import json
+import math
+
+# Configuration
+RELATIVE_PRECISION = 0.01  # Width of each bucket relative to its lower bound (1%)
+LOWEST_TRACKABLE_VALUE = 0.001  # Smaller (non-zero) values share the lowest bucket
+
+
+class LatencyHistogram:
+    def __init__(self, precision=RELATIVE_PRECISION, lowest=LOWEST_TRACKABLE_VALUE):
+        self.precision = precision
+        self.lowest = lowest
+        self._log_base = math.log1p(precision)
+        self.buckets = {}  # bucket index -> count
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def _bucket_index(self, value):
+        return int(math.log(max(value, self.lowest) / self.lowest) / self._log_base)
+
+    def _bucket_value(self, index):
+        """Representative value of a bucket (its geometric midpoint)"""
+        return self.lowest * math.exp((index + 0.5) * self._log_base)
+
+    def record(self, value, count=1):
+        """Record a value (e.g. a latency in ms), optionally several times"""
+        if value <= 0:
+            self.zero_count += count
+        else:
+            index = self._bucket_index(value)
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+        # Welford update, generalised to `count` identical values
+        new_count = self.count + count
+        delta = value - self._mean
+        self._mean += delta * count / new_count
+        self._m2 += delta * (value - self._mean) * count
+        self.count = new_count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        """Add another histogram's counts into this one (precision and lowest must match)"""
+        if (other.precision, other.lowest) != (self.precision, self.lowest):
+            raise ValueError("Cannot merge histograms with different precision or lowest value")
+        if other.count == 0:
+            return self
+
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+
+        # Chan et al. parallel combination of mean and M2
+        total = self.count + other.count
+        delta = other._mean - self._mean
+        self._m2 += other._m2 + delta * delta * self.count * other.count / total
+        self._mean += delta * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def mean(self):
+        return self._mean if self.count else 0
+
+    @property
+    def std_dev(self):
+        """Sample standard deviation, matching statistics.stdev"""
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0
+
+    def percentile(self, percentile):
+        """Value at the given percentile (0-100), accurate to the histogram's relative precision"""
+        if self.count == 0:
+            return 0
+        rank = max(1, math.ceil(percentile / 100 * self.count))
+        seen = self.zero_count
+        if rank <= seen:
+            return self.min if self.min < 0 else 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                # Clamp so the extremes are reported exactly
+                return min(max(self._bucket_value(index), self.min), self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            "precision": self.precision,
+            "lowest": self.lowest,
+            "buckets": {str(index): count for index, count in sorted(self.buckets.items())},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "mean": self._mean,
+            "m2": self._m2,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(precision=data["precision"], lowest=data["lowest"])
+        histogram.buckets = {int(index): count for index, count in data["buckets"].items()}
+        histogram.zero_count = data["zero_count"]
+        histogram.count = data["count"]
+        if histogram.count:
+            histogram.min = data["min"]
+            histogram.max = data["max"]
+        histogram._mean = data["mean"]
+        histogram._m2 = data["m2"]
+        return histogram
+
+
+class HistogramRecorder:
+    """Latency histograms keyed by tuples such as (type, name, status)
+
+    Failed samples (negative time, as written by the testers for exceptions) are only
+    counted, so they show up in error counts without distorting the latency distribution.
+    """
+
+    def __init__(self, precision=RELATIVE_PRECISION, lowest=LOWEST_TRACKABLE_VALUE):
+        self.precision = precision
+        self.lowest = lowest
+        self.histograms = {}
+        self.failures = {}
+
+    def record(self, key, value):
+        if value < 0:
+            self.failures[key] = self.failures.get(key, 0) + 1
+            return
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = LatencyHistogram(self.precision, self.lowest)
+        histogram.record(value)
+
+    @property
+    def total_count(self):
+        return sum(h.count for h in self.histograms.values()) + sum(self.failures.values())
+
+    def merge(self, other):
+        for key, histogram in other.histograms.items():
+            if key in self.histograms:
+                self.histograms[key].merge(histogram)
+            else:
+                self.histograms[key] = LatencyHistogram(self.precision, self.lowest).merge(histogram)
+        for key, count in other.failures.items():
+            self.failures[key] = self.failures.get(key, 0) + count
+        return self
+
+    def grouped(self, key_func):
+        """Merge histograms whose keys map to the same group, e.g. all statuses of one test"""
+        groups = {}
+        for key, histogram in self.histograms.items():
+            group = key_func(key)
+            if group not in groups:
+                groups[group] = LatencyHistogram(self.precision, self.lowest)
+            groups[group].merge(histogram)
+        return groups
+
+    def failures_by(self, key_func):
+        counts = {}
+        for key, count in self.failures.items():
+            group = key_func(key)
+            counts[group] = counts.get(group, 0) + count
+        return counts
+
+    def to_dict(self):
+        return {
+            "precision": self.precision,
+            "lowest": self.lowest,
+            "histograms": [{"key": list(key), "histogram": h.to_dict()} for key, h in self.histograms.items()],
+            "failures": [{"key": list(key), "count": count} for key, count in self.failures.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        recorder = cls(precision=data["precision"], lowest=data["lowest"])
+        for entry in data["histograms"]:
+            recorder.histograms[tuple(entry["key"])] = LatencyHistogram.from_dict(entry["histogram"])
+        for entry in data["failures"]:
+            recorder.failures[tuple(entry["key"])] = entry["count"]
+        return recorder
+
+    def save(self, filepath):
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+        return filepath
+
+    @classmethod
+    def load(cls, filepath):
+        with open(filepath, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,259 @@
+"""
+Live Run Metrics
+Rolling per-test throughput, percentiles and errors while a run is in progress
+
+Without this, a run only prints details on its first iteration and stays silent until the
+summary, so a misbehaving run (every request a 401, a page timing out) wastes its whole duration.
+LiveMetrics is fed every sample as it is recorded and offers two views of the same numbers:
+
+- a terminal view, redrawn every REFRESH_SECONDS, with per-test RPS, p50/p95/p99 and errors over
+  the last LIVE_WINDOW_SECONDS plus the totals since the start (--live)
+- an OpenMetrics endpoint on http://127.0.0.1:<port>/metrics (--metrics-port), so a local
+  Prometheus/Grafana can scrape load-test progress and plot it next to the server's own metrics
+
+Exposed metrics, labelled by type (Page/API) and test name:
+
+    loadtest_requests_total{outcome="ok|error"}       counter
+    loadtest_request_duration_seconds                 histogram (successful samples)
+    loadtest_rolling_rps                              gauge, over the rolling window
+    loadtest_rolling_latency_seconds{quantile="..."}  gauge, over the rolling window
+    loadtest_run_info{tool, ...}                      info
+
+A sample is an error when it failed outright (negative latency) or its status is neither OK nor
+an expected outcome ("Expected ..." labels from the scenario).
+"""
+
+import bisect
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from latency_histogram import HistogramRecorder
+
+# Configuration
+LIVE_WINDOW_SECONDS = 30  # Rolling window of the live RPS and percentiles
+REFRESH_SECONDS = 2  # Terminal view redraw interval
+METRICS_HOST = "127.0.0.1"  # Interface the OpenMetrics endpoint listens on
+METRICS_PORT = 9464  # Default port for --metrics-port without a value
+LIVE_PERCENTILES = (50, 95, 99)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # Histogram bounds (seconds)
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+
+def is_error(status, latency_ms):
+    return latency_ms < 0 or not (status == "OK" or str(status).startswith("Expected"))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class LiveMetrics:
+    """Thread-safe sink for samples with a rolling window and cumulative OpenMetrics series"""
+
+    def __init__(self, window=LIVE_WINDOW_SECONDS, **run_labels):
+        self.window = window
+        self.run_labels = run_labels  # e.g. tool="load_test", mode="users"
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._slices = {}  # second since start -> HistogramRecorder of (type, name, outcome)
+        self._totals = {}  # (type, name) -> {"ok", "error", "failed", "sum", "buckets"} since the start
+        self._stop = threading.Event()
+        self._threads = []
+        self._server = None
+
+    def record(self, result):
+        """Count one result row (the dict a tester writes to its results file)"""
+        latency = result["Load Time (ms)"]
+        test = (result["Type"], result["Name"])
+        outcome = "error" if is_error(result["Status"], latency) else "ok"
+        second = int(time.monotonic() - self.started)
+        with self._lock:
+            self._slices.setdefault(second, HistogramRecorder()).record((*test, outcome), latency)
+            for old in [s for s in self._slices if s <= second - self.window]:
+                del self._slices[old]
+            totals = self._totals.setdefault(test, {"ok": 0, "error": 0, "failed": 0, "sum": 0.0,
+                                                    "buckets": [0] * len(DURATION_BUCKETS)})
+            totals[outcome] += 1
+            if latency < 0:
+                totals["failed"] += 1  # No latency, so not in the duration histogram
+                return
+            totals["sum"] += latency / 1000
+            index = bisect.bisect_left(DURATION_BUCKETS, latency / 1000)
+            if index < len(DURATION_BUCKETS):
+                totals["buckets"][index] += 1
+
+    def snapshot(self):
+        """Per-test rolling and cumulative numbers, in first-seen order"""
+        now = time.monotonic() - self.started
+        with self._lock:
+            rolling = HistogramRecorder()
+            for second, recorder in self._slices.items():
+                if second > now - self.window:
+                    rolling.merge(recorder)
+            totals = {test: dict(counts, buckets=list(counts["buckets"])) for test, counts in self._totals.items()}
+        span = min(self.window, max(now, 1))
+        latencies = rolling.grouped(lambda key: key[:2])
+        requests = rolling.grouped(lambda key: key)
+        failed = rolling.failures_by(lambda key: key[:2])
+        rows = []
+        for test, counts in totals.items():
+            ok = requests.get((*test, "ok"))
+            error = requests.get((*test, "error"))
+            window_errors = (error.count if error else 0) + failed.get(test, 0)
+            histogram = latencies.get(test)
+            rows.append({
+                "type": test[0], "name": test[1], "window_errors": window_errors,
+                "rps": ((ok.count if ok else 0) + window_errors) / span,
+                "percentiles": {p: histogram.percentile(p) if histogram else None for p in LIVE_PERCENTILES},
+                **counts,
+            })
+        return rows
+
+    def render(self):
+        """The live view as text"""
+        rows = self.snapshot()
+        elapsed = time.monotonic() - self.started
+        labels = "".join(f", {key} {value}" for key, value in self.run_labels.items())
+        lines = [
+            "=" * 96,
+            f"LIVE METRICS ({elapsed:.0f}s elapsed, rolling {self.window}s window{labels})",
+            "=" * 96,
+            f"{'Test':<36} {'RPS':<7} " + " ".join(f"{'p' + str(p) + ' ms':<9}" for p in LIVE_PERCENTILES)
+            + f" {'Errors':<7} {'Total':<8} {'Total errors':<12}",
+            "-" * 96,
+        ]
+        for row in rows:
+            label = f"{row['type']}: {row['name']}"
+            shown = " ".join(f"{value:<9.1f}" if value is not None else f"{'-':<9}" for value in row["percentiles"].values())
+            lines.append(f"{label[:35]:<36} {row['rps']:<7.1f} {shown} {row['window_errors']:<7} "
+                         f"{row['ok'] + row['error']:<8} {row['error']:<12}{'❌' if row['window_errors'] else ''}".rstrip())
+        if not rows:
+            lines.append("  waiting for the first samples...")
+        total = sum(row["ok"] + row["error"] for row in rows)
+        errors = sum(row["error"] for row in rows)
+        lines.append(f"\n  {total} samples, {errors} errors ({errors / total * 100 if total else 0:.1f}%), "
+                     f"{sum(row['rps'] for row in rows):.1f} samples/s over the window")
+        return "\n".join(lines)
+
+    def openmetrics(self):
+        """Current metrics in the OpenMetrics text format"""
+        rows = self.snapshot()
+        lines = [
+            "# TYPE loadtest_run info",
+            "# HELP loadtest_run Load test run in progress",
+            f"loadtest_run_info{_labels(**self.run_labels)} 1",
+            "# TYPE loadtest_requests counter",
+            "# HELP loadtest_requests Samples recorded, by outcome",
+        ]
+        for row in rows:
+            for outcome in ("ok", "error"):
+                labels = _labels(type=row["type"], name=row["name"], outcome=outcome)
+                lines.append(f"loadtest_requests_total{labels} {row[outcome]}")
+
+        lines += [
+            "# TYPE loadtest_request_duration_seconds histogram",
+            "# UNIT loadtest_request_duration_seconds seconds",
+            "# HELP loadtest_request_duration_seconds Latency of the samples that did not fail outright",
+        ]
+        for row in rows:
+            test = {"type": row["type"], "name": row["name"]}
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS, row["buckets"]):
+                cumulative += count
+                lines.append(f"loadtest_request_duration_seconds_bucket{_labels(**test, le=float(bound))} {cumulative}")
+            timed = row["ok"] + row["error"] - row["failed"]
+            lines.append(f"loadtest_request_duration_seconds_bucket{_labels(**test, le='+Inf')} {timed}")
+            lines.append(f"loadtest_request_duration_seconds_count{_labels(**test)} {timed}")
+            lines.append(f"loadtest_request_duration_seconds_sum{_labels(**test)} {row['sum']:.6f}")
+
+        lines += [
+            "# TYPE loadtest_rolling_rps gauge",
+            f"# HELP loadtest_rolling_rps Samples per second over the last {self.window}s",
+        ]
+        for row in rows:
+            lines.append(f"loadtest_rolling_rps{_labels(type=row['type'], name=row['name'])} {row['rps']:.3f}")
+        lines += [
+            "# TYPE loadtest_rolling_latency_seconds gauge",
+            "# UNIT loadtest_rolling_latency_seconds seconds",
+            f"# HELP loadtest_rolling_latency_seconds Latency percentiles over the last {self.window}s",
+        ]
+        for row in rows:
+            for p, value in row["percentiles"].items():
+                if value is not None:
+                    labels = _labels(type=row["type"], name=row["name"], quantile=p / 100)
+                    lines.append(f"loadtest_rolling_latency_seconds{labels} {value / 1000:.6f}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def _render_loop(self):
+        # On a terminal the view is redrawn in place; piped output gets a new table every refresh
+        clear = "\x1b[2J\x1b[H" if sys.stdout.isatty() else ""
+        while not self._stop.wait(REFRESH_SECONDS):
+            print(clear + self.render(), flush=True)
+
+    def serve(self, port=METRICS_PORT, host=METRICS_HOST):
+        """Expose /metrics on a background HTTP server; returns its URL"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.openmetrics().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes would otherwise interleave with the test output
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return f"http://{host}:{self._server.server_address[1]}/metrics"
+
+    def start(self, view=True, port=None):
+        """Start the terminal view and/or the OpenMetrics endpoint"""
+        if port is not None:
+            print(f"📡 OpenMetrics endpoint: {self.serve(port)}")
+        if view:
+            thread = threading.Thread(target=self._render_loop, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        for thread in self._threads:
+            thread.join(timeout=REFRESH_SECONDS)
+
+
+def add_live_arguments(parser):
+    """Add the --live and --metrics-port options to a test script's parser"""
+    parser.add_argument("--live", action="store_true",
+                        help=f"Show rolling per-test RPS, percentiles and errors, refreshed every {REFRESH_SECONDS}s")
+    parser.add_argument("--metrics-port", type=int, nargs="?", const=METRICS_PORT,
+                        help=f"Serve the live metrics in OpenMetrics format on {METRICS_HOST}:PORT/metrics "
+                             f"(default port {METRICS_PORT})")
+
+
+def start_live_metrics(args, **run_labels):
+    """LiveMetrics started as requested by the parsed --live/--metrics-port options, or None"""
+    if not args.live and args.metrics_port is None:
+        return None
+    return LiveMetrics(**run_labels).start(view=args.live, port=args.metrics_port)
@@ -0,0 +1,358 @@
+"""
+Concurrent Load Testing Script
+Drives the API endpoints with concurrent traffic to measure throughput as well as latency
+
+The sequential tester in performance_test.py only ever has one request in flight, so it
+measures latency of an idle server. This script uses an asyncio HTTP client with a shared
+connection pool and supports two load models:
+
+- users: a closed model with N virtual users, each holding its own authenticated session
+  and issuing requests back to back (optionally with a think time between requests)
+- rate:  an open model that starts requests at a fixed arrival rate (requests per second)
+  regardless of how fast the server answers, spread across the authenticated sessions
+
+Per endpoint it reports achieved RPS, error rate and latency percentiles, plus the connect/TTFB/
+download phases and keep-alive connection reuse traced through aiohttp (http_timing.py).
+"""
+
+import argparse
+import asyncio
+import csv
+import itertools
+import os
+import random
+import time
+from datetime import datetime
+
+import aiohttp
+
+from http_timing import PHASE_COLUMNS, aiohttp_trace_config, finish_aiohttp_timing, phase_row
+from latency_histogram import HistogramRecorder
+from live_metrics import add_live_arguments, start_live_metrics
+from server_timing import SERVER_TIMING_COLUMNS, ServerTimingRecorder, server_timing_row
+
+# Configuration
+BASE_URL = "http://localhost:3001"
+RESULTS_DIR = "results"
+REQUEST_TIMEOUT = 10  # Timeout for all HTTP requests (seconds)
+NUM_VIRTUAL_USERS = 10  # Concurrent virtual users for the closed model
+TARGET_RPS = 20  # Arrival rate for the open model (requests per second)
+TEST_DURATION = 60  # Seconds of measured load
+THINK_TIME = 0  # Seconds each virtual user waits between requests
+MAX_CONNECTIONS = 100  # Size of the shared connection pool
+KEEP_SAMPLES = True  # Keep every raw sample for the CSV export; disable for long high-RPS runs
+
+ADMIN_CREDENTIALS = {"email": "admin.pusat@despro.com", "password": "admin123"}
+
+# Endpoints exercised under load (authenticated list endpoints)
+LOAD_ENDPOINTS = [
+    {"name": "Nodes API", "method": "GET", "endpoint": "/api/nodes"},
+    {"name": "Item Types API", "method": "GET", "endpoint": "/api/item-types"},
+    {"name": "Item Instances API", "method": "GET", "endpoint": "/api/item-instances"},
+    {"name": "Item Transits API", "method": "GET", "endpoint": "/api/item-transits"},
+    {"name": "Users API", "method": "GET", "endpoint": "/api/user"},
+    {"name": "Reports API", "method": "GET", "endpoint": "/api/reports"},
+    {"name": "Recipes API", "method": "GET", "endpoint": "/api/recipes"},
+]
+
+
+class LoadTester:
+    def __init__(self, base_url=BASE_URL, endpoints=None, credentials=None):
+        self.base_url = base_url
+        self.endpoints = endpoints or LOAD_ENDPOINTS
+        self.credentials = credentials or ADMIN_CREDENTIALS
+        self.results = []
+        self.keep_samples = KEEP_SAMPLES
+        self.live = None  # LiveMetrics fed every sample while the run is in progress
+        self.recorder = HistogramRecorder()  # Latencies per (type, name, status)
+        self.phases = HistogramRecorder()  # Connection phases per (name, phase)
+        self.reused = {}  # name -> [requests on a reused connection, requests with phase timings]
+        self.server_timing = ServerTimingRecorder()  # Server time vs overhead per name
+        self.duration = 0
+        self.mode = None
+        if not os.path.exists(RESULTS_DIR):
+            os.makedirs(RESULTS_DIR)
+
+    def _new_connector(self):
+        """Create the connection pool shared by every virtual user session"""
+        return aiohttp.TCPConnector(limit=MAX_CONNECTIONS, limit_per_host=MAX_CONNECTIONS)
+
+    async def _open_sessions(self, connector, count):
+        """Open and authenticate one session (own cookie jar) per virtual user"""
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        sessions = []
+        for _ in range(count):
+            session = aiohttp.ClientSession(
+                connector=connector,
+                connector_owner=False,
+                timeout=timeout,
+                cookie_jar=aiohttp.CookieJar(unsafe=True),
+                trace_configs=[aiohttp_trace_config()],
+            )
+            sessions.append(session)
+
+        async def login(session):
+            try:
+                async with session.post(f"{self.base_url}/api/login", json=self.credentials) as response:
+                    await response.read()
+                    return response.status in [200, 201]
+            except Exception:
+                return False
+
+        logins = await asyncio.gather(*(login(session) for session in sessions))
+        authenticated = sum(logins)
+        print(f"  🔐 Authenticated {authenticated}/{count} virtual users")
+        if authenticated == 0:
+            print("  ❌ No virtual user could log in, protected endpoints will report auth errors")
+        return sessions
+
+    async def _send(self, session, api_info, user_id, scheduled_start=None):
+        """Issue one request and record its latency
+
+        In the open model latency is measured from the scheduled start time, so time
+        spent waiting for a free pooled connection counts against the server, which
+        avoids hiding queueing delay (coordinated omission).
+        """
+        url = f"{self.base_url}{api_info['endpoint']}"
+        start_time = scheduled_start if scheduled_start is not None else time.perf_counter()
+        timing = {}
+        try:
+            async with session.request(api_info.get("method", "GET"), url, json=api_info.get("data"),
+                                       trace_request_ctx=timing) as response:
+                body = await response.read()
+            response_time_ms = (time.perf_counter() - start_time) * 1000
+            timings = finish_aiohttp_timing(timing)
+            server_timing = server_timing_row(response.headers)
+
+            if response.status < 400:
+                status = "OK"
+            elif response.status in [401, 403]:
+                status = f"Auth Issue ({response.status})"
+            else:
+                status = f"Error {response.status}"
+
+            self._record({
+                "Type": "API",
+                "Name": api_info["name"],
+                "Load Time (ms)": round(response_time_ms, 2),
+                "Size (KB)": round(len(body) / 1024, 2),
+                "Status": status,
+                "Virtual User": user_id,
+                "Timestamp": datetime.now().isoformat(),
+                **phase_row(timings),
+                **server_timing,
+            })
+        except Exception as e:
+            self._record({
+                "Type": "API",
+                "Name": api_info["name"],
+                "Load Time (ms)": -1,
+                "Size (KB)": -1,
+                "Status": f"Error: {type(e).__name__}",
+                "Virtual User": user_id,
+                "Timestamp": datetime.now().isoformat(),
+            })
+
+    async def run_virtual_users(self, num_users=NUM_VIRTUAL_USERS, duration=TEST_DURATION, think_time=THINK_TIME):
+        """Closed model: each virtual user sends its next request once the previous one completes"""
+        self.mode = "users"
+        print(f"\n👥 Running {num_users} virtual users for {duration}s...")
+        connector = self._new_connector()
+        sessions = await self._open_sessions(connector, num_users)
+
+        async def virtual_user(user_id, session):
+            # Each user starts at a different endpoint so the mix stays even
+            endpoints = itertools.islice(itertools.cycle(self.endpoints), user_id, None)
+            for api_info in endpoints:
+                if time.perf_counter() >= deadline:
+                    break
+                await self._send(session, api_info, user_id)
+                if think_time:
+                    await asyncio.sleep(think_time)
+
+        start = time.perf_counter()
+        deadline = start + duration
+        try:
+            await asyncio.gather(*(virtual_user(i, session) for i, session in enumerate(sessions)))
+        finally:
+            self.duration = time.perf_counter() - start
+            await asyncio.gather(*(session.close() for session in sessions))
+            await connector.close()
+
+    async def run_arrival_rate(self, rps=TARGET_RPS, duration=TEST_DURATION, num_users=NUM_VIRTUAL_USERS, poisson=False):
+        """Open model: start requests at a fixed rate independent of server response times"""
+        self.mode = "rate"
+        arrivals = "Poisson" if poisson else "constant"
+        print(f"\n📈 Running {rps} req/s ({arrivals} arrivals) for {duration}s across {num_users} sessions...")
+        connector = self._new_connector()
+        sessions = await self._open_sessions(connector, num_users)
+
+        in_flight = set()
+        endpoints = itertools.cycle(self.endpoints)
+        start = time.perf_counter()
+        next_arrival = start
+        request_number = 0
+        try:
+            while next_arrival < start + duration:
+                delay = next_arrival - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                user_id = request_number % len(sessions)
+                task = asyncio.create_task(self._send(sessions[user_id], next(endpoints), user_id, scheduled_start=next_arrival))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+                request_number += 1
+                next_arrival += random.expovariate(rps) if poisson else 1 / rps
+
+            # Let outstanding requests finish so slow responses are not dropped from the stats
+            if in_flight:
+                await asyncio.gather(*in_flight)
+        finally:
+            self.duration = time.perf_counter() - start
+            await asyncio.gather(*(session.close() for session in sessions))
+            await connector.close()
+
+    def _record(self, result):
+        """Record one sample into the latency histograms (and the raw list if samples are kept)"""
+        self.recorder.record((result["Type"], result["Name"], result["Status"]), result["Load Time (ms)"])
+        if result.get("TTFB (ms)") is not None:
+            counts = self.reused.setdefault(result["Name"], [0, 0])
+            counts[0] += result["Connection Reused"]
+            counts[1] += 1
+            if not result["Connection Reused"]:
+                self.phases.record((result["Name"], "Connect (ms)"), result["Connect (ms)"])
+            self.phases.record((result["Name"], "TTFB (ms)"), result["TTFB (ms)"])
+            self.phases.record((result["Name"], "Download (ms)"), result["Download (ms)"])
+        self.server_timing.record(result)
+        if self.live:
+            self.live.record(result)
+        if self.keep_samples:
+            self.results.append(result)
+
+    def save_results(self, filename=None):
+        """Save every load test sample to CSV, plus the serialized histograms next to it"""
+        if not self.recorder.total_count:
+            print("No results to save!")
+            return
+
+        if filename is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"load_test_results_{self.mode}_{timestamp}.csv"
+        filepath = os.path.join(RESULTS_DIR, filename)
+
+        histogram_path = self.recorder.save(filepath.replace(".csv", "_histograms.json"))
+        print(f"Histograms saved to {histogram_path}")
+        if not self.results:
+            return histogram_path
+
+        fieldnames = ["Type", "Name", "Load Time (ms)", "Size (KB)", "Status", "Virtual User", "Timestamp"] + PHASE_COLUMNS + SERVER_TIMING_COLUMNS
+        with open(filepath, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(self.results)
+
+        print(f"Results saved to {filepath}")
+        return filepath
+
+    def calculate_statistics(self):
+        """Calculate throughput, error rate and latency percentiles per endpoint"""
+        if not self.recorder.total_count or not self.duration:
+            return {}
+
+        # Latency percentiles only cover successful responses; everything else counts as an error
+        ok_latencies = self.recorder.grouped(lambda key: key[1] if key[2] == "OK" else None)
+        requests_per_name = {name: h.count for name, h in self.recorder.grouped(lambda key: key[1]).items()}
+        for name, count in self.recorder.failures_by(lambda key: key[1]).items():
+            requests_per_name[name] = requests_per_name.get(name, 0) + count
+
+        stats = {}
+        for name, requests in requests_per_name.items():
+            latencies = ok_latencies.get(name)
+            ok_count = latencies.count if latencies else 0
+            stats[name] = {
+                "requests": requests,
+                "rps": requests / self.duration,
+                "error_rate": (requests - ok_count) / requests * 100,
+                "mean": latencies.mean if latencies else 0,
+                "p50": latencies.percentile(50) if latencies else 0,
+                "p90": latencies.percentile(90) if latencies else 0,
+                "p95": latencies.percentile(95) if latencies else 0,
+                "p99": latencies.percentile(99) if latencies else 0,
+                "max": latencies.max if latencies else 0,
+            }
+        return stats
+
+    def print_summary(self):
+        """Print per-endpoint throughput and latency under load"""
+        stats = self.calculate_statistics()
+        if not stats:
+            print("No results to summarize!")
+            return
+
+        print("\n" + "="*96)
+        print(f"LOAD TEST SUMMARY ({self.mode} mode, {self.duration:.1f}s)")
+        print("="*96)
+        print(f"{'API Name':<24} {'Requests':<9} {'RPS':<8} {'Errors %':<9} {'Mean':<8} {'p50':<8} {'p90':<8} {'p95':<8} {'p99':<8} {'Max':<8}")
+        print("-" * 96)
+        for name, stat in sorted(stats.items(), key=lambda item: item[1]["p95"]):
+            print(f"{name[:23]:<24} {stat['requests']:<9} {stat['rps']:<8.1f} {stat['error_rate']:<9.1f} {stat['mean']:<8.1f} {stat['p50']:<8.1f} {stat['p90']:<8.1f} {stat['p95']:<8.1f} {stat['p99']:<8.1f} {stat['max']:<8.1f}")
+
+        if self.reused:
+            print("\n🔌 Connection phases (p50 ms; connect only counts new connections):")
+            print(f"{'API Name':<24} {'Reused %':<9} {'Connect':<9} {'TTFB':<9} {'TTFB p95':<9} {'Download':<9}")
+            for name, (reused, timed) in self.reused.items():
+                cells = []
+                for column, percentile in (("Connect (ms)", 50), ("TTFB (ms)", 50), ("TTFB (ms)", 95), ("Download (ms)", 50)):
+                    histogram = self.phases.histograms.get((name, column))
+                    cells.append(f"{histogram.percentile(percentile):<9.1f}" if histogram else f"{'-':<9}")
+                print(f"{name[:23]:<24} {reused / timed * 100:<9.0f} " + " ".join(cells))
+
+        self.server_timing.print_summary()
+
+        total_requests = sum(stat["requests"] for stat in stats.values())
+        total_errors = sum(stat["requests"] * stat["error_rate"] / 100 for stat in stats.values())
+        print(f"\n📊 OVERALL: {total_requests} requests, {total_requests / self.duration:.1f} req/s achieved, "
+              f"{total_errors / total_requests * 100:.1f}% errors")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test for the API endpoints")
+    parser.add_argument("--mode", choices=["users", "rate"], default="users",
+                        help="users: closed model with virtual users, rate: open model with a fixed arrival rate")
+    parser.add_argument("--users", type=int, default=NUM_VIRTUAL_USERS, help="Number of virtual users / sessions")
+    parser.add_argument("--rps", type=float, default=TARGET_RPS, help="Arrival rate for --mode rate")
+    parser.add_argument("--poisson", action="store_true", help="Use Poisson instead of evenly spaced arrivals")
+    parser.add_argument("--duration", type=float, default=TEST_DURATION, help="Seconds of load")
+    parser.add_argument("--think-time", type=float, default=THINK_TIME, help="Pause between requests per virtual user")
+    parser.add_argument("--base-url", default=BASE_URL)
+    add_live_arguments(parser)
+    args = parser.parse_args()
+
+    print("🚀 Load Test Starting...")
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)) as session:
+            async with session.get(args.base_url):
+                pass
+        print(f"✅ Server is running at {args.base_url}")
+    except Exception:
+        print(f"❌ Server is not responding at {args.base_url}")
+        print("Please start your Next.js app with: npx next start -p 3001")
+        return
+
+    tester = LoadTester(base_url=args.base_url)
+    tester.live = start_live_metrics(args, tool="load_test", mode=args.mode)
+    try:
+        if args.mode == "users":
+            await tester.run_virtual_users(args.users, args.duration, args.think_time)
+        else:
+            await tester.run_arrival_rate(args.rps, args.duration, args.users, args.poisson)
+    finally:
+        if tester.live:
+            tester.live.stop()
+
+    tester.save_results()
+    tester.print_summary()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,379 @@
+"""
+Middleware Overhead Test
+Isolates the per-request cost of the updateSession middleware and how it grows with concurrency
+
+middleware.ts runs updateSession (utils/supabase/middleware.ts) on every path its matcher does
+not exclude: every page, every /api/* call and /qr-placeholder/[id], i.e. the hottest routes.
+updateSession builds a Supabase server client and calls auth.getUser(), and what that costs
+depends on the auth cookie the request carries:
+
+    none       no session: getUser() returns without a network call
+    valid      a logged-in session: getUser() asks Supabase Auth for the user (one round trip)
+    expiring   a session about to expire (inside supabase-js' refresh margin): the token is
+               refreshed first, a second round trip, and the new cookies are written back
+
+Every target path is loaded by the same number of closed-loop virtual users for the same time in
+every cookie state and at every concurrency level, so cells differ only in path and cookie. The
+targets are classified with the matcher's own pattern: excluded paths (a /_next/static chunk,
+/icon.png) never run the middleware and give the floor, matched paths pay it on top of their work.
+
+The middleware cost per request is read two ways, per concurrency level:
+
+- directly, from the mw Server-Timing metric middleware.ts appends to every matched response
+  when the app runs with SERVER_TIMING=1
+- by difference, as the latency of a matched path with a session minus the same path without one,
+  which still works where Server-Timing is off or stripped (only for paths answering alike in
+  both states)
+
+together with the throughput the matched paths lose against the no-session run.
+
+Usage:
+    python middleware_overhead_test.py                              # 1, 10 and 50 users, 10 s per cell
+    python middleware_overhead_test.py --concurrency 1 5 20 --duration 20 --states none valid
+    python middleware_overhead_test.py --paths /api/nodes /qr-placeholder/test --role admin_node
+"""
+
+import argparse
+import asyncio
+import csv
+import os
+import re
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import aiohttp
+from yarl import URL
+
+from auth_sessions import MIDDLEWARE_MATCHER, ROLE_CREDENTIALS, with_token_expiry
+from http_timing import PHASE_COLUMNS, aiohttp_trace_config, finish_aiohttp_timing, phase_row
+from latency_histogram import HistogramRecorder
+from load_test import BASE_URL, REQUEST_TIMEOUT, RESULTS_DIR, LoadTester
+from server_timing import SERVER_TIMING_COLUMNS, server_timing_row
+
+# Configuration
+CONCURRENCY_LEVELS = (1, 10, 50)  # Virtual users per cell
+CELL_DURATION = 10  # Seconds of measured load per (concurrency, cookie state, path) cell
+COOKIE_STATES = ("none", "valid", "expiring")
+EXPIRING_IN = 10  # Seconds to expiry written into the "expiring" session before every request
+STATIC_CHUNK_PAGE = "/login"  # Page whose first /_next/static script becomes the static target
+
+# Paths loaded in every cell; the static chunk's path is read from STATIC_CHUNK_PAGE
+MIDDLEWARE_TARGETS = [
+    {"name": "Static chunk", "endpoint": None},
+    {"name": "Icon", "endpoint": "/icon.png"},
+    {"name": "QR placeholder", "endpoint": "/qr-placeholder/perf-test"},
+    {"name": "Nodes API", "endpoint": "/api/nodes?page_size=10"},
+    {"name": "Login page", "endpoint": "/login"},
+]
+
+_STATIC_CHUNK = re.compile(r"""(/_next/static/[^"'\s>]+\.js)""")
+
+
+def path_class(endpoint):
+    """"matched" when middleware.ts runs on the path, "excluded" otherwise"""
+    return "matched" if MIDDLEWARE_MATCHER.match(urlsplit(endpoint).path) else "excluded"
+
+
+class MiddlewareOverheadTester(LoadTester):
+    def __init__(self, base_url=BASE_URL, credentials=None, targets=None, duration=CELL_DURATION):
+        super().__init__(base_url=base_url, credentials=credentials)
+        self.targets = [dict(target) for target in (targets or MIDDLEWARE_TARGETS)]
+        self.cell_duration = duration
+        self.mode = "middleware"
+        self.cells = HistogramRecorder()  # (users, cookie, target, "latency" or "mw") -> ms
+        self.statuses = {}  # (users, cookie, target) -> Counter of status codes
+        self.seconds = {}  # (users, cookie, target) -> measured seconds
+        self.unexpired = 0  # "expiring" requests sent without an auth cookie to rewrite
+
+    async def _discover_static_chunk(self, session):
+        """Fill in the static chunk target from the script tags of STATIC_CHUNK_PAGE"""
+        for target in self.targets:
+            if target["endpoint"] is not None:
+                continue
+            try:
+                async with session.get(f"{self.base_url}{STATIC_CHUNK_PAGE}") as response:
+                    html = await response.text()
+                match = _STATIC_CHUNK.search(html)
+            except Exception:
+                match = None
+            if match:
+                target["endpoint"] = match.group(1)
+            else:
+                print(f"  ℹ️  No /_next/static script on {STATIC_CHUNK_PAGE}, skipping {target['name']}")
+        self.targets = [target for target in self.targets if target["endpoint"]]
+
+    def _anonymous_sessions(self, connector, count):
+        """Sessions that never send or store cookies, for the "none" state"""
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        return [aiohttp.ClientSession(connector=connector, connector_owner=False, timeout=timeout,
+                                      cookie_jar=aiohttp.DummyCookieJar(), trace_configs=[aiohttp_trace_config()])
+                for _ in range(count)]
+
+    def _expire(self, session):
+        """Move the session's token to EXPIRING_IN seconds before expiry, so the middleware refreshes it"""
+        cookies = [{"name": morsel.key, "value": morsel.value} for morsel in session.cookie_jar]
+        rewritten = with_token_expiry(cookies, time.time() + EXPIRING_IN)
+        if not rewritten:
+            self.unexpired += 1
+            return
+        session.cookie_jar.update_cookies(rewritten, response_url=URL(self.base_url))
+
+    async def _hit(self, session, target, cookie, users, user_id, record=True):
+        """Request a target once (no redirects followed) and record it in its cell"""
+        if cookie == "expiring":
+            self._expire(session)
+        cell = (users, cookie, target["name"])
+        start_time = time.perf_counter()
+        timing = {}
+        try:
+            async with session.get(f"{self.base_url}{target['endpoint']}", allow_redirects=False,
+                                   trace_request_ctx=timing) as response:
+                body = await response.read()
+            response_time_ms = (time.perf_counter() - start_time) * 1000
+            if not record:
+                return
+            server_timing = server_timing_row(response.headers)
+            if response.status < 400:
+                status = "OK"
+            elif response.status in [401, 403]:
+                status = f"Auth Issue ({response.status})"  # Expected on protected routes without a session
+            else:
+                status = f"Error {response.status}"
+            self.statuses.setdefault(cell, Counter())[response.status] += 1
+            # 4xx answers are the route's normal reply to this cookie state, only 5xx count as failures
+            self.cells.record((*cell, "latency"), response_time_ms if response.status < 500 else -1)
+            if server_timing["Middleware (ms)"] is not None:
+                self.cells.record((*cell, "mw"), server_timing["Middleware (ms)"])
+            self._record({
+                "Type": "Middleware",
+                "Name": target["name"],
+                "Path": target["endpoint"],
+                "Path Class": path_class(target["endpoint"]),
+                "Cookie": cookie,
+                "Concurrency": users,
+                "Load Time (ms)": round(response_time_ms, 2),
+                "Size (KB)": round(len(body) / 1024, 2),
+                "Status": status,
+                "Virtual User": user_id,
+                "Timestamp": datetime.now().isoformat(),
+                **phase_row(finish_aiohttp_timing(timing)),
+                **server_timing,
+            })
+        except Exception as e:
+            if not record:
+                return
+            self.statuses.setdefault(cell, Counter())[None] += 1
+            self.cells.record((*cell, "latency"), -1)
+            self._record({
+                "Type": "Middleware",
+                "Name": target["name"],
+                "Path": target["endpoint"],
+                "Path Class": path_class(target["endpoint"]),
+                "Cookie": cookie,
+                "Concurrency": users,
+                "Load Time (ms)": -1,
+                "Size (KB)": -1,
+                "Status": f"Error: {type(e).__name__}",
+                "Virtual User": user_id,
+                "Timestamp": datetime.now().isoformat(),
+            })
+
+    async def _run_cell(self, sessions, target, cookie):
+        """Closed model: every session requests the target back to back for the cell duration"""
+        users = len(sessions)
+        # One unmeasured request per user opens its pooled connection first
+        await asyncio.gather(*(self._hit(session, target, cookie, users, i, record=False)
+                               for i, session in enumerate(sessions)))
+
+        async def virtual_user(user_id, session):
+            while time.perf_counter() < deadline:
+                await self._hit(session, target, cookie, users, user_id)
+
+        start = time.perf_counter()
+        deadline = start + self.cell_duration
+        await asyncio.gather(*(virtual_user(i, session) for i, session in enumerate(sessions)))
+        self.seconds[(users, cookie, target["name"])] = time.perf_counter() - start
+
+    async def run(self, levels=CONCURRENCY_LEVELS, cookies=COOKIE_STATES):
+        start = time.perf_counter()
+        connector = self._new_connector()
+        try:
+            async with aiohttp.ClientSession(connector=connector, connector_owner=False) as probe:
+                await self._discover_static_chunk(probe)
+            cells = len(levels) * len(cookies) * len(self.targets)
+            print(f"\n🧅 {cells} cells of {self.cell_duration}s: {len(self.targets)} paths x {len(cookies)} cookie states "
+                  f"x {len(levels)} concurrency levels")
+            for target in self.targets:
+                print(f"  {path_class(target['endpoint']):<9} {target['name']:<16} {target['endpoint']}")
+
+            for users in levels:
+                print(f"\n👥 {users} virtual users")
+                anonymous = self._anonymous_sessions(connector, users) if "none" in cookies else []
+                logged_in = await self._open_sessions(connector, users) if set(cookies) - {"none"} else []
+                try:
+                    for cookie in cookies:
+                        sessions = anonymous if cookie == "none" else logged_in
+                        for target in self.targets:
+                            await self._run_cell(sessions, target, cookie)
+                            cell = (users, cookie, target["name"])
+                            latency = self.cells.histograms.get((*cell, "latency"))
+                            print(f"  🍪 {cookie:<9} {target['name']:<16} "
+                                  f"{latency.count / self.seconds[cell] if latency else 0:>7.1f} req/s, "
+                                  f"p50 {latency.percentile(50) if latency else 0:.1f}ms")
+                finally:
+                    await asyncio.gather(*(session.close() for session in anonymous + logged_in))
+        finally:
+            self.duration = time.perf_counter() - start
+            await connector.close()
+
+    def _cell(self, users, cookie, name, metric="latency", percentile=50):
+        histogram = self.cells.histograms.get((users, cookie, name, metric))
+        return histogram.percentile(percentile) if histogram else None
+
+    def _rps(self, users, cookie, name):
+        histogram = self.cells.histograms.get((users, cookie, name, "latency"))
+        seconds = self.seconds.get((users, cookie, name))
+        return histogram.count / seconds if histogram and seconds else None
+
+    def _merged(self, users, cookie, names, metric="latency"):
+        """One histogram over several targets of a cell row, None when nothing was recorded"""
+        return self.cells.grouped(lambda key: key[:2] == (users, cookie) and key[2] in names and key[3] == metric).get(True)
+
+    def _comparable(self, users, cookie, name):
+        """Whether the path answers with the same status with this cookie as without one"""
+        with_cookie = self.statuses.get((users, cookie, name))
+        without = self.statuses.get((users, "none", name))
+        return bool(with_cookie and without) and with_cookie.most_common(1)[0][0] == without.most_common(1)[0][0]
+
+    def print_summary(self):
+        """Per-cell latency and throughput, then the middleware cost per request by concurrency"""
+        if not self.seconds:
+            print("No results to summarize!")
+            return
+
+        def shown(value, width, fmt=".1f"):
+            return f"{value:<{width}{fmt}}" if value is not None else f"{'-':<{width}}"
+
+        levels = sorted({users for users, _, _ in self.seconds})
+        cookies = [cookie for cookie in COOKIE_STATES if any(key[1] == cookie for key in self.seconds)]
+        classes = {target["name"]: path_class(target["endpoint"]) for target in self.targets}
+
+        print("\n" + "=" * 96)
+        print(f"MIDDLEWARE OVERHEAD BY CELL ({self.cell_duration}s per cell, latency in ms)")
+        print("=" * 96)
+        print(f"{'Users':<6} {'Cookie':<9} {'Target':<15} {'Path':<9} {'Requests':<9} {'RPS':<8} {'p50':<8} "
+              f"{'p95':<8} {'mw p50':<8} {'mw p95':<8}")
+        print("-" * 96)
+        for users in levels:
+            for cookie in cookies:
+                for name, path in classes.items():
+                    if (users, cookie, name) not in self.seconds:
+                        continue
+                    statuses = self.statuses.get((users, cookie, name), Counter())
+                    print(f"{users:<6} {cookie:<9} {name[:14]:<15} {path:<9} {sum(statuses.values()):<9} "
+                          f"{shown(self._rps(users, cookie, name), 8)} {shown(self._cell(users, cookie, name), 8)} "
+                          f"{shown(self._cell(users, cookie, name, percentile=95), 8)} "
+                          f"{shown(self._cell(users, cookie, name, 'mw'), 8)} "
+                          f"{shown(self._cell(users, cookie, name, 'mw', 95), 8)}")
+
+        matched = [name for name, path in classes.items() if path == "matched"]
+        excluded = [name for name, path in classes.items() if path == "excluded"]
+        print("\n" + "=" * 96)
+        print("MIDDLEWARE COST PER REQUEST (matched paths, Δ and RPS vs the same path without a cookie)")
+        print("=" * 96)
+        print(f"{'Users':<6} {'Cookie':<9} {'mw p50':<8} {'mw p95':<8} {'Δ p50':<8} {'Δ p95':<8} "
+              f"{'RPS vs none':<12} {'Excluded p50 (floor)':<20}")
+        print("-" * 96)
+        scaling = {}
+        for users in levels:
+            for cookie in cookies:
+                mw = self._merged(users, cookie, matched, "mw")
+                if mw and mw.count:
+                    scaling.setdefault(cookie, []).append((users, mw.percentile(50)))
+                deltas = {percentile: [self._cell(users, cookie, name, percentile=percentile)
+                                       - self._cell(users, "none", name, percentile=percentile)
+                                       for name in matched if cookie != "none" and self._comparable(users, cookie, name)
+                                       and self._cell(users, cookie, name) is not None]
+                          for percentile in (50, 95)}
+                changes = [self._rps(users, cookie, name) / self._rps(users, "none", name) - 1 for name in matched
+                           if cookie != "none" and self._comparable(users, cookie, name) and self._rps(users, cookie, name)
+                           and self._rps(users, "none", name)]
+                rps_change = f"{sum(changes) / len(changes) * 100:+.1f}%" if changes else "-"
+                floor = self._merged(users, cookie, excluded)
+                print(f"{users:<6} {cookie:<9} {shown(mw.percentile(50) if mw else None, 8)} "
+                      f"{shown(mw.percentile(95) if mw else None, 8)} "
+                      f"{shown(sum(deltas[50]) / len(deltas[50]) if deltas[50] else None, 8)} "
+                      f"{shown(sum(deltas[95]) / len(deltas[95]) if deltas[95] else None, 8)} "
+                      f"{rps_change:<12} {shown(floor.percentile(50) if floor else None, 20)}")
+
+        if scaling:
+            print("\n📈 Middleware time (mw p50) as concurrency grows:")
+            for cookie, points in scaling.items():
+                curve = " -> ".join(f"{value:.1f}ms@{users}" for users, value in points)
+                (first_users, first), (last_users, last) = points[0], points[-1]
+                growth = f" (x{last / first:.1f} from {first_users} to {last_users} users)" if first and len(points) > 1 else ""
+                print(f"  {cookie:<9} {curve}{growth}")
+        elif matched:
+            print("\nℹ️  No mw Server-Timing on the matched paths (middleware.ts), only the Δ columns estimate the cost")
+
+        leaking = sorted({key[2] for key in self.cells.histograms if key[3] == "mw" and key[2] in excluded})
+        if leaking:
+            print(f"\n⚠️  Excluded paths reported middleware time, check the matcher: {', '.join(leaking)}")
+        incomparable = sorted({name for users in levels for cookie in cookies if cookie != "none"
+                               for name in matched if (users, cookie, name) in self.seconds
+                               and (users, "none", name) in self.seconds and not self._comparable(users, cookie, name)})
+        if incomparable:
+            print(f"ℹ️  Left out of Δ (answer differently without a session): {', '.join(incomparable)}")
+        if self.unexpired:
+            print(f"⚠️  {self.unexpired} expiring requests had no auth cookie to expire (did the logins fail?)")
+        failures = self.cells.failures_by(lambda key: key[:3])
+        if failures:
+            print("\n❌ Failed or 5xx responses: "
+                  + ", ".join(f"{name} ({cookie}, {users} users) x{count}"
+                              for (users, cookie, name), count in failures.items()))
+
+    def save_results(self, filename=None):
+        """Save every sample with its cell (path class, cookie state, concurrency) to CSV"""
+        if not self.results:
+            print("No results to save!")
+            return
+        filename = filename or f"middleware_overhead_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        filepath = os.path.join(RESULTS_DIR, filename)
+        fieldnames = ["Type", "Name", "Path", "Path Class", "Cookie", "Concurrency", "Load Time (ms)", "Size (KB)",
+                      "Status", "Virtual User", "Timestamp"] + PHASE_COLUMNS + SERVER_TIMING_COLUMNS
+        with open(filepath, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(self.results)
+        print(f"Results saved to {filepath}")
+        return filepath
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Latency and throughput of paths the middleware matcher excludes "
+                                                 "vs includes, by cookie state and concurrency")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=list(CONCURRENCY_LEVELS),
+                        help="Virtual users per cell, one level after the other")
+    parser.add_argument("--duration", type=float, default=CELL_DURATION, help="Seconds of load per cell")
+    parser.add_argument("--states", nargs="+", choices=COOKIE_STATES, default=list(COOKIE_STATES),
+                        help="Auth cookie states to compare")
+    parser.add_argument("--paths", nargs="+", help="Paths to load instead of the default targets")
+    parser.add_argument("--role", choices=sorted(ROLE_CREDENTIALS), default="admin_pusat",
+                        help="Account the logged-in sessions use")
+    parser.add_argument("--base-url", default=BASE_URL)
+    args = parser.parse_args()
+
+    print("🧅 Middleware Overhead Test Starting...")
+    targets = [{"name": path, "endpoint": path} for path in args.paths] if args.paths else None
+    tester = MiddlewareOverheadTester(args.base_url, ROLE_CREDENTIALS[args.role], targets, args.duration)
+    await tester.run(args.concurrency, args.states)
+    tester.save_results()
+    tester.print_summary()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,104 @@
+"""
+Browser-side Page Metrics
+Reads Navigation Timing, paint timing and Core Web Vitals from the browser after a page visit
+
+Wall-clock timing around page.goto mixes server time, rendering and Playwright overhead. These
+metrics come from the browser's own PerformanceNavigationTiming, paint, largest-contentful-paint
+and layout-shift entries, so server latency (TTFB) can be told apart from client-side work
+(DOMContentLoaded, load, FCP, LCP).
+
+All times are milliseconds relative to the start of the navigation.
+"""
+
+# CSV columns produced by collect_navigation_metrics, in output order
+NAVIGATION_METRIC_COLUMNS = [
+    "DNS (ms)",
+    "Connect (ms)",
+    "TTFB (ms)",
+    "Download (ms)",
+    "DOMContentLoaded (ms)",
+    "Load Event (ms)",
+    "FCP (ms)",
+    "LCP (ms)",
+    "CLS",
+    "Transfer Size (KB)",
+]
+
+# Buffered observers return LCP and layout-shift entries recorded before the script ran,
+# so no init script is needed. loadEventEnd is polled because it is only set once the
+# load event handlers have finished.
+_COLLECT_SCRIPT = """
+async () => {
+    const nav = performance.getEntriesByType('navigation')[0];
+    for (let attempt = 0; nav && nav.loadEventEnd === 0 && attempt < 50; attempt++) {
+        await new Promise(resolve => setTimeout(resolve, 20));
+    }
+
+    const observe = (type) => new Promise(resolve => {
+        try {
+            const observer = new PerformanceObserver(list => {
+                observer.disconnect();
+                resolve(list.getEntries());
+            });
+            observer.observe({ type, buffered: true });
+            setTimeout(() => { observer.disconnect(); resolve([]); }, 100);
+        } catch (e) {
+            resolve([]);
+        }
+    });
+
+    const [lcpEntries, shiftEntries] = await Promise.all([
+        observe('largest-contentful-paint'),
+        observe('layout-shift'),
+    ]);
+    const fcp = performance.getEntriesByName('first-contentful-paint')[0];
+    const lcp = lcpEntries.length ? lcpEntries[lcpEntries.length - 1] : null;
+    const cls = shiftEntries
+        .filter(entry => !entry.hadRecentInput)
+        .reduce((total, entry) => total + entry.value, 0);
+
+    if (!nav) {
+        return null;
+    }
+    return {
+        dns: nav.domainLookupEnd - nav.domainLookupStart,
+        connect: nav.connectEnd - nav.connectStart,
+        ttfb: nav.responseStart - nav.startTime,
+        download: nav.responseEnd - nav.responseStart,
+        domContentLoaded: nav.domContentLoadedEventEnd - nav.startTime,
+        load: nav.loadEventEnd - nav.startTime,
+        fcp: fcp ? fcp.startTime : null,
+        lcp: lcp ? lcp.startTime : null,
+        cls: cls,
+        transferSize: nav.transferSize,
+    };
+}
+"""
+
+
+def _round(value, digits=2):
+    return round(value, digits) if value is not None else None
+
+
+async def collect_navigation_metrics(page):
+    """Return the navigation metrics of the page's current document keyed by CSV column
+
+    Metrics the browser did not report (e.g. LCP on a page without contentful elements)
+    are returned as None so they end up as empty CSV cells rather than zeros.
+    """
+    metrics = await page.evaluate(_COLLECT_SCRIPT)
+    if not metrics:
+        return {column: None for column in NAVIGATION_METRIC_COLUMNS}
+
+    return {
+        "DNS (ms)": _round(metrics["dns"]),
+        "Connect (ms)": _round(metrics["connect"]),
+        "TTFB (ms)": _round(metrics["ttfb"]),
+        "Download (ms)": _round(metrics["download"]),
+        "DOMContentLoaded (ms)": _round(metrics["domContentLoaded"]),
+        "Load Event (ms)": _round(metrics["load"]),
+        "FCP (ms)": _round(metrics["fcp"]),
+        "LCP (ms)": _round(metrics["lcp"]),
+        "CLS": _round(metrics["cls"], 4),
+        "Transfer Size (KB)": _round(metrics["transferSize"] / 1024),
+    }
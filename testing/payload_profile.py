@@ -0,0 +1,252 @@
+"""
+Payload Profiler
+Wire vs decoded bytes, content encoding, JSON parse time and record counts per API response
+
+Latency alone does not show which responses are fat. The list routes join related rows into
+every record (item_instances carry their item type and node, item_transits both nodes), so their
+size grows with the page size, and the client pays for it twice: transferring the bytes and
+decoding the JSON. Every API sample gets these columns:
+
+    Wire Size (KB)     response body as it came off the socket (compressed, if it was)
+    Decoded Size (KB)  body after content decoding, i.e. the JSON text
+    Content Encoding   negotiated Content-Encoding (gzip, br, deflate or identity)
+    Parse (ms)         json.loads of the decoded body
+    Records            length of the largest list in `data` (rows on this page), None otherwise
+
+Only successful (2xx) responses are profiled; error bodies (401, 404, 500) are small and say
+nothing about the payload, so they are counted separately. The summary ranks endpoints by wire bytes and shows the compression ratio, bytes per record and
+parse time per record, so the fattest responses can be targeted (smaller selects, smaller pages,
+compression where it is missing).
+
+Standalone, it profiles the scenario's GET endpoints once per Accept-Encoding:
+
+    python payload_profile.py                                   # gzip vs identity, 10 samples each
+    python payload_profile.py --encodings gzip br --page-size 100
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from urllib.parse import urlencode, urlsplit
+
+from urllib3.util.request import ACCEPT_ENCODING
+
+from auth_sessions import SessionManager
+from http_timing import TimedSession
+from latency_histogram import HistogramRecorder
+from results_writer import StreamingResultsWriter
+from scenario import DEFAULT_SCENARIO, load_scenario
+
+# Configuration
+BASE_URL = "http://localhost:3001"
+RESULTS_DIR = "results"
+SAMPLES = 10  # Requests per endpoint and encoding in standalone mode
+ENCODINGS = ("gzip", "identity")  # Accept-Encoding values compared in standalone mode
+UNCOMPRESSED_HINT_KB = 10  # Flag endpoints sending more than this uncompressed
+REQUEST_TIMEOUT = 10
+
+# Per-sample columns added to API result rows
+PAYLOAD_COLUMNS = ["Wire Size (KB)", "Decoded Size (KB)", "Content Encoding", "Parse (ms)", "Records"]
+PAYLOAD_METRICS = ("Wire Size (KB)", "Decoded Size (KB)", "Parse (ms)", "Records")
+
+
+def record_count(payload):
+    """Rows in a response: the data list itself, or the largest list directly inside data"""
+    data = payload.get("data") if isinstance(payload, dict) else None
+    if isinstance(data, list):
+        return len(data)
+    if isinstance(data, dict):
+        lists = [len(value) for value in data.values() if isinstance(value, list)]
+        return max(lists) if lists else None
+    return None
+
+
+def payload_row(response):
+    """Payload columns of a result row from a fully read requests response"""
+    content = response.content
+    # urllib3 counts the body bytes read off the socket, before content decoding
+    wire = response.raw.tell() if hasattr(response.raw, "tell") else len(content)
+    parse_ms, records = None, None
+    if content:
+        start = time.perf_counter_ns()
+        try:
+            payload = json.loads(content)
+        except ValueError:
+            payload = None  # Not JSON (or an encoding the client could not decode)
+        else:
+            parse_ms = round((time.perf_counter_ns() - start) / 1_000_000, 3)
+        records = record_count(payload)
+    return {
+        "Wire Size (KB)": round(wire / 1024, 3),
+        "Decoded Size (KB)": round(len(content) / 1024, 3),
+        "Content Encoding": response.headers.get("Content-Encoding", "identity").lower(),
+        "Parse (ms)": parse_ms,
+        "Records": records,
+    }
+
+
+def _successful(status):
+    """2xx: an HTTP status code, or the tester's "OK" label (classify_status)"""
+    return 200 <= status < 300 if isinstance(status, int) else status == "OK"
+
+
+class PayloadRecorder:
+    """Histograms of wire/decoded size, parse time and records per (endpoint, encoding)"""
+
+    def __init__(self):
+        self.recorder = HistogramRecorder(lowest=0.001)  # Sizes in KB and parse times can be tiny
+        self.skipped = {}  # endpoint -> non-2xx responses left out of the profile
+
+    def record(self, result):
+        if result["Load Time (ms)"] < 0 or result.get("Wire Size (KB)") is None:
+            return
+        if not _successful(result["Status"]):
+            self.skipped[result["Name"]] = self.skipped.get(result["Name"], 0) + 1
+            return
+        key = (result["Name"], result["Content Encoding"])
+        for metric in PAYLOAD_METRICS:
+            if result.get(metric) is not None:
+                self.recorder.record((*key, metric), result[metric])
+
+    def rows(self):
+        """Median payload figures per (endpoint, encoding), endpoints with the fattest responses first"""
+        histograms = self.recorder.histograms
+        rows = []
+        def median(name, encoding, metric):
+            histogram = histograms.get((name, encoding, metric))
+            return histogram.percentile(50) if histogram else None
+
+        for name, encoding in dict.fromkeys(key[:2] for key in histograms):
+            wire, decoded, parse_ms, records = (median(name, encoding, metric) for metric in PAYLOAD_METRICS)
+            rows.append({
+                "name": name, "encoding": encoding, "samples": histograms[(name, encoding, "Wire Size (KB)")].count,
+                "wire_kb": wire, "decoded_kb": decoded, "parse_ms": parse_ms, "records": records,
+                "ratio": decoded / wire if wire else None,
+                "bytes_per_record": wire * 1024 / records if records else None,
+                "parse_us_per_record": parse_ms * 1000 / records if parse_ms is not None and records else None,
+            })
+        fattest = {}
+        for row in rows:
+            fattest[row["name"]] = max(fattest.get(row["name"], 0), row["wire_kb"])
+        return sorted(rows, key=lambda row: (-fattest[row["name"]], row["name"], -row["wire_kb"]))
+
+    def print_summary(self):
+        """Print payload size, compression and decoding cost per endpoint"""
+        rows = self.rows()
+        skipped = ", ".join(f"{name} x{count}" for name, count in self.skipped.items())
+        if not rows:
+            if skipped:
+                print(f"\nℹ️  No 2xx responses to profile, left out: {skipped}")
+            return
+
+        def shown(value, width, fmt=".1f"):
+            return f"{value:<{width}{fmt}}" if value is not None else f"{'-':<{width}}"
+
+        print("\n" + "=" * 96)
+        print("PAYLOAD PROFILE (medians, fattest responses first)")
+        print("=" * 96)
+        print(f"{'API':<26} {'Encoding':<9} {'Wire KB':<9} {'Decoded KB':<11} {'Ratio':<6} {'Records':<8} "
+              f"{'B/record':<9} {'Parse ms':<9} {'µs/record':<9}")
+        print("-" * 96)
+        for row in rows:
+            print(f"{row['name'][:25]:<26} {row['encoding']:<9} {row['wire_kb']:<9.1f} {row['decoded_kb']:<11.1f} "
+                  f"{shown(row['ratio'], 6)} {shown(row['records'], 8, '.0f')} {shown(row['bytes_per_record'], 9, '.0f')} "
+                  f"{shown(row['parse_ms'], 9, '.2f')} {shown(row['parse_us_per_record'], 9)}")
+
+        uncompressed = [row for row in rows if row["encoding"] == "identity" and row["wire_kb"] > UNCOMPRESSED_HINT_KB
+                        and not any(other["name"] == row["name"] and other["encoding"] != "identity" for other in rows)]
+        if uncompressed:
+            print(f"\n⚠️  Sent uncompressed above {UNCOMPRESSED_HINT_KB} KB: "
+                  f"{', '.join(row['name'] for row in uncompressed)}")
+        undecoded = [row for row in rows if row["decoded_kb"] and row["parse_ms"] is None]
+        if undecoded:
+            print(f"ℹ️  Not decodable as JSON (install brotli for br): {', '.join(row['name'] for row in undecoded)}")
+        if skipped:
+            print(f"ℹ️  Non-2xx responses left out of the profile: {skipped}")
+
+
+def _with_page_size(endpoint, page_size):
+    if page_size is None:
+        return endpoint
+    separator = "&" if urlsplit(endpoint).query else "?"
+    return f"{endpoint}{separator}{urlencode({'page_size': page_size})}"
+
+
+def profile_endpoints(base_url, endpoints, encodings=ENCODINGS, samples=SAMPLES, page_size=None, writer=None):
+    """Request every GET endpoint `samples` times per Accept-Encoding; returns the PayloadRecorder"""
+    profile = PayloadRecorder()
+    sessions = SessionManager(base_url)
+    clients = {None: TimedSession()}  # Public endpoints go out without cookies
+    for api_info in endpoints:
+        if api_info["method"] != "GET":
+            continue
+        role = api_info.get("role")
+        if role not in clients:
+            try:
+                clients[role] = sessions.requests_session(role)
+            except Exception as e:
+                clients[role] = None
+                print(f"❌ Authentication error for {role}: {str(e)[:30]}")
+        if clients[role] is None:
+            print(f"⏭️  Skipping {api_info['name']} (authentication failed)")
+            continue
+
+        url = f"{base_url}{_with_page_size(api_info['endpoint'], page_size)}"
+        print(f"📦 {api_info['name']}")
+        for encoding in encodings:
+            for _ in range(samples):
+                try:
+                    response = clients[role].get(url, headers={"Accept-Encoding": encoding}, timeout=REQUEST_TIMEOUT)
+                except Exception as e:
+                    print(f"  ❌ {encoding}: {str(e)[:60]}")
+                    break
+                row = {
+                    "Name": api_info["name"],
+                    "Accept-Encoding": encoding,
+                    "Status": response.status_code,
+                    "Load Time (ms)": response.timings["total_ms"],
+                    "Timestamp": datetime.now().isoformat(),
+                    **payload_row(response),
+                }
+                profile.record(row)
+                if writer:
+                    writer.write(row)
+    for client in clients.values():
+        if client is not None:
+            client.close()
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wire vs decoded size, compression and JSON parse cost per endpoint")
+    parser.add_argument("--scenario", default=DEFAULT_SCENARIO, help="Scenario whose GET endpoints are profiled")
+    parser.add_argument("--encodings", nargs="+", default=list(ENCODINGS),
+                        help=f"Accept-Encoding values to compare (this client decodes: {ACCEPT_ENCODING}, identity)")
+    parser.add_argument("--samples", type=int, default=SAMPLES, help="Requests per endpoint and encoding")
+    parser.add_argument("--page-size", type=int, help="page_size query parameter added to every endpoint")
+    parser.add_argument("--base-url", default=BASE_URL)
+    args = parser.parse_args()
+
+    scenario = load_scenario(args.scenario)
+    print(f"📦 Payload profile of the {scenario['name']} scenario: {', '.join(args.encodings)}, "
+          f"{args.samples} samples each{f', page_size={args.page_size}' if args.page_size else ''}")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    columns = [("Name", str), ("Accept-Encoding", str), ("Status", int), ("Load Time (ms)", float), ("Timestamp", str),
+               ("Wire Size (KB)", float), ("Decoded Size (KB)", float), ("Content Encoding", str),
+               ("Parse (ms)", float), ("Records", int)]
+    writer = StreamingResultsWriter(os.path.join(RESULTS_DIR, f"payload_profile_{timestamp}.csv"), columns)
+    try:
+        profile = profile_endpoints(args.base_url, scenario["endpoints"], args.encodings, args.samples,
+                                    args.page_size, writer)
+    finally:
+        writer.close()
+    print(f"Results saved to {writer.filepath}")
+    profile.print_summary()
+
+
+if __name__ == "__main__":
+    main()
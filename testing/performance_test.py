@@ -5,158 +5,265 @@ Tests page load times and API response times for the web application
 This script runs multiple iterations of performance tests to provide statistically reliable results.
 It tests both page load times and API response times using valid test credentials where needed.
 
-Note: Some API endpoints require authentication, so we focus on testing publicly accessible
-endpoints and the login API with both valid and invalid credentials to measure response times.
+Protected pages and API endpoints are measured logged in: auth_sessions.py logs in once per role,
+caches the cookies and Playwright storage state, and only logs in again when the session expires,
+so no measurement pays for (or is skewed by) a login of its own. The login API itself is still
+measured with valid and invalid credentials.
+
+What is measured comes from a scenario (scenarios/*.json, see scenario.py): the pages and
+endpoints, their payloads and roles, and relative weights, so one iteration reproduces the
+traffic shape of that profile. quick_test.py is this runner with the "quick" scenario.
+
+    python performance_test.py --scenario production
 """
 
+import argparse
 import asyncio
-import csv
 import time
 from datetime import datetime
-from playwright.async_api import async_playwright
+from http.cookiejar import DefaultCookiePolicy
 import requests
 import json
 import statistics
-import numpy as np
 import os
+import weakref
+
+from adaptive_sampling import ADAPTIVE_MAX_SAMPLES, ADAPTIVE_MIN_SAMPLES, ADAPTIVE_TARGET_WIDTH, AdaptiveSampler
+from auth_sessions import SessionManager
+from browser_pool import BROWSER_POOL_SIZE, BrowserPool
+from http_timing import TimedSession, phase_row
+from latency_histogram import HistogramRecorder
+from live_metrics import add_live_arguments, start_live_metrics
+from page_metrics import NAVIGATION_METRIC_COLUMNS, collect_navigation_metrics
+from payload_profile import PayloadRecorder, payload_row
+from resource_waterfall import WATERFALL_COLUMNS, WaterfallCapture, WaterfallRecorder
+from results_writer import StreamingResultsWriter
+from scenario import DEFAULT_SCENARIO, available_scenarios, classify_status, is_success_status, load_scenario, weighted_sequence
+from server_timing import ServerTimingRecorder, server_timing_row
 
 # Configuration
-NUM_ITERATIONS = 30  # Number of test iterations to run for statistical reliability
 DELAY_BETWEEN_ITERATIONS = 2  # Seconds to wait between full test cycles
 DELAY_BETWEEN_TESTS = 0.5  # Seconds to wait between individual tests
 REQUEST_TIMEOUT = 10  # Timeout for all HTTP requests and browser operations (seconds)
 BASE_URL = "http://localhost:3001"
 RESULTS_DIR = "results"
+WRITE_PARQUET = False  # Also stream results to a typed Parquet file next to the CSV (requires pyarrow)
+CONTEXT_MODE = "warm"  # "cold": fresh context per visit, "warm": reused contexts with primed cache
+RECORD_WATERFALL = False  # Record every request of each page visit (resource_waterfall.py)
+WATERFALL_SETTLE_MS = 3000  # Waterfall only: wait this long for fetches started after the load event
+
+# Pages and API endpoints under test, with their roles and weights, come from a scenario file
+# (scenario.py); the module-level lists are the default scenario's
+SCENARIO = load_scenario(DEFAULT_SCENARIO)
+PAGES_TO_TEST = SCENARIO["pages"]
+API_ENDPOINTS = SCENARIO["endpoints"]
+
+# Browser timings summarised per page in the timing breakdown
+PAGE_BREAKDOWN_COLUMNS = ["TTFB (ms)", "DOMContentLoaded (ms)", "Load Event (ms)", "FCP (ms)", "LCP (ms)", "CLS"]
+
+# Connection phases summarised per API endpoint in the phase breakdown
+API_PHASE_COLUMNS = ["Connect (ms)", "TTFB (ms)", "Download (ms)"]
+
+# Result columns and their types (used for the CSV header and the typed Parquet output)
+# API rows fill the DNS/Connect/TTFB/Download columns from their HTTP phase timings and the
+# Server columns from the Server-Timing header (server_timing.py) and the payload columns from
+# the response body (payload_profile.py)
+RESULT_COLUMNS = [
+    ("Type", str), ("Name", str), ("Load Time (ms)", float), ("Size (KB)", float),
+    ("Status", str), ("Iteration", int), ("Timestamp", str),
+] + [(column, float) for column in NAVIGATION_METRIC_COLUMNS] + [("Connection Reused", int)] + [
+    ("Server (ms)", float), ("Middleware (ms)", float), ("Server Timing", str),
+    ("Wire Size (KB)", float), ("Decoded Size (KB)", float), ("Content Encoding", str), ("Parse (ms)", float),
+    ("Records", int),
+]
 
 class PerformanceTester:
-    def __init__(self, base_url="http://localhost:3001"):
+    def __init__(self, base_url="http://localhost:3001", results_path=None, parquet=WRITE_PARQUET, resume=False,
+                 sampler=None, waterfall=RECORD_WATERFALL, scenario=None):
         self.base_url = base_url
-        self.results = []
+        self.scenario = scenario or SCENARIO
+        self.pages = self.scenario["pages"]
+        self.endpoints = self.scenario["endpoints"]
+        self.iterations = self.scenario["iterations"]
+        self.recorder = HistogramRecorder()  # Load times per (type, name, status)
+        self.page_metrics = HistogramRecorder(lowest=0.00001)  # Browser timings per (page, metric); CLS is tiny
+        self.api_phases = HistogramRecorder()  # HTTP phases per (endpoint, phase, connection reused)
+        self.server_timing = ServerTimingRecorder()  # Server time vs overhead per endpoint
+        self.payload = PayloadRecorder()  # Wire/decoded size, encoding and JSON parse time per endpoint
+        self.sessions = SessionManager(base_url)  # Logged in once per role, shared by pages and APIs
+        self.sampler = sampler  # AdaptiveSampler deciding which tests still need samples (None = fixed iterations)
+        self.live = None  # LiveMetrics fed every new sample while the run is in progress
+        self.sizes = {}
+        self._pages_measured = {}
+        self._pages_scheduled = {}
+        self._visited = weakref.WeakKeyDictionary()  # page -> URLs it has loaded (first vs repeat visits)
         if not os.path.exists(RESULTS_DIR):
             os.makedirs(RESULTS_DIR)
         
-    async def test_page_load_times(self, iteration=1):
-        """Test page load times for key pages with multiple iterations"""
-        async with async_playwright() as p:
-            browser = await p.chromium.launch()
-            page = await browser.new_page()
-            
-            # Pages to test (based on the report requirements)
-            pages_to_test = [
-                {"name": "Login Page", "path": "/login"},
-                {"name": "Dashboard Admin Pusat", "path": "/super-admin"},
-                {"name": "Daftar Item (Table)", "path": "/super-admin/item-instances"},
-                {"name": "QR Scanner Page", "path": "/qr-scan"},
-                {"name": "Halaman Manajemen User (Super Admin)", "path": "/super-admin/users"},
-                {"name": "Halaman Manajemen Node (Super Admin)", "path": "/super-admin/nodes"},
-                {"name": "Halaman Generate QR", "path": "/qr-create"},
-                {"name": "Node Admin Dashboard", "path": "/node-admin"},
-                {"name": "Node Admin Item Instances", "path": "/node-admin/item-instances"},
-            ]
-            
-            for page_info in pages_to_test:
-                try:
-                    if iteration == 1:  # Only print on first iteration to reduce noise
-                        print(f"Testing page: {page_info['name']}")
-                    
-                    # Start timing
-                    start_time = time.time()
-                    
-                    # Navigate to page
-                    response = await page.goto(f"{self.base_url}{page_info['path']}", timeout=REQUEST_TIMEOUT * 1000)
-                    
-                    # Wait for page to load completely
-                    await page.wait_for_load_state("networkidle", timeout=REQUEST_TIMEOUT * 1000)
-                    
-                    # End timing
-                    end_time = time.time()
-                    load_time_ms = (end_time - start_time) * 1000
-                    
-                    # Get page size (approximate) - only on first iteration for efficiency
-                    if iteration == 1:
-                        content = await page.content()
-                        page_size_kb = len(content.encode('utf-8')) / 1024
-                    else:
-                        page_size_kb = 0  # Will be filled from first iteration
-                    
-                    self.results.append({
-                        "Type": "Page",
-                        "Name": page_info["name"],
-                        "Load Time (ms)": round(load_time_ms, 2),
-                        "Size (KB)": round(page_size_kb, 2),
-                        "Status": "OK" if response.status < 400 else "Error",
-                        "Timestamp": datetime.now().isoformat(),
-                        "Iteration": iteration
-                    })
-                    
-                    if iteration == 1:
-                        print(f"  - Load time: {load_time_ms:.2f}ms")
-                    
-                    # Small delay between tests
-                    await asyncio.sleep(DELAY_BETWEEN_TESTS)
-                    
-                except Exception as e:
-                    if iteration == 1:
-                        print(f"  - Error testing {page_info['name']}: {str(e)}")
-                    self.results.append({
-                        "Type": "Page",
-                        "Name": page_info["name"],
-                        "Load Time (ms)": -1,
-                        "Size (KB)": -1,
-                        "Status": f"Error: {str(e)}",
-                        "Timestamp": datetime.now().isoformat(),
-                        "Iteration": iteration
-                    })
-            
-            await browser.close()
-    
-    def test_api_response_times(self, iteration=1):
-        """Test API response times for key endpoints with multiple iterations"""
-        # Create a session to maintain authentication
-        session = requests.Session()
+        # Samples are streamed to disk while the run is in progress instead of kept in memory
+        if results_path is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            runs = "adaptive" if sampler else f"{self.iterations}iterations"
+            results_path = os.path.join(RESULTS_DIR, f"{self.scenario['results_prefix']}_{runs}_{timestamp}.csv")
+        # A resume is refused if the interrupted run measured another scenario or iteration count
+        run_info = {"scenario": self.scenario["name"], "iterations": "adaptive" if sampler else self.iterations}
+        self.writer = StreamingResultsWriter(results_path, RESULT_COLUMNS, parquet=parquet, resume=resume,
+                                             run_info=run_info)
         
-        # First, authenticate to get session cookies
-        auth_success = False
-        if iteration == 1:
-            print("  🔐 Authenticating for protected API tests...")
+        # Every request of every page visit goes to its own file; a resumed run starts a new one
+        self.waterfall = WaterfallRecorder() if waterfall else None
+        self.waterfall_writer = None
+        if waterfall:
+            waterfall_path = results_path.replace(".csv", f"_waterfall_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+            self.waterfall_writer = StreamingResultsWriter(waterfall_path, WATERFALL_COLUMNS)
+        
+        # Samples kept from an interrupted run still count towards the summary
+        for result in self.writer.resumed_rows:
+            self._record(result, persist=False)
         
+    async def test_page_load_times(self, pool, iterations=(1,), pages=None):
+        """Test page load times for key pages, spreading all iterations across the browser pool in parallel
+
+        Every iteration visits each page as often as its scenario weight.
+        """
+        sequence = weighted_sequence(self.pages if pages is None else pages)
+        visits = [(iteration, page_info) for iteration in iterations for page_info in sequence
+                  if not self.writer.is_complete("Page", iteration)]
+        for iteration in iterations:
+            self._pages_scheduled[iteration] = len(sequence)
+        await pool.map(self._measure_page, visits, role=lambda visit: visit[1].get("role"))
+
+    async def warm_up_visit(self, page, url):
+        """Warm-up visit of a pool context; with the waterfall on, records it as the first visit"""
+        if not self.waterfall:
+            await page.goto(url, wait_until="load", timeout=REQUEST_TIMEOUT * 1000)
+            return
+        name = next((p["name"] for p in self.pages if f"{self.base_url}{p['path']}" == url), url)
+        await self._visit_with_waterfall(page, url, name, iteration=0)
+    
+    async def _visit_with_waterfall(self, page, url, name, iteration):
+        """page.goto while recording every request of the visit into the waterfall"""
+        kind = "repeat" if url in self._visited.setdefault(page, set()) else "first"
+        self._visited[page].add(url)
+        with WaterfallCapture(page) as capture:
+            response = await page.goto(url, wait_until="load", timeout=REQUEST_TIMEOUT * 1000)
+            metrics = await collect_navigation_metrics(page)
+            # Data fetches usually start after hydration, past the load event the timings end at
+            try:
+                await page.wait_for_load_state("networkidle", timeout=WATERFALL_SETTLE_MS)
+            except Exception:
+                pass
+            rows = await capture.collect(name, iteration, kind)
+        self.waterfall.record(rows)
+        for row in rows:
+            self.waterfall_writer.write(row)
+        return response, metrics
+    
+    async def _measure_page(self, page, visit):
+        """Measure a single page visit on a page borrowed from the browser pool"""
+        iteration, page_info = visit
         try:
-            auth_response = session.post(f"{self.base_url}/api/login", 
-                                       json={"email": "admin.pusat@despro.com", "password": "admin123"}, 
-                                       timeout=REQUEST_TIMEOUT)
-            if auth_response.status_code in [200, 201]:
-                auth_success = True
-                if iteration == 1:
-                    print("  ✅ Authentication successful!")
+            if iteration == 1:  # Only print on first iteration to reduce noise
+                print(f"Testing page: {page_info['name']}")
+            
+            url = f"{self.base_url}{page_info['path']}"
+            if self.waterfall:
+                response, metrics = await self._visit_with_waterfall(page, url, page_info["name"], iteration)
             else:
-                if iteration == 1:
-                    print(f"  ❌ Authentication failed: {auth_response.status_code}")
+                # Navigate to page and wait for the load event (no networkidle settle window)
+                response = await page.goto(url, wait_until="load", timeout=REQUEST_TIMEOUT * 1000)
+                
+                # Read timings from the browser itself instead of wall-clock deltas around goto
+                metrics = await collect_navigation_metrics(page)
+            # 0 when loadEventEnd never got set within the polls, None without a navigation entry
+            load_time_ms = metrics["Load Event (ms)"]
+            load_fired = load_time_ms is not None and load_time_ms > 0
+            
+            # Get page size (approximate)
+            content = await page.content()
+            page_size_kb = len(content.encode('utf-8')) / 1024
+            
+            # A protected page that ends up on the login form measured the redirect, not the page
+            if response.status >= 400:
+                status = "Error"
+            elif not load_fired:
+                status = "Error: load event did not fire"
+            elif page_info.get("role") and page.url.split("?")[0].rstrip("/").endswith("/login"):
+                status = "Redirected to Login"
+            else:
+                status = "OK"
+            
+            self._record({
+                "Type": "Page",
+                "Name": page_info["name"],
+                "Load Time (ms)": round(load_time_ms, 2) if load_fired else -1,
+                "Size (KB)": round(page_size_kb, 2),
+                "Status": status,
+                "Timestamp": datetime.now().isoformat(),
+                "Iteration": iteration,
+                **metrics
+            })
+            
+            if iteration == 1:
+                print(f"  - {page_info['name']} load time: {load_time_ms if load_fired else -1:.2f}ms "
+                      f"(TTFB {metrics['TTFB (ms)']}ms, FCP {metrics['FCP (ms)']}ms, LCP {metrics['LCP (ms)']}ms)")
+            
         except Exception as e:
             if iteration == 1:
-                print(f"  ❌ Authentication error: {str(e)[:30]}")
+                print(f"  - Error testing {page_info['name']}: {str(e)}")
+            self._record({
+                "Type": "Page",
+                "Name": page_info["name"],
+                "Load Time (ms)": -1,
+                "Size (KB)": -1,
+                "Status": f"Error: {str(e)}",
+                "Timestamp": datetime.now().isoformat(),
+                "Iteration": iteration
+            })
         
-        # API endpoints to test (including authenticated ones)
-        api_endpoints = [
-            {"name": "Login API (Valid Credentials)", "method": "POST", "endpoint": "/api/login", 
-             "data": {"email": "admin.pusat@despro.com", "password": "admin123"}, "auth_required": False},
-            {"name": "Login API (Invalid Credentials)", "method": "POST", "endpoint": "/api/login", 
-             "data": {"email": "test@invalid.com", "password": "wrongpassword"}, "auth_required": False},
-            {"name": "Register API", "method": "POST", "endpoint": "/api/register",
-             "data": {"username": "perftest", "email": "perftest@example.com", "password": "test123", "role": "node_admin"}, "auth_required": False},
-            
-            # Authenticated endpoints (only test if auth successful)
-            {"name": "Nodes API", "method": "GET", "endpoint": "/api/nodes", "auth_required": True},
-            {"name": "Item Types API", "method": "GET", "endpoint": "/api/item-types", "auth_required": True},
-            {"name": "Item Instances API", "method": "GET", "endpoint": "/api/item-instances", "auth_required": True},
-            {"name": "Item Transits API", "method": "GET", "endpoint": "/api/item-transits", "auth_required": True},
-            {"name": "Users API", "method": "GET", "endpoint": "/api/user", "auth_required": True},
-            {"name": "Reports API", "method": "GET", "endpoint": "/api/reports", "auth_required": True},
-            {"name": "Recipes API", "method": "GET", "endpoint": "/api/recipes", "auth_required": True},
-        ]
+        # Checkpoint the iteration once all of its pages are on disk
+        self._pages_measured[iteration] = self._pages_measured.get(iteration, 0) + 1
+        if self._pages_measured[iteration] == self._pages_scheduled.get(iteration):
+            self.writer.mark_complete("Page", iteration)
+    
+    def _role_session(self, sessions, role, iteration):
+        """Logged-in session of a role for this iteration, or None if the login failed"""
+        if role not in sessions:
+            try:
+                logins = self.sessions.logins
+                sessions[role] = self.sessions.requests_session(role)
+                if iteration == 1:
+                    print(f"  ✅ Authenticated as {role} "
+                          f"({'logged in' if self.sessions.logins > logins else 'reused cached session'})")
+            except Exception as e:
+                sessions[role] = None
+                if iteration == 1:
+                    print(f"  ❌ Authentication error for {role}: {str(e)[:30]}")
+        return sessions[role]
+    
+    def test_api_response_times(self, iteration=1, names=None):
+        """Test API response times for key endpoints (only the given endpoint names, if any)
+
+        Every iteration calls each endpoint as often as its scenario weight, interleaved.
+        """
+        if self.writer.is_complete("API", iteration):
+            return
+        
+        # Endpoints with a role reuse the cached login of that role; the public calls get their own
+        # keep-alive session that never stores cookies, so they stay unauthenticated
+        public_session = TimedSession()
+        public_session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        sessions = {}
         
-        for api_info in api_endpoints:
+        if iteration == 1:
+            print("  🔐 Using cached sessions for protected API tests...")
+        
+        endpoints = [api_info for api_info in self.endpoints if names is None or api_info["name"] in names]
+        for api_info in weighted_sequence(endpoints):
+            role = api_info.get("role")
+            client = self._role_session(sessions, role, iteration) if role else public_session
             # Skip authenticated endpoints if authentication failed
-            if api_info.get("auth_required", False) and not auth_success:
+            if client is None:
                 if iteration == 1:
                     print(f"⏭️  Skipping {api_info['name']} (authentication failed)")
                 continue
@@ -166,64 +273,36 @@ class PerformanceTester:
                     print(f"Testing API: {api_info['name']}")
                 
                 url = f"{self.base_url}{api_info['endpoint']}"
-                start_time = time.time()
-                
-                # Use session for authenticated requests, regular requests for others
-                if api_info.get("auth_required", False):
-                    if api_info['method'] == 'GET':
-                        response = session.get(url, timeout=REQUEST_TIMEOUT)
-                    elif api_info['method'] == 'POST':
-                        data = api_info.get('data', {})
-                        response = session.post(url, json=data, timeout=REQUEST_TIMEOUT)
-                else:
-                    # Use regular requests for non-authenticated endpoints
-                    if api_info['method'] == 'GET':
-                        response = requests.get(url, timeout=REQUEST_TIMEOUT)
-                    elif api_info['method'] == 'POST':
-                        data = api_info.get('data', {})
-                        response = requests.post(url, json=data, timeout=REQUEST_TIMEOUT)
+                response = client.request(api_info["method"], url, json=api_info.get("data"), timeout=REQUEST_TIMEOUT)
                 
-                end_time = time.time()
-                response_time_ms = (end_time - start_time) * 1000
+                # Monotonic perf_counter_ns timings, split into connect/TTFB/download phases
+                response_time_ms = response.timings["total_ms"]
                 
-                # Calculate response size (only on first iteration for efficiency)
-                if iteration == 1:
-                    response_size_kb = len(response.content) / 1024 if response.content else 0
-                else:
-                    response_size_kb = 0  # Will be filled from first iteration
+                # Calculate response size
+                response_size_kb = len(response.content) / 1024 if response.content else 0
                 
-                # Determine expected status
-                if "Invalid" in api_info["name"] and response.status_code == 400:
-                    status = "Expected 400"
-                elif "Valid" in api_info["name"] and response.status_code in [200, 201]:
-                    status = "OK"
-                elif "Register" in api_info["name"] and response.status_code in [400, 409, 201]:
-                    status = "Expected Response"  # Could be user exists or created
-                elif api_info.get("auth_required", False) and response.status_code in [200, 201]:
-                    status = "OK"
-                elif api_info.get("auth_required", False) and response.status_code in [401, 403]:
-                    status = f"Auth Issue ({response.status_code})"
-                elif api_info.get("auth_required", False) and response.status_code == 403:
-                    status = "Forbidden (403)"  # Permission issue
-                elif response.status_code < 400:
-                    status = "OK"
-                elif response.status_code == 404:
-                    status = "Not Found (404)"  # API might not exist, but response time is still valid
-                else:
-                    status = f"Error {response.status_code}"
+                status = classify_status(api_info, response.status_code)
+                if role and response.status_code == 401:
+                    self.sessions.invalidate(role)  # Revoked early; log in again next iteration
                 
-                self.results.append({
+                self._record({
                     "Type": "API",
                     "Name": api_info["name"],
                     "Load Time (ms)": round(response_time_ms, 2),
                     "Size (KB)": round(response_size_kb, 2),
                     "Status": status,
                     "Timestamp": datetime.now().isoformat(),
-                    "Iteration": iteration
+                    "Iteration": iteration,
+                    **phase_row(response.timings),
+                    **server_timing_row(response.headers),
+                    **payload_row(response)
                 })
                 
                 if iteration == 1:
-                    print(f"  - Response time: {response_time_ms:.2f}ms (Status: {status})")
+                    timings = response.timings
+                    print(f"  - Response time: {response_time_ms:.2f}ms (Status: {status}, connect {timings['connect_ms']:.1f}ms, "
+                          f"TTFB {timings['ttfb_ms']:.1f}ms, download {timings['download_ms']:.1f}ms"
+                          f"{', reused connection' if timings['reused'] else ''})")
                 
                 # Small delay between tests
                 time.sleep(DELAY_BETWEEN_TESTS)
@@ -231,7 +310,7 @@ class PerformanceTester:
             except Exception as e:
                 if iteration == 1:
                     print(f"  - Error testing {api_info['name']}: {str(e)}")
-                self.results.append({
+                self._record({
                     "Type": "API",
                     "Name": api_info["name"],
                     "Load Time (ms)": -1,
@@ -240,68 +319,153 @@ class PerformanceTester:
                     "Timestamp": datetime.now().isoformat(),
                     "Iteration": iteration
                 })
+        
+        for session in sessions.values():
+            if session is not None:
+                session.close()
+        public_session.close()
+        self.writer.mark_complete("API", iteration)
     
-    def save_results(self, filename="performance_test_results.csv"):
-        """Save test results to CSV file"""
-        filepath = f"results/{filename}"
+    async def test_pages_adaptive(self, pool):
+        """Measure pages in rounds, each round only revisiting the pages whose percentiles have not converged"""
+        tests = [("Page", page_info["name"]) for page_info in self.pages]
+        iteration = 0
+        while (active := self.sampler.active(tests)) and iteration < self.sampler.max_samples:
+            iteration += 1
+            pages = [page_info for page_info in self.pages if ("Page", page_info["name"]) in active]
+            if iteration == 1 or iteration % 10 == 0:
+                print(f"  Round {iteration}: {len(pages)} pages still sampling")
+            await self.test_page_load_times(pool, iterations=[iteration], pages=pages)
+    
+    def test_apis_adaptive(self):
+        """Call the API endpoints in rounds, each round only calling the endpoints that have not converged"""
+        tests = [("API", api_info["name"]) for api_info in self.endpoints]
+        iteration = 0
+        while (active := self.sampler.active(tests)) and iteration < self.sampler.max_samples:
+            iteration += 1
+            if self.writer.is_complete("API", iteration):
+                continue  # Already on disk from the interrupted run
+            if iteration == 1 or iteration % 10 == 0:
+                print(f"\n🔍 Round {iteration}: {len(active)} endpoints still sampling")
+            self.test_api_response_times(iteration=iteration, names={name for _, name in active})
+            time.sleep(DELAY_BETWEEN_ITERATIONS)
+    
+    def _record(self, result, persist=True):
+        """Record one sample into the streaming histograms and stream it to the results file"""
+        self.recorder.record((result["Type"], result["Name"], result["Status"]), result["Load Time (ms)"])
+        if result["Size (KB)"] is not None and result["Size (KB)"] > 0:
+            self.sizes.setdefault((result["Type"], result["Name"]), result["Size (KB)"])
+        if result["Type"] == "Page":
+            for column in PAGE_BREAKDOWN_COLUMNS:
+                if result.get(column) is not None:
+                    self.page_metrics.record((result["Name"], column), result[column])
+        elif result.get("Connection Reused") is not None:
+            for column in API_PHASE_COLUMNS:
+                if result.get(column) is not None:
+                    self.api_phases.record((result["Name"], column, bool(result["Connection Reused"])), result[column])
+        if result["Type"] == "API":
+            self.server_timing.record(result)
+            self.payload.record(result)
+        if self.sampler:
+            # Only successful latencies may converge; failures (401, 500, timeouts) just use up the budget
+            latency = result["Load Time (ms)"] if is_success_status(result["Status"]) else -1
+            self.sampler.record((result["Type"], result["Name"]), latency)
+        if persist:
+            self.writer.write(result)
+            if self.live:
+                self.live.record(result)
+    
+    def save_results(self, finished=True):
+        """Flush the remaining streamed rows and save the serialized histograms next to the CSV
+
+        finished: False for an interrupted run, whose checkpoint is kept for --resume
+        """
+        self.writer.close(finished=finished)
+        filepath = self.writer.filepath
+        if self.waterfall_writer:
+            self.waterfall_writer.close()
+            print(f"Resource waterfall saved to {self.waterfall_writer.filepath}")
         
-        if not self.results:
+        if not self.recorder.total_count:
             print("No results to save!")
             return
         
-        with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ["Type", "Name", "Load Time (ms)", "Size (KB)", "Status", "Iteration", "Timestamp"]
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            
-            writer.writeheader()
-            for result in self.results:
-                writer.writerow(result)
-        
+        histogram_path = self.recorder.save(filepath.replace(".csv", "_histograms.json"))
         print(f"Results saved to {filepath}")
+        if self.writer.parquet_path:
+            print(f"Columnar results saved to {self.writer.parquet_path}")
+        print(f"Histograms saved to {histogram_path}")
         return filepath
     
     def calculate_statistics(self):
-        """Calculate comprehensive statistics from multiple iterations"""
-        if not self.results:
-            return {}
+        """Calculate comprehensive statistics from the per-test latency histograms"""
+        # Merge every status of a test into one distribution; failed samples are never in a histogram
+        grouped = self.recorder.grouped(lambda key: key[:2])
         
-        # Group results by name and type
-        grouped_results = {}
-        for result in self.results:
-            if result["Load Time (ms)"] > 0:  # Exclude errors
-                key = f"{result['Type']}_{result['Name']}"
-                if key not in grouped_results:
-                    grouped_results[key] = {
-                        'name': result['Name'],
-                        'type': result['Type'],
-                        'times': [],
-                        'size': result['Size (KB)']
-                    }
-                grouped_results[key]['times'].append(result["Load Time (ms)"])
-        
-        # Calculate statistics for each test
         statistics_results = {}
-        for key, data in grouped_results.items():
-            if len(data['times']) > 0:
-                times = data['times']
-                statistics_results[key] = {
-                    'name': data['name'],
-                    'type': data['type'],
-                    'size': data['size'],
-                    'iterations': len(times),
-                    'mean': statistics.mean(times),
-                    'median': statistics.median(times),
-                    'std_dev': statistics.stdev(times) if len(times) > 1 else 0,
-                    'min': min(times),
-                    'max': max(times),
-                    'percentile_95': np.percentile(times, 95) if len(times) > 1 else times[0]
-                }
+        for (test_type, name), histogram in grouped.items():
+            statistics_results[f"{test_type}_{name}"] = {
+                'name': name,
+                'type': test_type,
+                'size': self.sizes.get((test_type, name), 0),
+                'iterations': histogram.count,
+                'mean': histogram.mean,
+                'median': histogram.percentile(50),
+                'std_dev': histogram.std_dev,
+                'min': histogram.min,
+                'max': histogram.max,
+                'percentile_95': histogram.percentile(95),
+                'percentile_99': histogram.percentile(99),
+                'percentile_99_9': histogram.percentile(99.9)
+            }
         
         return statistics_results
     
+    def _print_page_timing_breakdown(self):
+        """Print median browser timings per page to separate server time from client-side work"""
+        if not self.page_metrics.histograms:
+            return
+        
+        print("\n🔬 PAGE TIMING BREAKDOWN (medians from Navigation Timing / Web Vitals):")
+        print("-" * 78)
+        print(f"{'Page Name':<30} {'TTFB':<8} {'DCL':<8} {'Load':<8} {'FCP':<8} {'LCP':<8} {'CLS':<6}")
+        print("-" * 78)
+        names = dict.fromkeys(name for name, _ in self.page_metrics.histograms)
+        for name in names:
+            medians = [self.page_metrics.histograms[(name, column)].percentile(50)
+                       if (name, column) in self.page_metrics.histograms else float('nan')
+                       for column in PAGE_BREAKDOWN_COLUMNS]
+            print(f"{name[:29]:<30} {medians[0]:<8.1f} {medians[1]:<8.1f} {medians[2]:<8.1f} {medians[3]:<8.1f} {medians[4]:<8.1f} {medians[5]:<6.3f}")
+    
+    def _print_api_phase_breakdown(self):
+        """Print median connection phases per endpoint, split by fresh vs reused connections"""
+        if not self.api_phases.histograms:
+            return
+        
+        print("\n🔌 API PHASE BREAKDOWN (medians; fresh = new connection, reused = keep-alive):")
+        print("-" * 96)
+        print(f"{'API Name':<30} {'Reused %':<9} {'Connect':<9} {'TTFB fresh':<11} {'TTFB reused':<12} {'Download':<9}")
+        print("-" * 96)
+        names = dict.fromkeys(name for name, _, _ in self.api_phases.histograms)
+        for name in names:
+            def median(column, reused=None):
+                merged = self.api_phases.grouped(lambda key: key[1] if key[0] == name and key[1] == column
+                                                 and reused in (None, key[2]) else None).get(column)
+                return merged.percentile(50) if merged else float('nan')
+            
+            fresh = self.api_phases.histograms.get((name, "TTFB (ms)", False))
+            reused = self.api_phases.histograms.get((name, "TTFB (ms)", True))
+            total = (fresh.count if fresh else 0) + (reused.count if reused else 0)
+            reused_pct = (reused.count if reused else 0) / total * 100 if total else 0
+            print(f"{name[:29]:<30} {reused_pct:<9.0f} {median('Connect (ms)', False):<9.1f} "
+                  f"{median('TTFB (ms)', False):<11.1f} {median('TTFB (ms)', True):<12.1f} {median('Download (ms)'):<9.1f}")
+    
+    def _samples_label(self):
+        return "adaptive sample counts" if self.sampler else f"{self.iterations} iterations each"
+    
     def print_summary(self):
         """Print a comprehensive summary with statistics from multiple iterations"""
-        if not self.results:
+        if not self.recorder.total_count:
             print("No results to summarize!")
             return
         
@@ -319,30 +483,38 @@ class PerformanceTester:
         api_stats = {k: v for k, v in stats.items() if v['type'] == 'API'}
         
         if page_stats:
-            print(f"\n🌐 PAGE LOAD TIMES ({len(page_stats)} pages, {NUM_ITERATIONS} iterations each):")
-            print("-" * 78)
-            print(f"{'Page Name':<30} {'Mean':<8} {'Median':<8} {'Std Dev':<8} {'Min':<8} {'Max':<8} {'95th %':<8}")
-            print("-" * 78)
+            print(f"\n🌐 PAGE LOAD TIMES ({len(page_stats)} pages, {self._samples_label()}):")
+            print("-" * 96)
+            print(f"{'Page Name':<30} {'Mean':<8} {'Median':<8} {'Std Dev':<8} {'Min':<8} {'Max':<8} {'95th %':<8} {'99th %':<8} {'99.9th %':<8}")
+            print("-" * 96)
             
             for key in sorted(page_stats.keys(), key=lambda x: page_stats[x]['mean']):
                 stat = page_stats[key]
-                print(f"{stat['name'][:29]:<30} {stat['mean']:<8.1f} {stat['median']:<8.1f} {stat['std_dev']:<8.1f} {stat['min']:<8.1f} {stat['max']:<8.1f} {stat['percentile_95']:<8.1f}")
+                print(f"{stat['name'][:29]:<30} {stat['mean']:<8.1f} {stat['median']:<8.1f} {stat['std_dev']:<8.1f} {stat['min']:<8.1f} {stat['max']:<8.1f} {stat['percentile_95']:<8.1f} {stat['percentile_99']:<8.1f} {stat['percentile_99_9']:<8.1f}")
+        
+            self._print_page_timing_breakdown()
+            if self.waterfall:
+                self.waterfall.print_summary()
         
         if api_stats:
-            print(f"\n🚀 API RESPONSE TIMES ({len(api_stats)} endpoints, {NUM_ITERATIONS} iterations each):")
-            print("-" * 78)
-            print(f"{'API Name':<30} {'Mean':<8} {'Median':<8} {'Std Dev':<8} {'Min':<8} {'Max':<8} {'95th %':<8}")
-            print("-" * 78)
+            print(f"\n🚀 API RESPONSE TIMES ({len(api_stats)} endpoints, {self._samples_label()}):")
+            print("-" * 96)
+            print(f"{'API Name':<30} {'Mean':<8} {'Median':<8} {'Std Dev':<8} {'Min':<8} {'Max':<8} {'95th %':<8} {'99th %':<8} {'99.9th %':<8}")
+            print("-" * 96)
             
             for key in sorted(api_stats.keys(), key=lambda x: api_stats[x]['mean']):
                 stat = api_stats[key]
-                print(f"{stat['name'][:29]:<30} {stat['mean']:<8.1f} {stat['median']:<8.1f} {stat['std_dev']:<8.1f} {stat['min']:<8.1f} {stat['max']:<8.1f} {stat['percentile_95']:<8.1f}")
+                print(f"{stat['name'][:29]:<30} {stat['mean']:<8.1f} {stat['median']:<8.1f} {stat['std_dev']:<8.1f} {stat['min']:<8.1f} {stat['max']:<8.1f} {stat['percentile_95']:<8.1f} {stat['percentile_99']:<8.1f} {stat['percentile_99_9']:<8.1f}")
+            
+            self._print_api_phase_breakdown()
+            self.server_timing.print_summary()
+            self.payload.print_summary()
         
         # Overall averages
         all_means = [stat['mean'] for stat in stats.values()]
         if all_means:
             print(f"\n📊 OVERALL STATISTICS:")
-            print(f"  Total Tests: {len(stats)} unique tests × {NUM_ITERATIONS} iterations = {len(stats) * NUM_ITERATIONS} total measurements")
+            print(f"  Total Tests: {len(stats)} unique tests, {self.recorder.total_count} total measurements")
             print(f"  Average Response Time: {statistics.mean(all_means):.2f}ms")
             print(f"  Median Response Time: {statistics.median(all_means):.2f}ms")
             
@@ -353,11 +525,43 @@ class PerformanceTester:
             if api_stats:
                 api_means = [stat['mean'] for stat in api_stats.values()]
                 print(f"  Average API Response Time: {statistics.mean(api_means):.2f}ms")
+        
+        if self.sampler:
+            self.sampler.print_summary(fixed_samples=self.iterations)
 
-async def main():
+async def main(default_scenario=DEFAULT_SCENARIO):
     """Main function to run all tests with multiple iterations"""
+    parser = argparse.ArgumentParser(description="Page load and API response time tests")
+    parser.add_argument("--scenario", default=default_scenario,
+                        help=f"Scenario name ({', '.join(available_scenarios())}) or path to a scenario JSON file")
+    parser.add_argument("--iterations", type=int, help="Override the scenario's number of iterations")
+    parser.add_argument("--resume", metavar="CSV", help="Continue an interrupted run, appending to its results CSV")
+    parser.add_argument("--parquet", action="store_true", default=WRITE_PARQUET,
+                        help="Also stream results to a typed Parquet file (requires pyarrow)")
+    parser.add_argument("--waterfall", action="store_true", default=RECORD_WATERFALL,
+                        help="Record every request of each page visit and print the resource/cache report")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Sample each test until its median/p95 confidence interval converges instead of a fixed count")
+    parser.add_argument("--target-width", type=float, default=ADAPTIVE_TARGET_WIDTH,
+                        help="Adaptive: largest CI width relative to the percentile (0.20 = ±10%%)")
+    parser.add_argument("--min-samples", type=int, default=ADAPTIVE_MIN_SAMPLES, help="Adaptive: samples before checking convergence")
+    parser.add_argument("--max-samples", type=int, default=ADAPTIVE_MAX_SAMPLES, help="Adaptive: sample budget per test")
+    add_live_arguments(parser)
+    args = parser.parse_args()
+    
+    scenario = load_scenario(args.scenario)
+    if args.iterations:
+        scenario["iterations"] = args.iterations
+    iterations = scenario["iterations"]
+    sampler = AdaptiveSampler(args.target_width, args.min_samples, args.max_samples) if args.adaptive else None
     print("Starting Performance Testing with Multiple Iterations...")
-    print(f"Iterations per test: {NUM_ITERATIONS}")
+    print(f"Scenario: {scenario['name']} ({len(scenario['pages'])} pages, {len(scenario['endpoints'])} endpoints)"
+          f"{' - ' + scenario['description'] if scenario['description'] else ''}")
+    if sampler:
+        print(f"Adaptive sampling: until the p50/p95 CI is within {args.target_width * 100:.0f}% "
+              f"({args.min_samples}-{args.max_samples} samples per test)")
+    else:
+        print(f"Iterations per test: {iterations}")
     print("Make sure your Next.js app is running on port 3001!")
     print("Run: npx next start -p 3001")
     print()
@@ -371,33 +575,58 @@ async def main():
         print("Please start your Next.js app with: npx next start -p 3001")
         return
     
-    tester = PerformanceTester()
+    try:
+        tester = PerformanceTester(results_path=args.resume, parquet=args.parquet, resume=args.resume is not None,
+                                   sampler=sampler, waterfall=args.waterfall, scenario=scenario)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    tester.live = start_live_metrics(args, tool="performance_test", scenario=scenario["name"])
     
-    # Run multiple iterations
-    print(f"\n🔄 Running {NUM_ITERATIONS} iterations of performance tests...")
-    for i in range(1, NUM_ITERATIONS + 1):
-        print(f"\n🔍 Iteration {i}/{NUM_ITERATIONS}...")
-        
-        await tester.test_page_load_times(iteration=i)
-        
-        tester.test_api_response_times(iteration=i)
+    finished = False
+    try:
+        # Page loads: all iterations share one browser and run in parallel across its contexts
+        print(f"\n🌐 Measuring {'adaptive rounds' if sampler else f'{iterations} iterations'} of page loads "
+              f"({BROWSER_POOL_SIZE} {CONTEXT_MODE} browser contexts in parallel)...")
+        async with BrowserPool(size=BROWSER_POOL_SIZE, mode=CONTEXT_MODE, sessions=tester.sessions) as pool:
+            await pool.warm_up([(f"{tester.base_url}{page_info['path']}", page_info.get("role"))
+                                for page_info in tester.pages], timeout_ms=REQUEST_TIMEOUT * 1000,
+                               visit=tester.warm_up_visit)
+            if sampler:
+                await tester.test_pages_adaptive(pool)
+            else:
+                await tester.test_page_load_times(pool, iterations=range(1, iterations + 1))
         
-        # Delay between iterations (except last one)
-        if i < NUM_ITERATIONS:
-            time.sleep(DELAY_BETWEEN_ITERATIONS)
-    
-    print(f"\n✅ Completed {NUM_ITERATIONS} iterations!")
+        if sampler:
+            print("\n🔄 Running adaptive rounds of API tests...")
+            tester.test_apis_adaptive()
+        else:
+            # Run multiple iterations
+            print(f"\n🔄 Running {iterations} iterations of API tests...")
+            for i in range(1, iterations + 1):
+                if tester.writer.is_complete("API", i):
+                    continue  # Already on disk from the interrupted run
+                print(f"\n🔍 Iteration {i}/{iterations}...")
+                
+                tester.test_api_response_times(iteration=i)
+                
+                # Delay between iterations (except last one)
+                if i < iterations:
+                    time.sleep(DELAY_BETWEEN_ITERATIONS)
+        finished = True
+    finally:
+        if tester.live:
+            tester.live.stop()
+        # Rows are already on disk up to the last flush; this writes the tail and closes the files
+        filepath = tester.save_results(finished=finished)
     
-    # Save results
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"performance_test_results_{NUM_ITERATIONS}iterations_{timestamp}.csv"
-    tester.save_results(filename)
+    print(f"\n✅ Completed {'adaptive sampling' if sampler else f'{iterations} iterations'}!")
     
     # Print comprehensive summary with statistics
     tester.print_summary()
     
-    print(f"\n✅ Testing completed! Results saved to results/{filename}")
-    print(f"📊 Total measurements: {len(tester.results)}")
+    print(f"\n✅ Testing completed! Results saved to {filepath}")
+    print(f"📊 Total measurements: {tester.recorder.total_count}")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
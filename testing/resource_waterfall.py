@@ -0,0 +1,220 @@
+"""
+Resource Waterfall and Cache Report
+Records every request a page visit makes and reports bundle sizes and HTTP cache effectiveness
+
+A page row only carries the document's load time and HTML size; the JS chunks, CSS, fonts,
+/_next/static assets and API fetches behind it are invisible. WaterfallCapture listens to the
+page's Playwright response/requestfailed events during a visit and joins them with the
+browser's Resource Timing entries, giving one row per request:
+
+- URL, resource type (script, stylesheet, font, fetch, ...), status and Cache-Control header
+- start and duration relative to the navigation start (the waterfall)
+- bytes transferred over the network vs the decoded body size
+- where it came from: network, cache (served from the HTTP cache without a request) or
+  revalidated (a conditional request answered without the body)
+
+Rows are labelled as the first visit of a browser context or a repeat visit, so the report can
+show what the HTTP cache saves on repeat visits and which static assets are downloaded again
+every time. Cross-origin resources without Timing-Allow-Origin report no sizes (cache "opaque").
+
+    python resource_waterfall.py results/performance_test_results_..._waterfall_....csv
+"""
+
+import argparse
+import csv
+from datetime import datetime
+from urllib.parse import urlparse
+
+# CSV columns of the waterfall file and their types (used by StreamingResultsWriter)
+WATERFALL_COLUMNS = [
+    ("Page", str), ("Iteration", int), ("Visit", str), ("URL", str), ("Resource Type", str),
+    ("Status", int), ("Start (ms)", float), ("Duration (ms)", float), ("Transfer (KB)", float),
+    ("Body (KB)", float), ("Cache", str), ("Cache-Control", str), ("Timestamp", str),
+]
+STATIC_TYPES = {"script", "stylesheet", "font", "image", "media"}  # Assets that should be cacheable
+LARGE_RESOURCE_KB = 100  # Decoded size above which a resource is listed as oversized
+TOP_RESOURCES = 10  # Rows in the largest resources and uncached assets tables
+
+# Resource Timing initiator types mapped to Playwright resource types, for requests Playwright
+# never saw (served from the memory cache without a network event)
+_INITIATOR_TYPES = {"script": "script", "link": "stylesheet", "css": "font", "img": "image",
+                    "fetch": "fetch", "xmlhttprequest": "xhr", "navigation": "document"}
+
+_COLLECT_SCRIPT = """
+() => [...performance.getEntriesByType('navigation'), ...performance.getEntriesByType('resource')].map(entry => ({
+    url: entry.name,
+    initiator: entry.initiatorType,
+    start: entry.startTime,
+    duration: entry.duration,
+    transferSize: entry.transferSize,
+    encodedSize: entry.encodedBodySize,
+    decodedSize: entry.decodedBodySize,
+}))
+"""
+
+
+def _cache_state(entry):
+    if entry["transferSize"] == 0 and entry["decodedSize"] == 0:
+        return "opaque"
+    if entry["transferSize"] == 0:
+        return "cache"
+    if entry["encodedSize"] > 0 and entry["transferSize"] < entry["encodedSize"]:
+        return "revalidated"  # Only headers crossed the network (304)
+    return "network"
+
+
+class WaterfallCapture:
+    """Collects the requests of one page visit; use as a context manager around page.goto"""
+
+    def __init__(self, page):
+        self.page = page
+        self._responses = {}  # url -> [(resource type, status, cache-control)] in arrival order
+        self._failed = []
+
+    def _on_response(self, response):
+        self._responses.setdefault(response.url, []).append(
+            (response.request.resource_type, response.status, response.headers.get("cache-control")))
+
+    def _on_failed(self, request):
+        self._failed.append((request.url, request.resource_type, request.failure))
+
+    def __enter__(self):
+        self.page.on("response", self._on_response)
+        self.page.on("requestfailed", self._on_failed)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.page.remove_listener("response", self._on_response)
+        self.page.remove_listener("requestfailed", self._on_failed)
+
+    async def collect(self, page_name, iteration, visit):
+        """Waterfall rows of the visit, ordered by start time"""
+        entries = await self.page.evaluate(_COLLECT_SCRIPT)
+        timestamp = datetime.now().isoformat()
+        rows = []
+        for entry in entries:
+            seen = self._responses.get(entry["url"])
+            resource_type, status, cache_control = (
+                seen.pop(0) if seen else (_INITIATOR_TYPES.get(entry["initiator"], entry["initiator"]), None, None))
+            rows.append({
+                "Page": page_name, "Iteration": iteration, "Visit": visit, "URL": entry["url"],
+                "Resource Type": resource_type, "Status": status,
+                "Start (ms)": round(entry["start"], 2), "Duration (ms)": round(entry["duration"], 2),
+                "Transfer (KB)": round(entry["transferSize"] / 1024, 2), "Body (KB)": round(entry["decodedSize"] / 1024, 2),
+                "Cache": _cache_state(entry), "Cache-Control": cache_control, "Timestamp": timestamp,
+            })
+        for url, resource_type, failure in self._failed:
+            rows.append({
+                "Page": page_name, "Iteration": iteration, "Visit": visit, "URL": url,
+                "Resource Type": resource_type, "Status": None, "Start (ms)": None, "Duration (ms)": None,
+                "Transfer (KB)": 0, "Body (KB)": 0, "Cache": f"failed: {failure}", "Cache-Control": None,
+                "Timestamp": timestamp,
+            })
+        return rows
+
+
+def _asset_key(url):
+    """URL without query string, so cache-busting parameters do not split one asset"""
+    parsed = urlparse(url)
+    return f"{parsed.path}" if parsed.netloc.startswith(("localhost", "127.0.0.1")) else f"{parsed.netloc}{parsed.path}"
+
+
+class WaterfallRecorder:
+    """Per page and visit kind aggregates of the waterfall rows, and the cache report"""
+
+    def __init__(self):
+        self.visits = {}  # (page, visit) -> {"visits", "requests", "transfer", "body", "cached", "js", "api", "end"}
+        self.assets = {}  # asset -> {"type", "body", "pages", "repeat", "repeat_network", "cache_control"}
+
+    def record(self, rows):
+        """Add the rows of one page visit"""
+        if not rows:
+            return
+        page, visit = rows[0]["Page"], rows[0]["Visit"]
+        totals = self.visits.setdefault((page, visit), dict.fromkeys(
+            ("visits", "requests", "transfer", "body", "cached", "js", "api", "end"), 0))
+        totals["visits"] += 1
+        for row in rows:
+            if row["Resource Type"] == "document":
+                continue  # The HTML itself is covered by the page rows
+            totals["requests"] += 1
+            totals["transfer"] += row["Transfer (KB)"] or 0
+            totals["body"] += row["Body (KB)"] or 0
+            totals["cached"] += row["Cache"] == "cache"
+            totals["js"] += (row["Body (KB)"] or 0) if row["Resource Type"] == "script" else 0
+            totals["api"] += row["Resource Type"] in ("fetch", "xhr")
+            if row["Start (ms)"] is not None:
+                totals["end"] = max(totals["end"], row["Start (ms)"] + row["Duration (ms)"])
+
+            asset = self.assets.setdefault(_asset_key(row["URL"]), {
+                "type": row["Resource Type"], "body": 0, "pages": set(), "repeat": 0, "repeat_network": 0,
+                "cache_control": None})
+            asset["body"] = max(asset["body"], row["Body (KB)"] or 0)
+            asset["pages"].add(page)
+            asset["cache_control"] = row["Cache-Control"] or asset["cache_control"]
+            if visit == "repeat":
+                asset["repeat"] += 1
+                asset["repeat_network"] += row["Cache"] == "network"
+
+    def print_summary(self):
+        if not self.visits:
+            return
+        print("\n" + "=" * 96)
+        print("RESOURCE WATERFALL (averages per visit; first = new browser context, repeat = warm cache)")
+        print("=" * 96)
+        print(f"{'Page':<30} {'Visit':<7} {'Visits':<7} {'Requests':<9} {'Transfer KB':<12} {'Body KB':<9} "
+              f"{'JS KB':<8} {'Cached %':<9} {'Done (ms)':<9}")
+        print("-" * 96)
+        for (page, visit), totals in sorted(self.visits.items()):
+            count = totals["visits"]
+            cached = totals["cached"] / totals["requests"] * 100 if totals["requests"] else 0
+            print(f"{page[:29]:<30} {visit:<7} {count:<7} {totals['requests'] / count:<9.1f} "
+                  f"{totals['transfer'] / count:<12.1f} {totals['body'] / count:<9.1f} {totals['js'] / count:<8.1f} "
+                  f"{cached:<9.0f} {totals['end'] / count:<9.0f}")
+
+        largest = sorted(self.assets.items(), key=lambda item: -item[1]["body"])[:TOP_RESOURCES]
+        largest = [(key, asset) for key, asset in largest if asset["body"] >= LARGE_RESOURCE_KB]
+        if largest:
+            print(f"\n📦 Largest resources (>= {LARGE_RESOURCE_KB} KB decoded):")
+            for key, asset in largest:
+                print(f"  {asset['body']:>8.1f} KB  {asset['type']:<10} {key[:50]:<50} ({len(asset['pages'])} pages)")
+
+        uncached = [(key, asset) for key, asset in self.assets.items()
+                    if asset["type"] in STATIC_TYPES and asset["repeat"] and asset["repeat_network"] / asset["repeat"] > 0.5]
+        uncached.sort(key=lambda item: -item[1]["body"] * item[1]["repeat_network"])
+        if uncached:
+            print("\n🔁 Static assets downloaded again on repeat visits:")
+            for key, asset in uncached[:TOP_RESOURCES]:
+                print(f"  {asset['repeat_network']}/{asset['repeat']:<4} {asset['body']:>8.1f} KB  {key[:46]:<46} "
+                      f"Cache-Control: {asset['cache_control'] or '-'}")
+        elif any(visit == "repeat" for _, visit in self.visits):
+            print("\n✅ Every static asset was served from the HTTP cache on repeat visits")
+
+
+def _parse_row(row):
+    parsed = {}
+    for name, column_type in WATERFALL_COLUMNS:
+        value = row.get(name)
+        parsed[name] = column_type(float(value)) if value not in (None, "") and column_type is not str else (value or None)
+    return parsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the resource waterfall and cache report of a saved waterfall CSV")
+    parser.add_argument("files", nargs="+", help="Waterfall CSV files written by performance_test.py --waterfall")
+    args = parser.parse_args()
+
+    recorder = WaterfallRecorder()
+    for filepath in args.files:
+        visits = {}
+        with open(filepath, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                row = _parse_row(row)
+                visits.setdefault((row["Page"], row["Iteration"], row["Visit"], row["Timestamp"]), []).append(row)
+        for rows in visits.values():
+            recorder.record(rows)
+    recorder.print_summary()
+
+
+if __name__ == "__main__":
+    main()
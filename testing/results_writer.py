@@ -0,0 +1,194 @@
+"""
+Streaming Results Writer
+Writes test samples to disk in batches while a run is in progress
+
+Rows are appended to the CSV every FLUSH_BATCH_SIZE samples (and whenever a test phase of an
+iteration completes), so a crash or Ctrl-C only loses the unflushed tail of the run. A small
+checkpoint file next to the CSV lists which (phase, iteration) units are complete; reopening the
+same CSV with resume=True drops rows of half-finished units and lets the tester skip the rest.
+The checkpoint also stores the run's parameters (columns, plus whatever the tester passes as
+run_info, e.g. scenario and iterations): a resume whose parameters differ is refused rather than
+mixing two different runs in one file. The checkpoint is deleted once a finished run is closed.
+
+Optionally the same rows are streamed into a Parquet file with typed columns, one row group per
+flush, for fast loading in pandas. The Parquet footer is only written on close(), so after a
+crash the Parquet file is rebuilt from the CSV when the run is resumed.
+"""
+
+import csv
+import json
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional
+    pa = None
+    pq = None
+
+# Configuration
+FLUSH_BATCH_SIZE = 50  # Samples buffered in memory before being appended to disk
+
+
+def _parse(value, column_type):
+    """Convert a CSV cell back to its column type (empty cells become None)"""
+    if value in ("", None):
+        return None
+    if column_type is int:
+        return int(float(value))
+    if column_type is float:
+        return float(value)
+    return value
+
+
+class StreamingResultsWriter:
+    def __init__(self, filepath, columns, parquet=False, resume=False, batch_size=FLUSH_BATCH_SIZE, run_info=None):
+        """
+        filepath: CSV file to append to
+        columns: list of (column name, python type) pairs, types are str, int or float
+        parquet: also write a typed Parquet file next to the CSV (requires pyarrow)
+        resume: continue an interrupted run in the same file instead of starting over
+        run_info: JSON-serializable parameters a resumed run must match (e.g. scenario, iterations)
+        """
+        self.filepath = filepath
+        self.columns = columns
+        self.fieldnames = [name for name, _ in columns]
+        self.batch_size = batch_size
+        self.progress_path = f"{os.path.splitext(filepath)[0]}.progress.json"
+        self.run_info = {"columns": self.fieldnames, **(run_info or {})}
+        self.parquet_path = f"{os.path.splitext(filepath)[0]}.parquet" if parquet else None
+        self.completed = set()
+        self.resumed_rows = []
+        self._buffer = []
+        self._parquet_writer = None
+
+        if parquet and pa is None:
+            print("⚠️ pyarrow is not installed, skipping Parquet output (pip install pyarrow)")
+            self.parquet_path = None
+
+        if resume and os.path.exists(filepath):
+            self._load_checkpoint()
+        else:
+            with open(self.filepath, 'w', newline='', encoding='utf-8') as f:
+                csv.DictWriter(f, fieldnames=self.fieldnames).writeheader()
+            self._save_checkpoint()
+
+        if self.parquet_path:
+            self._parquet_writer = pq.ParquetWriter(self.parquet_path, self._arrow_schema())
+            if self.resumed_rows:
+                self._write_parquet(self.resumed_rows)
+
+    def _arrow_schema(self):
+        arrow_types = {str: pa.string(), int: pa.int64(), float: pa.float64()}
+        return pa.schema([(name, arrow_types[column_type]) for name, column_type in self.columns])
+
+    def _load_checkpoint(self):
+        """Keep the rows of completed units from an interrupted run and rewrite the CSV with only those
+
+        Without a checkpoint no unit is known to be complete, so the file is left untouched and the
+        resume refused (a finished run has already deleted its checkpoint).
+        """
+        if not os.path.exists(self.progress_path):
+            raise ValueError(f"Cannot resume {self.filepath}: no checkpoint at {self.progress_path} "
+                             f"(the run already finished, or was never checkpointed)")
+        with open(self.progress_path, encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        stored = checkpoint.get("run")
+        if stored is not None and stored != self.run_info:
+            changed = ", ".join(f"{key} {stored.get(key)!r} (now {self.run_info.get(key)!r})"
+                                for key in sorted(stored.keys() | self.run_info.keys())
+                                if stored.get(key) != self.run_info.get(key))
+            raise ValueError(f"Cannot resume {self.filepath}: the interrupted run had {changed}")
+        self.completed = {tuple(unit) for unit in checkpoint["completed"]}
+
+        with open(self.filepath, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                parsed = {name: _parse(row.get(name), column_type) for name, column_type in self.columns}
+                if (parsed.get("Type"), parsed.get("Iteration")) in self.completed:
+                    self.resumed_rows.append(parsed)
+
+        temp_path = f"{self.filepath}.tmp"
+        with open(temp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=self.fieldnames)
+            writer.writeheader()
+            writer.writerows(self.resumed_rows)
+        os.replace(temp_path, self.filepath)
+        print(f"♻️  Resuming {self.filepath}: {len(self.completed)} completed units, {len(self.resumed_rows)} rows kept")
+
+    def _save_checkpoint(self):
+        temp_path = f"{self.progress_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"completed": sorted(self.completed), "run": self.run_info}, f)
+        os.replace(temp_path, self.progress_path)
+
+    def _write_parquet(self, rows):
+        columns = {name: [row.get(name) for row in rows] for name in self.fieldnames}
+        self._parquet_writer.write_table(pa.Table.from_pydict(columns, schema=self._arrow_schema()))
+
+    def is_complete(self, phase, iteration):
+        return (phase, iteration) in self.completed
+
+    def write(self, row):
+        self._buffer.append(row)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Append buffered rows to disk and make sure they survive a crash"""
+        if not self._buffer:
+            return
+        with open(self.filepath, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=self.fieldnames, extrasaction='ignore')
+            writer.writerows(self._buffer)
+            f.flush()
+            os.fsync(f.fileno())
+        if self._parquet_writer:
+            self._write_parquet(self._buffer)
+        self._buffer = []
+
+    def mark_complete(self, phase, iteration):
+        """Flush and record that every sample of this phase/iteration is on disk"""
+        self.flush()
+        self.completed.add((phase, iteration))
+        self._save_checkpoint()
+
+    def close(self, finished=True):
+        """Flush and close the files; a finished run no longer needs its checkpoint
+
+        finished: False when the run was interrupted, keeping the checkpoint for a later resume
+        """
+        self.flush()
+        if self._parquet_writer:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+        if finished and os.path.exists(self.progress_path):
+            os.remove(self.progress_path)
+
+
+def load_results(filepaths, columns=None):
+    """Load one or more result files into a single DataFrame, preferring the Parquet copy of each run
+
+    columns: only load these columns (those a file does not have are skipped)
+
+    The Parquet footer is only written on close(), so the Parquet file of a crashed run is
+    unreadable; that run is loaded from its CSV instead.
+    """
+    import pandas as pd
+
+    frames = []
+    for filepath in filepaths:
+        parquet_path = f"{os.path.splitext(filepath)[0]}.parquet"
+        frame = None
+        if os.path.exists(parquet_path):
+            try:
+                frame = pd.read_parquet(parquet_path)
+            except (OSError, ValueError) as e:  # pyarrow's ArrowInvalid is a ValueError
+                print(f"⚠️ {parquet_path} is unreadable ({e}), loading {filepath} instead")
+            else:
+                if columns:
+                    frame = frame[[column for column in frame.columns if column in columns]]
+        if frame is None:
+            frame = pd.read_csv(filepath, usecols=(lambda column: column in columns) if columns else None)
+        frame["Run"] = os.path.basename(os.path.splitext(filepath)[0])
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
@@ -0,0 +1,261 @@
+"""
+Data-Size Scaling Sweep
+Measures how list endpoint latency grows with table size and query parameters
+
+The other testers run against whatever happens to be in the database (a few hundred rows), which
+hides queries that scan or count the whole table. This sweep seeds item instances and item transits
+at increasing sizes (SCALE_LEVELS, additively) and, at every size, requests each combination of
+pagination and filter parameters in SWEEP_QUERIES a fixed number of times.
+
+For every query it reports p50/p95 latency per table size and the scaling exponent: the slope of
+log(p50) against log(rows). An indexed, paginated query should stay close to 0; a value near 1
+means latency grows linearly with the table (e.g. a count over every row or a missing index).
+
+Targets:
+- --target stub:     the offline stub server (stub_server.py) rebuilds its tables in-process
+- --target supabase: rows are bulk-inserted through PostgREST into the database the app uses
+                     (test projects only; remove them again with --cleanup)
+"""
+
+import argparse
+import asyncio
+import csv
+import itertools
+import os
+import time
+from datetime import datetime
+from urllib.parse import urlencode
+
+import aiohttp
+import numpy as np
+
+from dataset_seeder import StubSeeder, SupabaseSeeder
+from load_test import BASE_URL, RESULTS_DIR, LoadTester
+
+# Configuration
+SCALE_LEVELS = [1_000, 10_000, 100_000, 1_000_000]  # Item instance / transit rows per level
+SAMPLES_PER_POINT = 5  # Measured requests per query and table size
+WARMUP_REQUESTS = 1  # Unmeasured requests per query before sampling
+SCALING_EXPONENT_WARN = 0.25  # Flag queries whose p50 grows faster than rows ** exponent
+NODE_FILTER = "{node_id}"  # Replaced with the id of a seeded node
+
+# Parameter grid per endpoint; None leaves the parameter out of the query string
+SWEEP_QUERIES = {
+    "Item Instances API": {"endpoint": "/api/item-instances", "params": {
+        "page": [1, 50],
+        "page_size": [10, 100],
+        "node_id": [None, NODE_FILTER],
+        "status": [None, "inactive"],
+        "expired": [None, "true"],
+    }},
+    "Item Transits API": {"endpoint": "/api/item-transits", "params": {
+        "page": [1, 50],
+        "page_size": [10, 100],
+        "source_node_id": [None, NODE_FILTER],
+    }},
+    "Nodes API": {"endpoint": "/api/nodes", "params": {
+        "page": [1],
+        "page_size": [10, 100],
+    }},
+}
+
+
+def sweep_points(queries=None):
+    """Expand the parameter grids into (name, endpoint, params) points"""
+    points = []
+    for name, query in (queries or SWEEP_QUERIES).items():
+        grid = query["params"]
+        for values in itertools.product(*grid.values()):
+            params = {key: value for key, value in zip(grid, values) if value is not None}
+            points.append((name, query["endpoint"], params))
+    return points
+
+
+class ScalingSweep(LoadTester):
+    def __init__(self, base_url=BASE_URL, seeder=None, levels=None, samples=SAMPLES_PER_POINT, queries=None):
+        super().__init__(base_url=base_url)
+        self.seeder = seeder or StubSeeder(base_url)
+        self.levels = sorted(levels or SCALE_LEVELS)
+        self.samples = samples
+        self.points = sweep_points(queries)
+        self.keep_samples = False
+        self.mode = "scaling"
+        self.level = None
+        self.sizes = {}  # (rows, query) -> response size of the last sample in KB
+        self.seed_times = {}  # rows -> seconds spent seeding the level
+
+    def _record(self, result):
+        """Key samples by table size as well, so every level gets its own histograms"""
+        self.recorder.record((self.level, result["Name"], result["Status"]), result["Load Time (ms)"])
+        if result["Size (KB)"] >= 0:
+            self.sizes[(self.level, result["Name"])] = result["Size (KB)"]
+
+    async def run(self, cleanup=False):
+        print(f"\n📏 Sweeping {len(self.points)} queries x {self.samples} samples over {self.levels} rows...")
+        connector = self._new_connector()
+        sessions = await self._open_sessions(connector, 1)
+        session = sessions[0]
+        seed_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None))
+        start = time.perf_counter()
+        try:
+            for level in self.levels:
+                seed_start = time.perf_counter()
+                node_ids = await self.seeder.seed(seed_session, level)
+                self.seed_times[level] = time.perf_counter() - seed_start
+                print(f"  🌱 Seeded {level:,} rows in {self.seed_times[level]:.1f}s, measuring...")
+
+                self.level = level
+                for name, endpoint, params in self.points:
+                    params = {key: str(value).replace(NODE_FILTER, node_ids[0]) for key, value in params.items()}
+                    url = f"{endpoint}?{urlencode(params)}" if params else endpoint
+                    label = self._label(name, params)
+                    for _ in range(WARMUP_REQUESTS):
+                        async with session.get(f"{self.base_url}{url}") as response:
+                            await response.read()
+                    for _ in range(self.samples):
+                        await self._send(session, {"name": label, "method": "GET", "endpoint": url}, 0)
+        finally:
+            self.duration = time.perf_counter() - start
+            if cleanup:
+                await self.seeder.cleanup(seed_session)
+                print("  🧹 Seeded rows removed")
+            await seed_session.close()
+            await session.close()
+            await connector.close()
+
+    @staticmethod
+    def _label(name, params):
+        shown = "&".join(f"{key}={'<node>' if key.endswith('node_id') else value}" for key, value in params.items())
+        return f"{name} {shown}".strip()
+
+    def scaling_table(self):
+        """p50/p95 per query and table size plus the fitted scaling exponent of each query"""
+        ok = self.recorder.grouped(lambda key: key[:2] if key[2] == "OK" else None)
+        attempts = {key: h.count for key, h in self.recorder.grouped(lambda key: key[:2]).items()}
+        for key, count in self.recorder.failures_by(lambda key: key[:2]).items():
+            attempts[key] = attempts.get(key, 0) + count
+
+        rows = []
+        for label in sorted({key[1] for key in attempts}):
+            curve = []
+            for level in self.levels:
+                histogram = ok.get((level, label))
+                requests = attempts.get((level, label), 0)
+                curve.append({
+                    "Rows": level,
+                    "Query": label,
+                    "Requests": requests,
+                    "Errors": requests - (histogram.count if histogram else 0),
+                    "Mean (ms)": round(histogram.mean, 2) if histogram else None,
+                    "p50 (ms)": round(histogram.percentile(50), 2) if histogram else None,
+                    "p95 (ms)": round(histogram.percentile(95), 2) if histogram else None,
+                    "Size (KB)": self.sizes.get((level, label)),
+                })
+            measured = [(point["Rows"], point["p50 (ms)"]) for point in curve if point["p50 (ms)"]]
+            exponent = None
+            if len(measured) >= 2:
+                exponent = round(float(np.polyfit(np.log([r for r, _ in measured]), np.log([p for _, p in measured]), 1)[0]), 3)
+            for point in curve:
+                point["Scaling Exponent"] = exponent
+            rows.extend(curve)
+        return rows
+
+    def save_results(self, filename=None):
+        """Save the latency-vs-rows table to CSV and the raw histograms next to it"""
+        rows = self.scaling_table()
+        if not rows:
+            print("No results to save!")
+            return
+        if filename is None:
+            filename = f"scaling_sweep_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        filepath = os.path.join(RESULTS_DIR, filename)
+        with open(filepath, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        self.recorder.save(filepath.replace(".csv", "_histograms.json"))
+        print(f"Results saved to {filepath}")
+        return filepath
+
+    def save_plot(self, filepath):
+        """Log-log chart of p50 latency against table size, one line per query"""
+        import matplotlib.pyplot as plt
+
+        rows = self.scaling_table()
+        fig, ax = plt.subplots(figsize=(12, 7))
+        for label in dict.fromkeys(row["Query"] for row in rows):
+            curve = [row for row in rows if row["Query"] == label and row["p50 (ms)"]]
+            ax.plot([row["Rows"] for row in curve], [row["p50 (ms)"] for row in curve], marker="o", label=label)
+        ax.set_xscale("log")
+        ax.set_yscale("log")
+        ax.set_xlabel("Rows per table")
+        ax.set_ylabel("p50 latency (ms)")
+        ax.set_title("Latency vs table size")
+        ax.legend(fontsize=6, loc="upper left")
+        fig.tight_layout()
+        fig.savefig(filepath, dpi=150)
+        print(f"Plot saved to {filepath}")
+
+    def print_summary(self):
+        """Print p50 per table size for every query, worst scaling first"""
+        rows = self.scaling_table()
+        if not rows:
+            print("No results to summarize!")
+            return
+
+        curves = {}
+        for row in rows:
+            curves.setdefault(row["Query"], []).append(row)
+        width = 76 + 10 * len(self.levels) + 10
+        print("\n" + "=" * width)
+        print(f"SCALING SWEEP SUMMARY (p50 ms per table size, {self.samples} samples per point)")
+        print("=" * width)
+        print(f"{'Query':<76}" + "".join(f"{level:<10,}" for level in self.levels) + f"{'Exponent':<10}")
+        print("-" * width)
+        flagged = []
+        ordered = sorted(curves.items(), key=lambda item: -(item[1][0]["Scaling Exponent"] or 0))
+        for label, curve in ordered:
+            cells = "".join(f"{row['p50 (ms)']:<10.1f}" if row["p50 (ms)"] else f"{'-':<10}" for row in curve)
+            exponent = curve[0]["Scaling Exponent"]
+            print(f"{label[:75]:<76}{cells}{exponent if exponent is not None else '-':<10}")
+            if exponent is not None and exponent > SCALING_EXPONENT_WARN:
+                flagged.append((label, exponent))
+
+        seeding = ", ".join(f"{level:,}: {seconds:.1f}s" for level, seconds in self.seed_times.items())
+        print(f"\n🌱 Seeding time per level: {seeding}")
+        if flagged:
+            print(f"⚠️  {len(flagged)} queries scale worse than rows^{SCALING_EXPONENT_WARN}:")
+            for label, exponent in flagged:
+                print(f"  - {label} (latency ~ rows^{exponent})")
+        else:
+            print("✅ No query's latency grows noticeably with table size")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Latency vs data size sweep over the list endpoints")
+    parser.add_argument("--target", choices=["stub", "supabase"], default="stub",
+                        help="stub: reseed stub_server.py in-process, supabase: bulk-insert through PostgREST")
+    parser.add_argument("--levels", type=int, nargs="+", default=SCALE_LEVELS, help="Table sizes to sweep")
+    parser.add_argument("--samples", type=int, default=SAMPLES_PER_POINT, help="Measured requests per query and size")
+    parser.add_argument("--cleanup", action="store_true", help="Remove the seeded rows afterwards")
+    parser.add_argument("--plot", action="store_true", help="Also save a log-log latency vs rows chart")
+    parser.add_argument("--base-url", default=BASE_URL)
+    args = parser.parse_args()
+
+    print("🚀 Scaling Sweep Starting...")
+    if args.target == "supabase":
+        print("⚠️  This inserts up to millions of rows into the Supabase project - use a test database")
+        seeder = SupabaseSeeder()
+    else:
+        seeder = StubSeeder(args.base_url)
+
+    sweep = ScalingSweep(base_url=args.base_url, seeder=seeder, levels=args.levels, samples=args.samples)
+    await sweep.run(cleanup=args.cleanup)
+    filepath = sweep.save_results()
+    sweep.print_summary()
+    if args.plot and filepath:
+        sweep.save_plot(filepath.replace(".csv", ".png"))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,149 @@
+"""
+Traffic-Mix Scenarios
+Declarative page/endpoint mixes shared by the quick, full and load profiles
+
+A scenario is a JSON file in scenarios/ (or any path) describing what a run exercises:
+
+    {
+      "name": "full",
+      "description": "Every page and endpoint once per iteration",
+      "iterations": 30,
+      "results_prefix": "performance_test_results",
+      "pages": [
+        {"name": "Dashboard Admin Pusat", "path": "/super-admin", "role": "admin_pusat", "weight": 1}
+      ],
+      "endpoints": [
+        {"name": "Login API (Invalid Credentials)", "method": "POST", "endpoint": "/api/login",
+         "data": {"email": "test@invalid.com", "password": "wrongpassword"}, "expect": {"401": "Expected 401"}},
+        {"name": "Item Instances API", "endpoint": "/api/item-instances", "role": "admin_pusat", "weight": 8}
+      ]
+    }
+
+- role: account the request or visit is made as (auth_sessions.ROLE_CREDENTIALS), null = logged out
+- weight: relative share of the traffic; each iteration issues sum(weights) requests, every entry
+  as often as its weight, interleaved with smooth weighted round-robin (a 3:1 mix runs A A B A)
+- expect: status codes that are the expected outcome for this request and the label they get
+  (everything else is OK below 400, an auth issue on 401/403 with a role, or an error)
+
+Names are the test names in every result file, so one endpoint has one name across all profiles.
+"""
+
+import json
+import os
+
+from auth_sessions import ROLE_CREDENTIALS
+
+# Configuration
+SCENARIO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenarios")
+DEFAULT_SCENARIO = "full"
+DEFAULT_ITERATIONS = 30
+HTTP_METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE")
+# Non-error labels the testers write besides "Expected ..." (classify_status, performance_test.py pages)
+SUCCESS_STATUSES = ("OK", "Not Found (404)", "Redirected to Login")
+
+
+def scenario_path(name_or_path):
+    """Path of a scenario given by file path or by name in SCENARIO_DIR"""
+    if os.path.exists(name_or_path):
+        return name_or_path
+    return os.path.join(SCENARIO_DIR, f"{name_or_path}.json")
+
+
+def available_scenarios():
+    return sorted(os.path.splitext(name)[0] for name in os.listdir(SCENARIO_DIR) if name.endswith(".json"))
+
+
+def _entry(raw, kind, index):
+    """Validate one page or endpoint entry and fill in the defaults"""
+    location = "path" if kind == "pages" else "endpoint"
+    for key in ("name", location):
+        if not raw.get(key):
+            raise ValueError(f"{kind}[{index}] needs a '{key}'")
+    entry = {
+        "name": raw["name"],
+        location: raw[location],
+        "role": raw.get("role"),
+        "weight": raw.get("weight", 1),
+    }
+    if entry["role"] is not None and entry["role"] not in ROLE_CREDENTIALS:
+        raise ValueError(f"{raw['name']}: unknown role '{entry['role']}', expected one of {sorted(ROLE_CREDENTIALS)} or null")
+    if not isinstance(entry["weight"], int) or entry["weight"] < 0:
+        raise ValueError(f"{raw['name']}: weight must be a non-negative integer")
+    if kind == "endpoints":
+        entry["method"] = raw.get("method", "GET").upper()
+        if entry["method"] not in HTTP_METHODS:
+            raise ValueError(f"{raw['name']}: unsupported method '{entry['method']}'")
+        entry["data"] = raw.get("data")
+        entry["expect"] = {str(code): label for code, label in raw.get("expect", {}).items()}
+    return entry
+
+
+def load_scenario(name_or_path=DEFAULT_SCENARIO):
+    """Load and validate a scenario; entries with weight 0 are kept out of the run"""
+    path = scenario_path(name_or_path)
+    if not os.path.exists(path):
+        raise ValueError(f"Scenario '{name_or_path}' not found, available: {', '.join(available_scenarios())}")
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+
+    scenario = {
+        "name": raw.get("name", os.path.splitext(os.path.basename(path))[0]),
+        "description": raw.get("description", ""),
+        "iterations": raw.get("iterations", DEFAULT_ITERATIONS),
+        "results_prefix": raw.get("results_prefix", "performance_test_results"),
+        "path": path,
+    }
+    for kind in ("pages", "endpoints"):
+        entries = [_entry(entry, kind, index) for index, entry in enumerate(raw.get(kind, []))]
+        names = [entry["name"] for entry in entries]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ValueError(f"{path}: duplicate {kind} names {duplicates}")
+        scenario[kind] = [entry for entry in entries if entry["weight"] > 0]
+    return scenario
+
+
+def weighted_sequence(entries):
+    """One round of the mix: each entry as often as its weight, evenly interleaved
+
+    Smooth weighted round-robin, so a round is deterministic and a 3:1 mix runs A A B A
+    instead of A A A B.
+    """
+    total = sum(entry["weight"] for entry in entries)
+    current = [0] * len(entries)
+    sequence = []
+    for _ in range(total):
+        for i, entry in enumerate(entries):
+            current[i] += entry["weight"]
+        chosen = max(range(len(entries)), key=current.__getitem__)
+        current[chosen] -= total
+        sequence.append(entries[chosen])
+    return sequence
+
+
+def is_success_status(status):
+    """Whether a status label marks a valid sample: OK or an expected outcome, not a failure"""
+    return status in SUCCESS_STATUSES or str(status).startswith("Expected")
+
+
+def classify_status(api_info, status_code):
+    """Status label of an API response, honouring the endpoint's expected outcomes"""
+    expected = api_info.get("expect", {}).get(str(status_code))
+    if expected:
+        return expected
+    if status_code < 400:
+        return "OK"
+    if api_info.get("role") and status_code in (401, 403):
+        return f"Auth Issue ({status_code})"
+    if status_code == 404:
+        return "Not Found (404)"  # API might not exist, but response time is still valid
+    return f"Error {status_code}"
+
+
+def lookup(data, dotted_path):
+    """Value at a dotted path in a JSON response (e.g. "data.pagination.has_next"), None if absent"""
+    for key in dotted_path.split("."):
+        if not isinstance(data, dict) or key not in data:
+            return None
+        data = data[key]
+    return data
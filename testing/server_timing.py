@@ -0,0 +1,191 @@
+"""
+Server Timing Correlation
+Splits API latency into server compute and network/client overhead using response timing headers
+
+Client-side phases (http_timing.py) can show that time was spent waiting for the first byte, but
+not how much of that the server spent working. The API routes report it themselves in a
+Server-Timing header (see ServerTiming in lib/api-helpers.ts), which the app only sends when it
+is started with SERVER_TIMING=1 so production clients never see internal timings:
+
+    Server-Timing: mw;dur=3.2;desc="updateSession", db;dur=41.0, transform;dur=1.2, app;dur=44.9
+
+    mw         the updateSession middleware (middleware.ts)
+    app        the whole route handler (handleApiError)
+    db         Supabase queries
+    transform  shaping rows into the response
+    total      optional; when present it is used as the server time as-is
+
+Server time is `total` when reported, otherwise app + mw. Responses without Server-Timing fall
+back to X-Response-Time (milliseconds) or X-Runtime (seconds, Rails/Rack style). Everything the
+client measured beyond the server time is network/client overhead: connect, TLS, transfer,
+proxies, queueing and the client itself.
+"""
+
+import re
+
+from latency_histogram import HistogramRecorder
+
+# Per-sample columns added to API result rows
+SERVER_TIMING_COLUMNS = ["Server (ms)", "Middleware (ms)", "Server Timing"]
+SERVER_TOTAL_METRIC = "total"
+SERVER_PARTS = ("app", "mw")  # Summed into the server time when no total is reported
+SUMMARY_METRICS = 4  # Server-Timing metrics shown per endpoint in the summary
+
+_PARAM = re.compile(r'\s*([^=;\s]+)\s*(?:=\s*("(?:[^"\\]|\\.)*"|[^;]*))?')
+
+
+def parse_server_timing(values):
+    """Parse Server-Timing header values into {metric: duration ms}
+
+    Accepts a single header value or a list of values (repeated headers); metrics without a
+    duration count as 0 and repeated metrics are summed.
+    """
+    if isinstance(values, str):
+        values = [values]
+    metrics = {}
+    for value in values or []:
+        for entry in _split_entries(value):
+            name, *params = entry.split(";")
+            name = name.strip()
+            if not name:
+                continue
+            duration = 0.0
+            for param in params:
+                match = _PARAM.match(param)
+                if match and match.group(1).lower() == "dur":
+                    try:
+                        duration = float((match.group(2) or "0").strip('"'))
+                    except ValueError:
+                        pass
+            metrics[name] = metrics.get(name, 0.0) + duration
+    return metrics
+
+
+def _split_entries(value):
+    """Split a header value on commas outside quoted descriptions"""
+    entries, current, quoted = [], [], False
+    for char in value:
+        if char == '"':
+            quoted = not quoted
+        if char == "," and not quoted:
+            entries.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    entries.append("".join(current))
+    return [entry.strip() for entry in entries if entry.strip()]
+
+
+def _header_values(headers, name):
+    if hasattr(headers, "getall"):  # aiohttp multidict keeps repeated headers separate
+        return headers.getall(name, [])
+    value = headers.get(name)  # requests already joins repeated headers with commas
+    return [value] if value else []
+
+
+def server_timing_row(headers):
+    """Server timing columns of a result row from the response headers (empty when not reported)"""
+    metrics = parse_server_timing(_header_values(headers, "Server-Timing"))
+    server_ms = None
+    if SERVER_TOTAL_METRIC in metrics:
+        server_ms = metrics[SERVER_TOTAL_METRIC]
+    elif any(part in metrics for part in SERVER_PARTS):
+        server_ms = sum(metrics.get(part, 0.0) for part in SERVER_PARTS)
+    elif headers.get("X-Response-Time"):
+        server_ms = _number(headers["X-Response-Time"].lower().removesuffix("ms"))
+    elif headers.get("X-Runtime"):
+        seconds = _number(headers["X-Runtime"])
+        server_ms = seconds * 1000 if seconds is not None else None
+    return {
+        "Server (ms)": round(server_ms, 3) if server_ms is not None else None,
+        "Middleware (ms)": metrics.get("mw"),
+        "Server Timing": ";".join(f"{name}={duration:g}" for name, duration in metrics.items()) or None,
+    }
+
+
+def _number(text):
+    try:
+        return float(text.strip())
+    except ValueError:
+        return None
+
+
+def _compact_metrics(text):
+    """Inverse of the compact "name=dur;..." format of the Server Timing column"""
+    metrics = {}
+    for part in (text or "").split(";"):
+        name, _, duration = part.partition("=")
+        if name and _number(duration) is not None:
+            metrics[name] = _number(duration)
+    return metrics
+
+
+class ServerTimingRecorder:
+    """Histograms of server time, overhead and every Server-Timing metric, per endpoint"""
+
+    def __init__(self):
+        self.recorder = HistogramRecorder()
+        self.samples = {}  # endpoint -> [samples with server timing, successful samples]
+
+    def record(self, result):
+        if result["Load Time (ms)"] < 0:
+            return
+        counts = self.samples.setdefault(result["Name"], [0, 0])
+        counts[1] += 1
+        server_ms = result.get("Server (ms)")
+        if server_ms is None:
+            return
+        counts[0] += 1
+        load_ms = result["Load Time (ms)"]
+        self.recorder.record((result["Name"], "Total"), load_ms)
+        self.recorder.record((result["Name"], "Server"), server_ms)
+        self.recorder.record((result["Name"], "Overhead"), max(0.0, load_ms - server_ms))
+        for metric, duration in _compact_metrics(result.get("Server Timing")).items():
+            self.recorder.record((result["Name"], f"metric:{metric}"), duration)
+
+    def merge(self, other):
+        self.recorder.merge(other.recorder)
+        for name, (timed, total) in other.samples.items():
+            counts = self.samples.setdefault(name, [0, 0])
+            counts[0] += timed
+            counts[1] += total
+        return self
+
+    def to_dict(self):
+        return {"recorder": self.recorder.to_dict(), "samples": self.samples}
+
+    @classmethod
+    def from_dict(cls, data):
+        timing = cls()
+        timing.recorder = HistogramRecorder.from_dict(data["recorder"])
+        timing.samples = {name: list(counts) for name, counts in data["samples"].items()}
+        return timing
+
+    def print_summary(self):
+        """Print server compute vs network/client overhead per endpoint"""
+        histograms = self.recorder.histograms
+        endpoints = sorted({name for name, _ in histograms})
+        if not endpoints:
+            if self.samples:
+                print("\nℹ️  No Server-Timing headers in the API responses (start the app with SERVER_TIMING=1)")
+            return
+
+        print("\n" + "=" * 96)
+        print("SERVER TIME VS NETWORK/CLIENT OVERHEAD (medians)")
+        print("=" * 96)
+        print(f"{'API':<26} {'Timed':<8} {'Total (ms)':<11} {'Server':<9} {'Overhead':<9} {'Server %':<9} {'Server-Timing metrics':<20}")
+        print("-" * 96)
+        for name in endpoints:
+            total = histograms[(name, "Total")].percentile(50)
+            server = histograms[(name, "Server")].percentile(50)
+            overhead = histograms[(name, "Overhead")].percentile(50)
+            metrics = sorted(((metric[7:], h.percentile(50)) for (endpoint, metric), h in histograms.items()
+                              if endpoint == name and metric.startswith("metric:")), key=lambda item: -item[1])
+            shown = " ".join(f"{metric}={duration:.0f}" for metric, duration in metrics[:SUMMARY_METRICS])
+            timed, count = self.samples.get(name, [0, 0])
+            share = server / total * 100 if total else 0
+            print(f"{name[:25]:<26} {f'{timed}/{count}':<8} {total:<11.1f} {server:<9.1f} {overhead:<9.1f} {share:<9.0f} {shown}")
+
+        untimed = [name for name, (timed, _) in self.samples.items() if timed == 0]
+        if untimed:
+            print(f"\nℹ️  {len(untimed)} endpoints sent no timing headers: {', '.join(sorted(untimed)[:5])}")
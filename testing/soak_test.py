@@ -0,0 +1,361 @@
+"""
+Soak / Endurance Test
+Drives a steady mixed API load for hours and watches latency, errors and server memory over time
+
+Load and performance runs last a minute or two, so slow degradation never shows up: connection
+leaks, a growing Node.js heap, Supabase client churn, caches that never evict. This script keeps
+the load of load_test.py running for a long time and cuts it into fixed windows (WINDOW_SECONDS).
+Per window it records:
+
+- requests, RPS, error rate and latency p50/p95/p99 (completed requests)
+- RSS and CPU of the local `next start` process tree, read from /proc (Linux only)
+
+Windows are streamed to a CSV as they close, so a run that is stopped early keeps its data. At the
+end every series gets a least-squares slope (change per hour) and a Mann-Kendall trend test,
+skipping the first WARMUP_SECONDS (JIT compilation and cold caches). The report flags:
+
+- memory growth: RSS increases monotonically (significant trend) by more than MEMORY_GROWTH_MB_PER_HOUR
+- latency drift: p95 trends upwards and the last windows are DRIFT_THRESHOLD_PCT slower than the first
+- error drift: the error rate trends upwards
+
+    python soak_test.py --duration 14400 --rps 20            # 4 hours, open model
+    python soak_test.py --duration 3600 --pid 12345          # watch a specific server process
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import time
+from datetime import datetime
+
+import aiohttp
+import numpy as np
+
+from latency_histogram import HistogramRecorder
+from live_metrics import add_live_arguments, start_live_metrics
+from load_test import BASE_URL, NUM_VIRTUAL_USERS, REQUEST_TIMEOUT, RESULTS_DIR, TARGET_RPS, LoadTester
+from results_writer import StreamingResultsWriter
+
+# Configuration
+SOAK_DURATION = 2 * 3600  # Seconds of load (2 hours)
+WINDOW_SECONDS = 10  # Length of each time-series window
+WARMUP_SECONDS = 60  # Windows in the first minute are excluded from the trends
+PROCESS_PATTERNS = ("next start", "next-server", "next-router-worker")  # cmdline markers of the server process
+MEMORY_GROWTH_MB_PER_HOUR = 10  # RSS growth above which a significant upward trend is reported as a leak
+DRIFT_THRESHOLD_PCT = 20  # p95 increase from the first to the last windows reported as latency drift
+TREND_SIGNIFICANCE = 0.01  # Mann-Kendall p-value below which a trend counts as monotonic
+EDGE_FRACTION = 0.1  # Share of windows averaged for the start/end values of a series
+
+# Per-window CSV columns and their types
+WINDOW_COLUMNS = [
+    ("Window", int), ("Elapsed (s)", float), ("Timestamp", str), ("Requests", int), ("RPS", float),
+    ("Errors", int), ("Error Rate (%)", float), ("p50 (ms)", float), ("p95 (ms)", float), ("p99 (ms)", float),
+    ("RSS (MB)", float), ("CPU (%)", float), ("Processes", int),
+]
+
+# Series analysed for trends: (window column, label, unit)
+TREND_SERIES = [
+    ("p50 (ms)", "p50 latency", "ms"),
+    ("p95 (ms)", "p95 latency", "ms"),
+    ("p99 (ms)", "p99 latency", "ms"),
+    ("Error Rate (%)", "Error rate", "%"),
+    ("RPS", "Throughput", "req/s"),
+    ("RSS (MB)", "Server RSS", "MB"),
+    ("CPU (%)", "Server CPU", "%"),
+]
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _read(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _stat_fields(pid):
+    """Fields of /proc/<pid>/stat after the command name (which may contain spaces)"""
+    stat = _read(f"/proc/{pid}/stat")
+    return stat[stat.rfind(b")") + 2:].split() if stat else None
+
+
+def find_server_pid(patterns=PROCESS_PATTERNS):
+    """PID of the oldest process whose command line contains one of the patterns"""
+    candidates = []
+    for entry in os.listdir("/proc") if os.path.isdir("/proc") else []:
+        if not entry.isdigit() or int(entry) == os.getpid():
+            continue
+        cmdline = (_read(f"/proc/{entry}/cmdline") or b"").replace(b"\0", b" ").decode("utf-8", "replace")
+        if any(pattern in cmdline for pattern in patterns) and "soak_test.py" not in cmdline:
+            fields = _stat_fields(entry)
+            if fields:
+                candidates.append((int(fields[19]), int(entry)))  # starttime
+    return min(candidates)[1] if candidates else None
+
+
+class ProcessSampler:
+    """RSS and CPU usage of a process and all of its descendants, from /proc"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self._last = None  # (wall time, CPU ticks)
+
+    def _tree(self):
+        children = {}
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                fields = _stat_fields(entry)
+                if fields:
+                    children.setdefault(int(fields[1]), []).append(int(entry))  # ppid
+        tree, stack = [], [self.pid]
+        while stack:
+            pid = stack.pop()
+            tree.append(pid)
+            stack.extend(children.get(pid, []))
+        return tree
+
+    def sample(self):
+        """{"RSS (MB)", "CPU (%)", "Processes"} of the tree, or None once the process is gone"""
+        rss_pages, ticks, alive = 0, 0, 0
+        for pid in self._tree():
+            fields = _stat_fields(pid)
+            if not fields:
+                continue
+            alive += 1
+            ticks += int(fields[11]) + int(fields[12])  # utime + stime
+            rss_pages += int(fields[21])
+        if not alive:
+            return None
+        now = time.monotonic()
+        cpu = None
+        if self._last:
+            elapsed = now - self._last[0]
+            cpu = (ticks - self._last[1]) / _CLOCK_TICKS / elapsed * 100 if elapsed > 0 else None
+        self._last = (now, ticks)
+        return {"RSS (MB)": round(rss_pages * _PAGE_SIZE / 1024 / 1024, 2),
+                "CPU (%)": round(cpu, 1) if cpu is not None else None, "Processes": alive}
+
+
+def mann_kendall(values):
+    """Mann-Kendall trend test: (Kendall's tau, two-sided p-value) for a monotonic trend"""
+    y = np.asarray(values, dtype=float)
+    n = len(y)
+    if n < 3:
+        return 0.0, 1.0
+    signs = np.sign(y[None, :] - y[:, None])
+    s = np.triu(signs, k=1).sum()
+    _, counts = np.unique(y, return_counts=True)
+    variance = (n * (n - 1) * (2 * n + 5) - (counts * (counts - 1) * (2 * counts + 5)).sum()) / 18
+    if variance <= 0:
+        return 0.0, 1.0
+    z = (s - np.sign(s)) / math.sqrt(variance)
+    return s / (n * (n - 1) / 2), math.erfc(abs(z) / math.sqrt(2))
+
+
+def trend(times_s, values):
+    """Slope per hour, start/end level and Mann-Kendall result of one series"""
+    points = [(t, v) for t, v in zip(times_s, values) if v is not None and not math.isnan(v)]
+    if len(points) < 3:
+        return None
+    t = np.array([p[0] for p in points]) / 3600
+    y = np.array([p[1] for p in points])
+    slope = np.polyfit(t, y, 1)[0] if np.ptp(t) > 0 else 0.0
+    edge = max(1, int(len(y) * EDGE_FRACTION))
+    tau, p_value = mann_kendall(y)
+    return {"slope": slope, "start": float(np.median(y[:edge])), "end": float(np.median(y[-edge:])),
+            "tau": tau, "p": p_value, "hours": float(t[-1] - t[0])}
+
+
+class SoakTester(LoadTester):
+    """LoadTester that also keeps per-window histograms and samples the server process"""
+
+    def __init__(self, base_url=BASE_URL, window=WINDOW_SECONDS, pid=None, results_path=None):
+        super().__init__(base_url=base_url)
+        self.keep_samples = False  # Hours of raw samples do not fit in memory; windows and histograms do
+        self.window = window
+        self.windows = {}  # window index -> HistogramRecorder of the requests completed in it
+        self.rows = []  # Closed windows
+        self.process = ProcessSampler(pid) if pid else None
+        self._start = None
+        if results_path is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            results_path = os.path.join(RESULTS_DIR, f"soak_test_windows_{timestamp}.csv")
+        self.writer = StreamingResultsWriter(results_path, WINDOW_COLUMNS, batch_size=1)
+
+    def _record(self, result):
+        super()._record(result)
+        if self._start is not None:
+            index = int((time.perf_counter() - self._start) // self.window)
+            self.windows.setdefault(index, HistogramRecorder()).record((result["Name"], result["Status"]),
+                                                                     result["Load Time (ms)"])
+
+    def _close_window(self, index):
+        recorder = self.windows.pop(index, HistogramRecorder())
+        ok = recorder.grouped(lambda key: key[1] == "OK").get(True)
+        requests = recorder.total_count
+        errors = requests - (ok.count if ok else 0)
+        row = {
+            "Window": index, "Elapsed (s)": (index + 1) * self.window, "Timestamp": datetime.now().isoformat(),
+            "Requests": requests, "RPS": round(requests / self.window, 2), "Errors": errors,
+            "Error Rate (%)": round(errors / requests * 100, 2) if requests else None,
+            "p50 (ms)": round(ok.percentile(50), 2) if ok else None,
+            "p95 (ms)": round(ok.percentile(95), 2) if ok else None,
+            "p99 (ms)": round(ok.percentile(99), 2) if ok else None,
+            "RSS (MB)": None, "CPU (%)": None, "Processes": None,
+        }
+        if self.process:
+            usage = self.process.sample()
+            if usage:
+                row.update(usage)
+            else:
+                print(f"  ⚠️ Server process {self.process.pid} is gone, no more memory/CPU samples")
+                self.process = None
+        self.rows.append(row)
+        self.writer.write(row)
+
+        minutes, seconds = divmod(int(row["Elapsed (s)"]), 60)
+        memory = f", RSS {row['RSS (MB)']:.0f} MB, CPU {row['CPU (%)'] or 0:.0f}%" if row["RSS (MB)"] is not None else ""
+        print(f"  [{minutes // 60:02d}:{minutes % 60:02d}:{seconds:02d}] {row['RPS']:.1f} req/s, "
+              f"p50 {row['p50 (ms)'] or 0:.1f} / p95 {row['p95 (ms)'] or 0:.1f} ms, "
+              f"{row['Error Rate (%)'] or 0:.1f}% errors{memory}")
+
+    async def _windows(self, stop):
+        """Close a window every self.window seconds until the load is over"""
+        if self.process:
+            self.process.sample()  # CPU is a rate: the first sample is the baseline
+        index = 0
+        while not stop.is_set():
+            boundary = self._start + (index + 1) * self.window
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=max(0, boundary - time.perf_counter()))
+            except asyncio.TimeoutError:
+                pass
+            if stop.is_set():
+                break  # The last, partial window would distort the rates
+            self._close_window(index)
+            index += 1
+
+    async def run(self, mode, duration=SOAK_DURATION, rps=TARGET_RPS, num_users=NUM_VIRTUAL_USERS, think_time=0,
+                  poisson=False):
+        """Run the load of load_test.py while closing windows in the background"""
+        stop = asyncio.Event()
+        self._start = time.perf_counter()
+        windows = asyncio.create_task(self._windows(stop))
+        try:
+            if mode == "users":
+                await self.run_virtual_users(num_users, duration, think_time)
+            else:
+                await self.run_arrival_rate(rps, duration, num_users, poisson)
+        finally:
+            stop.set()
+            await windows
+            self.writer.close()
+
+    def analyze_trends(self):
+        """Trend of every series over the windows after the warm-up"""
+        rows = [row for row in self.rows if row["Elapsed (s)"] > WARMUP_SECONDS]
+        times = [row["Elapsed (s)"] for row in rows]
+        return {column: trend(times, [row[column] for row in rows]) for column, _, _ in TREND_SERIES}
+
+    def findings(self, trends):
+        """Warnings for memory growth, latency drift and rising error rates"""
+        found = []
+        rss = trends.get("RSS (MB)")
+        if rss and rss["tau"] > 0 and rss["p"] < TREND_SIGNIFICANCE and rss["slope"] > MEMORY_GROWTH_MB_PER_HOUR:
+            found.append(f"Server memory grows monotonically: {rss['start']:.0f} -> {rss['end']:.0f} MB "
+                         f"(+{rss['slope']:.1f} MB/h, tau {rss['tau']:.2f}), possible leak")
+        p95 = trends.get("p95 (ms)")
+        if p95 and p95["tau"] > 0 and p95["p"] < TREND_SIGNIFICANCE and p95["start"] > 0:
+            change = (p95["end"] / p95["start"] - 1) * 100
+            if change > DRIFT_THRESHOLD_PCT:
+                found.append(f"p95 latency drifts upwards: {p95['start']:.1f} -> {p95['end']:.1f} ms "
+                             f"(+{change:.0f}%, {p95['slope']:+.1f} ms/h)")
+        errors = trends.get("Error Rate (%)")
+        if errors and errors["tau"] > 0 and errors["p"] < TREND_SIGNIFICANCE and errors["end"] > errors["start"]:
+            found.append(f"Error rate rises over time: {errors['start']:.1f}% -> {errors['end']:.1f}% "
+                         f"({errors['slope']:+.2f} points/h)")
+        return found
+
+    def print_trends(self):
+        """Print slope and trend test per series, then the findings"""
+        trends = self.analyze_trends()
+        analysed = [row for row in self.rows if row["Elapsed (s)"] > WARMUP_SECONDS]
+        print("\n" + "=" * 96)
+        print(f"SOAK TRENDS ({len(analysed)} windows of {self.window}s after a {WARMUP_SECONDS}s warm-up)")
+        print("=" * 96)
+        print(f"{'Series':<16} {'Start':<10} {'End':<10} {'Slope / h':<12} {'Kendall tau':<12} {'p-value':<10} {'Trend':<12}")
+        print("-" * 96)
+        for column, label, unit in TREND_SERIES:
+            result = trends[column]
+            if result is None:
+                print(f"{label:<16} {'-':<10} {'-':<10} {'-':<12} {'-':<12} {'-':<10} {'no data':<12}")
+                continue
+            direction = ("rising" if result["tau"] > 0 else "falling") if result["p"] < TREND_SIGNIFICANCE else "flat"
+            slope = f"{result['slope']:+.2f} {unit}"
+            print(f"{label:<16} {result['start']:<10.1f} {result['end']:<10.1f} {slope:<12} "
+                  f"{result['tau']:<12.2f} {result['p']:<10.4f} {direction:<12}")
+
+        findings = self.findings(trends)
+        print()
+        for finding in findings:
+            print(f"⚠️  {finding}")
+        if not findings and all(trends[column] is None for column in ("p95 (ms)", "Error Rate (%)")):
+            print(f"ℹ️  Not enough windows to analyse after the {WARMUP_SECONDS}s warm-up; run longer for trends")
+        elif not findings:
+            print("✅ No memory growth, latency drift or rising error rate detected")
+        if trends["RSS (MB)"] is None:
+            print("ℹ️  No server process was sampled (Linux /proc only; see --pid)")
+        return findings
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Soak test: hours of steady load with windowed metrics and leak detection")
+    parser.add_argument("--mode", choices=["users", "rate"], default="rate",
+                        help="rate: steady arrival rate (default), users: closed model with virtual users")
+    parser.add_argument("--duration", type=float, default=SOAK_DURATION, help="Seconds of load")
+    parser.add_argument("--rps", type=float, default=TARGET_RPS, help="Arrival rate for --mode rate")
+    parser.add_argument("--poisson", action="store_true", help="Use Poisson instead of evenly spaced arrivals")
+    parser.add_argument("--users", type=int, default=NUM_VIRTUAL_USERS, help="Number of virtual users / sessions")
+    parser.add_argument("--think-time", type=float, default=0, help="Pause between requests per virtual user")
+    parser.add_argument("--window", type=float, default=WINDOW_SECONDS, help="Seconds per time-series window")
+    parser.add_argument("--pid", type=int, help="Server process to sample (default: find the `next start` process)")
+    parser.add_argument("--base-url", default=BASE_URL)
+    add_live_arguments(parser)
+    args = parser.parse_args()
+
+    print("🕰️  Soak Test Starting...")
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)) as session:
+            async with session.get(args.base_url):
+                pass
+        print(f"✅ Server is running at {args.base_url}")
+    except Exception:
+        print(f"❌ Server is not responding at {args.base_url}")
+        print("Please start your Next.js app with: npx next start -p 3001")
+        return
+
+    pid = args.pid or find_server_pid()
+    if pid:
+        print(f"🔎 Sampling RSS/CPU of process {pid} and its children")
+    else:
+        print("⚠️ No `next start` process found, memory and CPU are not sampled (pass --pid)")
+
+    tester = SoakTester(base_url=args.base_url, window=args.window, pid=pid)
+    print(f"📝 Windows are written to {tester.writer.filepath}")
+    tester.live = start_live_metrics(args, tool="soak_test", mode=args.mode)
+    try:
+        await tester.run(args.mode, args.duration, args.rps, args.users, args.think_time, args.poisson)
+    finally:
+        if tester.live:
+            tester.live.stop()
+        tester.save_results(filename=os.path.basename(tester.writer.filepath).replace("_windows_", "_"))
+        tester.print_summary()
+        tester.print_trends()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
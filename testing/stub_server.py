@@ -0,0 +1,981 @@
+"""
+Offline Stand-in Server
+Mimics the app's API routes and pages so the testing harness can run without Next.js or Supabase
+
+Every route answers with a payload shaped like the real API response (same envelope, pagination
+and joined fields, similar sizes) after a delay drawn from a configurable latency profile:
+
+- a lognormal base latency given by its median and shape (sigma)
+- a slow tail: with probability slow_rate an extra slow_ms is added
+- an error rate: with probability error_rate the route answers 500 instead
+
+Because the latency distribution is known, the harness's own overhead and its percentile maths
+can be checked against ground truth (see ground_truth_percentile and --ground-truth).
+
+The tables can be rebuilt at any size through POST /__stub/seed (used by scaling_sweep.py).
+
+The write routes (QR scan, transit complete, cook, recipe approve) read a row, decide and write it
+back in separate steps with a simulated database round trip in between, like the real routes do
+against Supabase, so concurrent requests interleave and race the same way (contention_test.py).
+Logins set a self-contained Supabase-style session cookie, so sessions survive a restart.
+API responses carry a Server-Timing header (app;dur=...) like the real routes, see server_timing.py,
+and responses over 1 KB are gzipped when the client accepts it, like `next start` (payload_profile.py).
+With --middleware, every path the middleware.ts matcher includes pays a simulated updateSession:
+a Supabase Auth round trip when a session cookie is sent, and a token refresh first when the
+session is about to expire, reported as Server-Timing mw (middleware_overhead_test.py).
+
+Usage:
+    python stub_server.py                      # serve on port 3001 like `npx next start -p 3001`
+    python stub_server.py --latency-scale 0    # no injected latency, measures harness overhead only
+    python stub_server.py --ground-truth       # print expected percentiles per route and exit
+    python stub_server.py --middleware         # simulate updateSession on the matched paths
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import math
+import random
+import time
+import uuid
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timedelta, timezone
+
+from aiohttp import web
+from multidict import CIMultiDict
+
+from auth_sessions import MIDDLEWARE_MATCHER, TOKEN_REFRESH_MARGIN
+from dataset_seeder import generate_item_instances, generate_item_transits, generate_nodes
+
+# Configuration
+STUB_PORT = 3001  # Same port as the Next.js app, so the testers work unchanged
+SESSION_COOKIE = "sb-stub-auth-token"
+SESSION_TTL = 3600  # Seconds a stub login stays valid
+STUB_SEED = 42  # Seed for the generated dataset and injected latencies
+STUB_DB_ROUND_TRIP_MS = 2  # Simulated Supabase round trip between the statements of a write route
+COMPRESSION_THRESHOLD_BYTES = 1024  # Next.js compresses (gzip) responses above this size
+
+STUB_ACCOUNTS = {
+    "admin.pusat@despro.com": {"password": "admin123", "role": "admin_pusat"},
+    "admin.node@despro.com": {"password": "admin123", "role": "admin_node"},
+    "petugas@despro.com": {"password": "petugas123", "role": "petugas"},
+}
+
+
+@dataclass
+class LatencyProfile:
+    median_ms: float
+    sigma: float = 0.25  # Lognormal shape, 0 gives a constant latency
+    slow_rate: float = 0.0  # Probability of a slow-tail response
+    slow_ms: float = 0.0  # Extra latency added to slow-tail responses
+    error_rate: float = 0.0  # Probability of answering 500
+
+    def sample_ms(self, rng):
+        latency = self.median_ms * math.exp(rng.gauss(0, self.sigma)) if self.sigma else self.median_ms
+        if self.slow_rate and rng.random() < self.slow_rate:
+            latency += self.slow_ms
+        return latency
+
+
+# Default profiles, roughly the medians measured against the real app on 2025-11-29
+ROUTE_PROFILES = {
+    "login": LatencyProfile(500, 0.15),
+    "login_invalid": LatencyProfile(120, 0.3),
+    "register": LatencyProfile(300, 0.25),
+    "nodes": LatencyProfile(200, 0.35),
+    "item_types": LatencyProfile(200, 0.3),
+    "item_instances": LatencyProfile(220, 0.3, slow_rate=0.01, slow_ms=800),
+    "item_transits": LatencyProfile(240, 0.25, slow_rate=0.01, slow_ms=800),
+    "users": LatencyProfile(480, 0.25),
+    "reports": LatencyProfile(210, 0.25),
+    "recipes": LatencyProfile(220, 0.45),
+    "page": LatencyProfile(550, 0.05, slow_rate=0.02, slow_ms=1000),
+    "qr_create": LatencyProfile(250, 0.3),
+    "qr_scan": LatencyProfile(400, 0.3, slow_rate=0.01, slow_ms=1000),
+    "transit_complete": LatencyProfile(300, 0.3),
+    "cook": LatencyProfile(450, 0.3),
+    "recipe_approve": LatencyProfile(200, 0.25),
+    "create": LatencyProfile(150, 0.25),
+    "detail": LatencyProfile(150, 0.25),
+    "static": LatencyProfile(2, 0.2),
+    "qr_placeholder": LatencyProfile(3, 0.2),
+    "mw_get_user": LatencyProfile(60, 0.3),  # updateSession: auth.getUser() round trip to Supabase Auth
+    "mw_refresh": LatencyProfile(120, 0.3),  # updateSession: token refresh before getUser()
+}
+
+# Pages the testers visit, served as HTML documents of realistic size
+STUB_PAGES = [
+    "/", "/login", "/register", "/qr-scan", "/qr-create", "/dashboard",
+    "/super-admin", "/super-admin/item-instances", "/super-admin/users", "/super-admin/nodes",
+    "/super-admin/item-types", "/super-admin/item-transits", "/super-admin/reports", "/super-admin/recipes",
+    "/node-admin", "/node-admin/item-instances", "/node-admin/item-transits", "/node-admin/inventory",
+    "/node-admin/reports", "/node-admin/recipes",
+]
+
+
+def _normal_cdf(x):
+    return 0.5 * (1 + math.erf(x / math.sqrt(2)))
+
+
+def ground_truth_percentile(profile, percentile):
+    """Exact percentile (ms) of a profile's successful-response latency, excluding client overhead
+
+    The latency is a mixture of the lognormal base and the same lognormal shifted by slow_ms,
+    so the quantile is found by bisection on the mixture's CDF.
+    """
+    q = percentile / 100
+    if profile.sigma == 0:
+        return profile.median_ms + (profile.slow_ms if q > 1 - profile.slow_rate else 0)
+
+    def cdf(x):
+        base = _normal_cdf(math.log(x / profile.median_ms) / profile.sigma) if x > 0 else 0
+        shifted_x = x - profile.slow_ms
+        slow = _normal_cdf(math.log(shifted_x / profile.median_ms) / profile.sigma) if shifted_x > 0 else 0
+        return (1 - profile.slow_rate) * base + profile.slow_rate * slow
+
+    low, high = 0.0, profile.median_ms * math.exp(8 * profile.sigma) + profile.slow_ms
+    for _ in range(100):
+        mid = (low + high) / 2
+        if cdf(mid) < q:
+            low = mid
+        else:
+            high = mid
+    return (low + high) / 2
+
+
+class StubDataStore:
+    """In-memory stand-in for the Supabase tables the list endpoints read"""
+
+    def __init__(self, seed=STUB_SEED):
+        self.rng = random.Random(seed)
+        self.nodes = []
+        self.item_types = []
+        self.item_instances = []
+        self.item_transits = []
+        self.users = []
+        self.reports = []
+        self.recipes = []
+        self.qr_codes = {}
+
+    def _id(self):
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def _timestamp(self, days_back=90):
+        moment = datetime(2025, 11, 29) - timedelta(seconds=self.rng.randint(0, days_back * 86400))
+        return moment.isoformat() + "Z"
+
+    def generate(self, nodes=20, item_types=30, item_instances=500, item_transits=300, users=15, reports=20, recipes=10):
+        """Fill the tables with synthetic rows shaped like the real database"""
+        self.nodes = [{
+            "node_id": self._id(),
+            "node_name": f"Node {i + 1}",
+            "node_type": self.rng.choice(["Gudang", "Dapur", "Sekolah"]),
+            "node_address": f"Jl. Contoh No. {i + 1}, Jakarta",
+            "node_latitude": round(-6.2 + self.rng.uniform(-0.1, 0.1), 6),
+            "node_longitude": round(106.8 + self.rng.uniform(-0.1, 0.1), 6),
+            "node_status": "Active",
+            "created_at": self._timestamp(),
+        } for i in range(nodes)]
+        self.item_types = [{
+            "item_id": self._id(),
+            "item_name": f"Item Type {i + 1}",
+            "item_type": self.rng.choice(["Bahan Mentah", "Makanan Jadi", "Peralatan"]),
+            "item_description": "Generated item type for offline testing",
+            "item_image": None,
+            "status": "active",
+            "created_at": self._timestamp(),
+        } for i in range(item_types)]
+        self.add_item_instances(item_instances)
+        self.add_item_transits(item_transits)
+        self.users = [{
+            "user_id": self._id(),
+            "username": f"user{i + 1}@despro.com",
+            "name": f"User {i + 1}",
+            "role": self.rng.choice(["admin_pusat", "admin_node", "petugas"]),
+            "node_id": self.rng.choice(self.nodes)["node_id"],
+            "created_at": self._timestamp(),
+        } for i in range(users)]
+        self.reports = [{
+            "report_id": self._id(),
+            "user_id": self.rng.choice(self.users)["user_id"],
+            "node_id": self.rng.choice(self.nodes)["node_id"],
+            "report_title": f"Report {i + 1}",
+            "report_description": "Generated report for offline testing " * 3,
+            "status": self.rng.choice(["open", "resolved"]),
+            "created_at": self._timestamp(),
+        } for i in range(reports)]
+        self.recipes = [self.recipe_row(
+            f"Recipe {i + 1}",
+            node_id=self.rng.choice([None, self.rng.choice(self.nodes)["node_id"]]),
+            result=self.rng.choice(self.item_types),
+            ingredients=[(item_type, self.rng.randint(1, 10)) for item_type in self.rng.sample(self.item_types, self.rng.randint(2, 5))],
+            created_at=self._timestamp(),
+        ) for i in range(recipes)]
+        return self
+
+    def recipe_row(self, name, node_id, result, ingredients, instructions=None, created_at=None):
+        """A recipe with its joined result type and ingredients, as GET /api/recipes returns it"""
+        return {
+            "id": self._id(),
+            "name": name,
+            "node_id": node_id,  # None = global recipe
+            "result_id": result["item_id"],
+            "instructions": instructions,
+            "created_at": created_at or _now_iso(),
+            "item_types": {"item_id": result["item_id"], "item_name": result["item_name"]},
+            "recipe_ingredients": [{
+                "id": self._id(), "item_id": item_type["item_id"], "quantity": quantity, "note": None,
+                "item_types": {"item_id": item_type["item_id"], "item_name": item_type["item_name"]},
+            } for item_type, quantity in ingredients],
+        }
+
+    def add_item_instances(self, count):
+        node_ids = [node["node_id"] for node in self.nodes]
+        item_type_ids = [item_type["item_id"] for item_type in self.item_types]
+        for batch in generate_item_instances(count, node_ids, item_type_ids, seed=self.rng.getrandbits(32)):
+            self.item_instances.extend(batch)
+        self.item_instances.sort(key=lambda row: row["created_at"], reverse=True)
+
+    def add_item_transits(self, count):
+        item_instance_ids = [row["item_instance_id"] for row in self.item_instances]
+        node_ids = [node["node_id"] for node in self.nodes]
+        for batch in generate_item_transits(count, item_instance_ids, node_ids, seed=self.rng.getrandbits(32)):
+            for row in batch:
+                row["item_transit_id"] = self._id()
+            self.item_transits.extend(batch)
+        self.item_transits.sort(key=lambda row: row["time_departure"], reverse=True)
+
+    def seed(self, nodes, item_instances, item_transits):
+        """Replace nodes, item instances and transits with a bulk-generated dataset of the given size"""
+        self.nodes = generate_nodes(nodes, seed=self.rng.getrandbits(32))
+        self.item_instances, self.item_transits, self.qr_codes = [], [], {}
+        self.add_item_instances(item_instances)
+        self.add_item_transits(item_transits)
+        return self
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _pagination(total, page, page_size):
+    total_pages = math.ceil(total / page_size) if page_size else 0
+    return {
+        "total_items": total,
+        "current_page": page,
+        "items_per_page": page_size,
+        "total_pages": total_pages,
+        "has_next": page < total_pages,
+        "has_previous": page > 1,
+    }
+
+
+def _session_cookie(email):
+    """Auth cookie value in the Supabase format: base64 of the session JSON"""
+    session = {"access_token": uuid.uuid4().hex, "refresh_token": uuid.uuid4().hex[:12],
+               "expires_at": int(time.time()) + SESSION_TTL, "user": {"email": email}}
+    return "base64-" + base64.urlsafe_b64encode(json.dumps(session).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _cookie_session(value):
+    if not value or not value.startswith("base64-"):
+        return None
+    value = value[len("base64-"):]
+    try:
+        return json.loads(base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)))
+    except ValueError:
+        return None
+
+
+def _pagination_params(request):
+    """Same rules as getPaginationParams in lib/api-helpers.ts"""
+    try:
+        page = max(1, int(request.query.get("page", "1")))
+        page_size = min(max(1, int(request.query.get("page_size", "50"))), 100)
+    except ValueError:
+        page, page_size = 1, 50
+    return page, page_size
+
+
+def _success(message, data, status=200):
+    return web.json_response({"success": True, "message": message, "data": data}, status=status)
+
+
+def _error(message, status=400):
+    return web.json_response({"success": False, "message": message, "error": message}, status=status)
+
+
+class StubServer:
+    def __init__(self, store=None, profiles=None, latency_scale=1.0, seed=STUB_SEED, compress=True, first_hit_ms=0,
+                 middleware=False):
+        self.store = store or StubDataStore(seed).generate()
+        self.profiles = dict(profiles or ROUTE_PROFILES)
+        self.latency_scale = latency_scale
+        self.compress = compress
+        self.first_hit_ms = first_hit_ms
+        self.middleware = middleware
+        self.rng = random.Random(seed)
+        self._warm_routes = set()  # Routes that have paid their first-hit cost
+
+    async def _delay(self, route):
+        """Sleep for a sampled latency; returns True when an error should be injected instead"""
+        profile = self.profiles[route]
+        if self.latency_scale:
+            await asyncio.sleep(profile.sample_ms(self.rng) * self.latency_scale / 1000)
+        return profile.error_rate > 0 and self.rng.random() < profile.error_rate
+
+    def _authenticated(self, request):
+        """Like a Supabase session, the cookie itself holds the session, so it outlives a restart"""
+        session = _cookie_session(request.cookies.get(SESSION_COOKIE))
+        return bool(session) and session.get("user", {}).get("email") in STUB_ACCOUNTS \
+            and session.get("expires_at", 0) > time.time()
+
+    def _node_names(self):
+        return {node["node_id"]: node for node in self.store.nodes}
+
+    async def login(self, request):
+        try:
+            body = await request.json()
+        except json.JSONDecodeError:
+            body = {}
+        email, password = body.get("email"), body.get("password")
+        account = STUB_ACCOUNTS.get(email)
+        if not account or account["password"] != password:
+            await self._delay("login_invalid")
+            if not email or not password:
+                return _error("Email and password are required", 400)
+            return web.json_response({"success": False, "message": "Invalid email or password."}, status=401)
+
+        if await self._delay("login"):
+            return _error("Internal server error occurred during login.", 500)
+        node = self.store.nodes[0]
+        response = web.json_response({
+            "success": True,
+            "message": "Login successful",
+            "data": {
+                "user": {"id": str(uuid.uuid5(uuid.NAMESPACE_DNS, email)), "username": email, "name": email,
+                         "role": account["role"], "node_id": node["node_id"]},
+                "node": {"id": node["node_id"], "name": node["node_name"], "type": node["node_type"],
+                         "location": node["node_address"]},
+                "isSuperAdmin": account["role"] == "admin_pusat",
+            },
+        })
+        response.set_cookie(SESSION_COOKIE, _session_cookie(email), path="/", httponly=True, max_age=SESSION_TTL)
+        return response
+
+    async def register(self, request):
+        try:
+            body = await request.json()
+        except json.JSONDecodeError:
+            return _error("Invalid JSON body", 400)
+        if await self._delay("register"):
+            return _error("Registration failed", 500)
+        if body.get("email") in STUB_ACCOUNTS or body.get("email") in {u["username"] for u in self.store.users}:
+            return _error("User already exists", 409)
+        return _success("User registered successfully", {"user_id": str(uuid.uuid4()), "email": body.get("email")}, 201)
+
+    def _list_handler(self, route, build):
+        """Wrap a list builder with latency and error injection
+
+        No session check: like the real GET handlers (app/api/nodes/route.ts and the other list
+        routes), they query Supabase with whatever cookie came along and never answer 401.
+        """
+
+        async def handler(request):
+            if await self._delay(route):
+                return _error("Database connection failed", 500)
+            return build(request)
+
+        return handler
+
+    def _nodes(self, request):
+        page, page_size = _pagination_params(request)
+        wanted_status = {None: "Active", "active": "Active", "inactive": "Inactive"}.get(request.query.get("status"))
+        node_type = request.query.get("node_type")
+        rows = [row for row in self.store.nodes
+                if (wanted_status is None or row["node_status"] == wanted_status)
+                and (not node_type or row["node_type"] == node_type)]
+        start = (page - 1) * page_size
+        return _success("Nodes retrieved successfully", {
+            "nodes": [{
+                "id": n["node_id"], "name": n["node_name"], "type": n["node_type"], "location": n["node_address"],
+                "latitude": n["node_latitude"], "longitude": n["node_longitude"], "status": n["node_status"],
+                "created_at": n["created_at"],
+            } for n in rows[start:start + page_size]],
+            "pagination": _pagination(len(rows), page, page_size),
+        })
+
+    def _item_types(self, request):
+        page, page_size = _pagination_params(request)
+        start = (page - 1) * page_size
+        return _success("Item types retrieved successfully", {
+            "item_types": self.store.item_types[start:start + page_size],
+            "pagination": _pagination(len(self.store.item_types), page, page_size),
+        })
+
+    def _item_instances(self, request):
+        page, page_size = _pagination_params(request)
+        status = request.query.get("status")
+        node_id = request.query.get("node_id")
+        item_type_id = request.query.get("item_type_id")
+        expired = request.query.get("expired") == "true"
+        now = datetime(2025, 11, 29).isoformat() + "Z"
+
+        wanted_status = {None: "Active", "active": "Active", "inactive": "Inactive"}.get(status)
+        rows = [row for row in self.store.item_instances
+                if (wanted_status is None or row["status"] == wanted_status)
+                and (not node_id or row["node_id"] == node_id)
+                and (not item_type_id or row["item_type_id"] == item_type_id)
+                and (not expired or row["expire_date"] < now)]  # Kept newest first, like ORDER BY created_at DESC
+
+        item_types = {t["item_id"]: t for t in self.store.item_types}
+        nodes = self._node_names()
+        start = (page - 1) * page_size
+        data = []
+        for row in rows[start:start + page_size]:
+            item_type = item_types[row["item_type_id"]]
+            node = nodes[row["node_id"]]
+            data.append({
+                "id": row["item_instance_id"], **row,
+                "item_type": {"item_id": item_type["item_id"], "item_name": item_type["item_name"],
+                              "item_type": item_type["item_type"]},
+                "current_node": {"node_id": node["node_id"], "node_name": node["node_name"],
+                                 "node_type": node["node_type"]},
+            })
+        return _success("Item instances retrieved successfully", {
+            "item_instances": data,
+            "pagination": _pagination(len(rows), page, page_size),
+        })
+
+    def _item_transits(self, request):
+        page, page_size = _pagination_params(request)
+        source_node_id = request.query.get("source_node_id")
+        dest_node_id = request.query.get("dest_node_id")
+        courier_name = (request.query.get("courier_name") or "").lower()
+        rows = [row for row in self.store.item_transits
+                if (not source_node_id or row["source_node_id"] == source_node_id)
+                and (not dest_node_id or row["dest_node_id"] == dest_node_id)
+                and (not courier_name or courier_name in (row["courier_name"] or "").lower())]
+        nodes = self._node_names()
+        start = (page - 1) * page_size
+        data = [{
+            **row,
+            "source_node": {"node_id": row["source_node_id"], "node_name": nodes[row["source_node_id"]]["node_name"]},
+            "dest_node": {"node_id": row["dest_node_id"], "node_name": nodes[row["dest_node_id"]]["node_name"]},
+        } for row in rows[start:start + page_size]]
+        return _success("Transit records retrieved successfully", {
+            "transits": data,
+            "summary": {"total_active_transits": sum(1 for row in data if row["status"] == "active"),
+                        "average_duration_minutes": 0, "longest_transit_days": 0},
+            "pagination": _pagination(len(rows), page, page_size),
+        })
+
+    def _users(self, request):
+        page, page_size = _pagination_params(request)
+        start = (page - 1) * page_size
+        return _success("Users retrieved successfully", {
+            "users": self.store.users[start:start + page_size],
+            "pagination": _pagination(len(self.store.users), page, page_size),
+        })
+
+    def _reports(self, request):
+        page, page_size = _pagination_params(request)
+        start = (page - 1) * page_size
+        return _success("Reports retrieved successfully", {
+            "reports": self.store.reports[start:start + page_size],
+            "pagination": _pagination(len(self.store.reports), page, page_size),
+            "filter": "all",
+        })
+
+    def _recipes(self, request):
+        return _success("Recipes retrieved successfully", {"recipes": self.store.recipes, "filter": "all"})
+
+    async def seed(self, request):
+        """Rebuild the tables at the requested size; an empty body restores the default dataset"""
+        counts = await request.json() if request.can_read_body else {}
+        if counts:
+            self.store.seed(counts.get("nodes", 20), counts.get("item_instances", 0), counts.get("item_transits", 0))
+        else:
+            self.store = StubDataStore(self.rng.getrandbits(32)).generate()
+        return _success("Stub dataset seeded", {
+            "node_ids": [node["node_id"] for node in self.store.nodes],
+            "counts": {"nodes": len(self.store.nodes), "item_instances": len(self.store.item_instances),
+                       "item_transits": len(self.store.item_transits)},
+        })
+
+    async def _write_request(self, request, route):
+        """Common prologue of the write routes: auth check, JSON body and latency/error injection"""
+        if not self._authenticated(request):
+            await self._delay("login_invalid")
+            return None, _error("Unauthorized", 401)
+        try:
+            body = await request.json()
+        except json.JSONDecodeError:
+            return None, _error("Invalid JSON body", 400)
+        if await self._delay(route):
+            return None, _error("An unexpected error occurred", 500)
+        return body, None
+
+    async def _round_trip(self):
+        """One database statement of a write route; concurrent requests can interleave here"""
+        await asyncio.sleep(STUB_DB_ROUND_TRIP_MS * self.latency_scale / 1000)
+
+    def _find(self, rows, key, value):
+        return next((row for row in rows if row[key] == value), None)
+
+    async def qr_create(self, request):
+        """Same validation and response shape as app/api/qr/create"""
+        body, error = await self._write_request(request, "qr_create")
+        if error:
+            return error
+        if not body.get("item_instance_id") or not body.get("source_id") or not body.get("destination_id"):
+            return _error("Missing required fields", 400)
+        instance = self._find(self.store.item_instances, "item_instance_id", body["item_instance_id"])
+        if instance is None:
+            return _error("Failed to create QR code entry", 500)
+
+        qr_id = str(uuid.uuid4())
+        self.store.qr_codes[qr_id] = {
+            "id": qr_id, "item_instance_id": body["item_instance_id"], "source_id": body["source_id"],
+            "destination_id": body["destination_id"], "qr_url": qr_id, "item_count": body.get("item_count"),
+        }
+        nodes = self._node_names()
+        source, dest = nodes.get(body["source_id"]), nodes.get(body["destination_id"])
+        return _success("QR code entry created successfully", {
+            "action": "qr_created",
+            "qr_url": qr_id,
+            "qr_id": qr_id,
+            "item_instance": {"id": instance["item_instance_id"], "count": instance["item_count"]},
+            "source_node": {"id": source["node_id"], "name": source["node_name"]} if source else None,
+            "destination_node": {"id": dest["node_id"], "name": dest["node_name"]} if dest else None,
+        })
+
+    async def qr_scan(self, request):
+        """First scan puts the item in transit, second scan delivers it (app/api/qr/scan/[qrId])"""
+        body, error = await self._write_request(request, "qr_scan")
+        if error:
+            return error
+        qr_id = request.match_info["qr_id"]
+        transit = self._find(self.store.item_transits, "qr_url", qr_id)
+        status = transit["status"] if transit else None  # As read by the route's SELECT
+        await self._round_trip()
+
+        if transit:
+            if status != "active":
+                return _error("QR code has already been processed", 400)
+            transit["status"] = "inactive"
+            transit["time_arrival"] = _now_iso()
+            await self._round_trip()
+            source = self._find(self.store.item_instances, "item_instance_id", transit["item_instance_id"])
+            dest = next((row for row in self.store.item_instances
+                         if row["item_type_id"] == source["item_type_id"]
+                         and row["node_id"] == transit["dest_node_id"] and row["status"] == "Active"), None)
+            dest_count = dest["item_count"] if dest else None
+            await self._round_trip()
+            if dest:
+                dest["item_count"] = dest_count + transit["item_transit_count"]
+            else:
+                self.store.item_instances.insert(0, {
+                    "item_instance_id": str(uuid.uuid4()), "item_type_id": source["item_type_id"],
+                    "node_id": transit["dest_node_id"], "item_count": transit["item_transit_count"],
+                    "expire_date": source["expire_date"], "status": "Active",
+                    "created_at": _now_iso(),
+                })
+            return _success("Item successfully delivered to destination", {
+                "action": "item_delivered",
+                "item_transit_id": transit["item_transit_id"],
+                "item_transit_count": transit["item_transit_count"],
+                "status": transit["status"],
+            })
+
+        qr_code = self.store.qr_codes.get(qr_id)
+        if qr_code is None:
+            return _error("QR code not found", 404)
+        quantity = int(qr_code["item_count"] or 0)
+        instance = self._find(self.store.item_instances, "item_instance_id", qr_code["item_instance_id"])
+        if quantity > 0:
+            current_count = instance["item_count"]
+            if current_count < quantity:
+                return _error("Insufficient stock", 400)
+            await self._round_trip()
+            instance["item_count"] = current_count - quantity
+
+        transit = {
+            "item_transit_id": str(uuid.uuid4()),
+            "item_instance_id": qr_code["item_instance_id"],
+            "source_node_id": qr_code["source_id"],
+            "dest_node_id": qr_code["destination_id"],
+            "time_departure": _now_iso(),
+            "time_arrival": None,
+            "courier_name": body.get("courier_name"),
+            "courier_phone": body.get("courier_phone"),
+            "qr_url": qr_id,
+            "status": "active",
+            "item_transit_count": qr_code["item_count"],
+        }
+        self.store.item_transits.insert(0, transit)
+        return _success("Item successfully placed in transit", {
+            "action": "item_added",
+            "item_transit_id": transit["item_transit_id"],
+            "item_transit_count": transit["item_transit_count"],
+            "status": transit["status"],
+        })
+
+    async def transit_complete(self, request):
+        """Set time_arrival and move the item instance to the destination (app/api/item-transit/[id]/complete)"""
+        body, error = await self._write_request(request, "transit_complete")
+        if error:
+            return error
+        transit = self._find(self.store.item_transits, "item_transit_id", request.match_info["transit_id"])
+        if not body.get("time_arrival"):
+            return _error("Missing required fields: time_arrival", 400)
+        if transit is None:
+            return _error("Item transit not found", 404)
+        await self._round_trip()
+        transit["time_arrival"] = body["time_arrival"]
+        instance = self._find(self.store.item_instances, "item_instance_id", transit["item_instance_id"])
+        if instance and transit["dest_node_id"]:
+            instance["node_id"] = transit["dest_node_id"]
+        return _success("Item transit completed successfully", {
+            "item_transit_id": transit["item_transit_id"],
+            "completed_at": transit["time_arrival"],
+            "time_departure": transit["time_departure"],
+            "time_arrival": transit["time_arrival"],
+            "status": transit["status"],
+        })
+
+    async def create_node(self, request):
+        """POST /api/node"""
+        body, error = await self._write_request(request, "create")
+        if error:
+            return error
+        if not body.get("node_name") or body.get("node_type") not in ("Source", "Assembly", "Distribution"):
+            return _error("Missing required fields: node_name, node_type", 400)
+        node = {
+            "node_id": str(uuid.uuid4()), "node_name": body["node_name"], "node_type": body["node_type"],
+            "node_address": body.get("node_address"), "node_latitude": body.get("node_latitude"),
+            "node_longitude": body.get("node_longitude"), "node_status": body.get("node_status", "Active"),
+            "created_at": _now_iso(),
+        }
+        self.store.nodes.append(node)
+        return _success("Node successfully created", {
+            "id": node["node_id"], "name": node["node_name"], "type": node["node_type"],
+            "location": node["node_address"], "status": node["node_status"], "created_at": node["created_at"],
+        })
+
+    async def create_item_instance(self, request):
+        """POST /api/item-instance"""
+        body, error = await self._write_request(request, "create")
+        if error:
+            return error
+        if not body.get("item_type_id") or not body.get("item_count"):
+            return _error("Missing required fields: item_type_id, item_count", 400)
+        if body["item_count"] <= 0:
+            return _error("item_count must be greater than 0", 400)
+        if not self._find(self.store.item_types, "item_id", body["item_type_id"]) or \
+                (body.get("node_id") and body["node_id"] not in self._node_names()):
+            return _error("Invalid item_type_id or node_id", 400)
+        instance = {
+            "item_instance_id": str(uuid.uuid4()), "item_type_id": body["item_type_id"], "node_id": body.get("node_id"),
+            "item_count": body["item_count"], "expire_date": body.get("expire_date"), "status": "Active",
+            "created_at": _now_iso(),
+        }
+        self.store.item_instances.insert(0, instance)
+        return _success("Item instance created successfully", {"id": instance["item_instance_id"], **instance})
+
+    async def item_instance_detail(self, request):
+        """GET /api/item-instance/[id]"""
+        if not self._authenticated(request):
+            return _error("Unauthorized", 401)
+        if await self._delay("detail"):
+            return _error("Failed to fetch item instance", 500)
+        instance = self._find(self.store.item_instances, "item_instance_id", request.match_info["item_instance_id"])
+        if instance is None:
+            return _error("Item instance not found", 404)
+        return _success("Item instance retrieved successfully", {"id": instance["item_instance_id"], **instance})
+
+    async def item_transit_detail(self, request):
+        """GET /api/item-transit/[id]"""
+        if not self._authenticated(request):
+            return _error("Unauthorized", 401)
+        if await self._delay("detail"):
+            return _error("Failed to fetch item transit", 500)
+        transit = self._find(self.store.item_transits, "item_transit_id", request.match_info["transit_id"])
+        if transit is None:
+            return _error("Item transit not found", 404)
+        return _success("Item transit retrieved successfully", dict(transit))
+
+    async def create_recipe(self, request):
+        """POST /api/recipes (with an existing result_id)"""
+        body, error = await self._write_request(request, "create")
+        if error:
+            return error
+        item_types = {item_type["item_id"]: item_type for item_type in self.store.item_types}
+        ingredients = body.get("ingredients") or []
+        if not body.get("name") or body.get("result_id") not in item_types or not ingredients:
+            return _error("name, result_id and ingredients are required", 400)
+        if any(ing.get("item_id") not in item_types or not ing.get("quantity") for ing in ingredients):
+            return _error("Each ingredient must have item_id (uuid) and quantity", 400)
+        recipe = self.store.recipe_row(body["name"], body.get("node_id"), item_types[body["result_id"]],
+                                       [(item_types[ing["item_id"]], ing["quantity"]) for ing in ingredients],
+                                       instructions=body.get("instructions"))
+        self.store.recipes.insert(0, recipe)
+        return _success("Recipe created successfully", {
+            "id": recipe["id"], "name": recipe["name"], "node_id": recipe["node_id"], "result": recipe["item_types"],
+            "instructions": recipe["instructions"], "created_at": recipe["created_at"],
+            "ingredients": recipe["recipe_ingredients"],
+        })
+
+    async def recipe_detail(self, request):
+        """GET /api/recipes/[recipeId]"""
+        if not self._authenticated(request):
+            return _error("Unauthorized", 401)
+        if await self._delay("detail"):
+            return _error("Failed to fetch recipe", 500)
+        recipe = self._find(self.store.recipes, "id", request.match_info["recipe_id"])
+        if recipe is None:
+            return _error("Recipe not found", 404)
+        return _success("Recipe retrieved successfully", recipe)
+
+    async def recipe_approve(self, request):
+        """Promote a local recipe to global: fetch, check node_id, update (app/api/recipes/[recipeId]/approve)"""
+        if not self._authenticated(request):
+            return _error("Unauthorized", 401)
+        if await self._delay("recipe_approve"):
+            return _error("Failed to fetch recipe", 500)
+        recipe = self._find(self.store.recipes, "id", request.match_info["recipe_id"])
+        await self._round_trip()
+        if recipe is None:
+            return _error("Recipe not found", 404)
+        summary = {"id": recipe["id"], "name": recipe["name"], "node_id": None, "status": "global"}
+        if recipe["node_id"] is None:
+            return _success("Recipe is already globally available", summary)
+        await self._round_trip()
+        recipe["node_id"] = None
+        return _success("Recipe promoted to global successfully", summary)
+
+    async def cook(self, request):
+        """Cook a recipe at a node (app/api/item-instance/cook)
+
+        Like the real route: read the recipe, read the ingredient stock, allocate FIFO by expiry,
+        then write each instance's remaining count back one statement at a time and insert the
+        cooked item. The counts written are computed from the stock read earlier.
+        """
+        body, error = await self._write_request(request, "cook")
+        if error:
+            return error
+        quantity = body.get("quantity")
+        if not body.get("recipe_id") or not body.get("node_id"):
+            return _error("recipe_id (uuid) and node_id (uuid) are required", 400)
+        if not isinstance(quantity, (int, float)) or quantity <= 0:
+            return _error("servings must be a positive number", 400)
+
+        recipe = self._find(self.store.recipes, "id", body["recipe_id"])
+        await self._round_trip()
+        if recipe is None:
+            return _error("Recipe not found", 404)
+        needed = {}
+        for ingredient in recipe["recipe_ingredients"]:
+            needed[ingredient["item_id"]] = needed.get(ingredient["item_id"], 0) + ingredient["quantity"] * quantity
+
+        stock = sorted(((row, row["item_count"]) for row in self.store.item_instances
+                        if row["item_type_id"] in needed and row["node_id"] == body["node_id"]),
+                       key=lambda pair: pair[0]["expire_date"] or "")
+        await self._round_trip()
+        allocation = []
+        for item_type_id, need in needed.items():
+            remaining = need
+            for row, current in stock:
+                if row["item_type_id"] != item_type_id or remaining <= 0:
+                    continue
+                take = min(remaining, current)
+                allocation.append((row, current - take))
+                remaining -= take
+            if remaining > 0:
+                return _error(f"Insufficient stock for ingredient {item_type_id}: need {need}, "
+                              f"available {need - remaining}", 400)
+
+        for row, remaining in allocation:
+            await self._round_trip()
+            row["item_count"] = remaining
+        await self._round_trip()
+        cooked = {
+            "item_instance_id": str(uuid.uuid4()), "item_type_id": recipe["result_id"], "node_id": body["node_id"],
+            "item_count": quantity, "expire_date": body.get("expire_date"), "status": "Active",
+            "created_at": _now_iso(),
+        }
+        self.store.item_instances.insert(0, cooked)
+        return _success("Recipe cooked successfully", {
+            "cooked_item": {"id": cooked["item_instance_id"], "name": recipe["item_types"]["item_name"],
+                            "quantity": quantity, "expire_date": cooked["expire_date"]},
+            "ingredients_used": [{"item_instance_id": row["item_instance_id"], "remaining": remaining}
+                                 for row, remaining in allocation],
+            "recipe": {"id": recipe["id"], "name": recipe["name"]},
+        })
+
+    async def page(self, request):
+        """Serve an HTML document of about the same size as the real Next.js pages (~12 KB)"""
+        if await self._delay("page"):
+            return web.Response(text="Internal Server Error", status=500)
+        path = request.path
+        scripts = "".join(f'<script src="/_next/static/chunks/{name}.js" async></script>'
+                          for name in ("webpack", "framework", "main-app", path.strip("/").replace("/", "-") or "index"))
+        filler = "".join(f'<div class="row" data-i="{i}">Stub content for {path}</div>' for i in range(220))
+        html = (f"<!DOCTYPE html><html lang=\"en\"><head><meta charset=\"utf-8\"><title>Despro</title>{scripts}</head>"
+                f"<body><main id=\"stub\">{filler}</main></body></html>")
+        return web.Response(text=html, content_type="text/html")
+
+    async def static_asset(self, request):
+        await self._delay("static")
+        if request.path.endswith(".png"):
+            return web.Response(body=b"\x89PNG\r\n\x1a\n" + bytes(4000), content_type="image/png")
+        body = "/* stub chunk */" + "x" * 40000
+        return web.Response(text=body, content_type="application/javascript",
+                            headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
+    async def qr_placeholder(self, request):
+        """The small HTML page of app/qr-placeholder/[id]/route.ts"""
+        await self._delay("qr_placeholder")
+        qr_id = request.match_info["qr_id"]
+        return web.Response(text=f"<!DOCTYPE html><html><head><title>QR Code Placeholder</title></head><body>"
+                                 f"<div class=\"qr-id\">{qr_id}</div></body></html>", content_type="text/html")
+
+    @web.middleware
+    async def update_session(self, request, handler):
+        """Simulate middleware.ts on the paths its matcher includes: getUser(), refreshing expiring sessions first"""
+        if not self.middleware or not MIDDLEWARE_MATCHER.match(request.path):
+            return await handler(request)
+        start = time.perf_counter()
+        session = _cookie_session(request.cookies.get(SESSION_COOKIE))
+        refreshed = None
+        if session:
+            if session.get("expires_at", 0) - time.time() < TOKEN_REFRESH_MARGIN:
+                await self._delay("mw_refresh")
+                refreshed = _session_cookie(session.get("user", {}).get("email"))
+                # Like request.cookies.set() in updateSession: the route sees the refreshed session
+                headers = CIMultiDict(request.headers)
+                headers["Cookie"] = f"{SESSION_COOKIE}={refreshed}"
+                request = request.clone(headers=headers)
+            await self._delay("mw_get_user")
+        mw_ms = (time.perf_counter() - start) * 1000
+        response = await handler(request)
+        if refreshed:
+            response.set_cookie(SESSION_COOKIE, refreshed, path="/", httponly=True, max_age=SESSION_TTL)
+        response.headers.add("Server-Timing", f'mw;dur={mw_ms:.1f};desc="updateSession"')
+        return response
+
+    @web.middleware
+    async def first_hit(self, request, handler):
+        """Delay the first request of every route once, like Next.js initialising a route on first use"""
+        if self.first_hit_ms:
+            route = request.match_info.route.resource
+            key = route.canonical if route is not None else request.path
+            if key not in self._warm_routes:
+                self._warm_routes.add(key)
+                await asyncio.sleep(self.first_hit_ms * self.latency_scale / 1000)
+        return await handler(request)
+
+    @web.middleware
+    async def server_timing(self, request, handler):
+        """Report the handler time in Server-Timing like handleApiError does (lib/api-helpers.ts)"""
+        start = time.perf_counter()
+        response = await handler(request)
+        if request.path.startswith("/api/"):
+            response.headers.add("Server-Timing", f"app;dur={(time.perf_counter() - start) * 1000:.1f}")
+        return response
+
+    @web.middleware
+    async def compression(self, request, handler):
+        """Gzip bodies over the threshold when the client accepts it, like Next.js' compress option"""
+        response = await handler(request)
+        body = getattr(response, "body", None)
+        if self.compress and isinstance(body, bytes) and len(body) > COMPRESSION_THRESHOLD_BYTES \
+                and "gzip" in request.headers.get("Accept-Encoding", ""):
+            response.enable_compression(web.ContentCoding.gzip)
+        return response
+
+    def build_app(self):
+        app = web.Application(middlewares=[self.first_hit, self.compression, self.update_session, self.server_timing])
+        app.router.add_post("/api/login", self.login)
+        app.router.add_post("/api/register", self.register)
+        app.router.add_post("/__stub/seed", self.seed)
+        for path, route, build in [
+            ("/api/nodes", "nodes", self._nodes),
+            ("/api/item-types", "item_types", self._item_types),
+            ("/api/item-instances", "item_instances", self._item_instances),
+            ("/api/item-transits", "item_transits", self._item_transits),
+            ("/api/user", "users", self._users),
+            ("/api/reports", "reports", self._reports),
+            ("/api/recipes", "recipes", self._recipes),
+        ]:
+            app.router.add_get(path, self._list_handler(route, build))
+        app.router.add_post("/api/qr/create", self.qr_create)
+        app.router.add_post("/api/qr/scan/{qr_id}", self.qr_scan)
+        app.router.add_post("/api/item-transit/{transit_id}/complete", self.transit_complete)
+        app.router.add_get("/api/item-transit/{transit_id}", self.item_transit_detail)
+        app.router.add_post("/api/node", self.create_node)
+        app.router.add_post("/api/item-instance", self.create_item_instance)
+        app.router.add_post("/api/item-instance/cook", self.cook)
+        app.router.add_get("/api/item-instance/{item_instance_id}", self.item_instance_detail)
+        app.router.add_post("/api/recipes", self.create_recipe)
+        app.router.add_get("/api/recipes/{recipe_id}", self.recipe_detail)
+        app.router.add_put("/api/recipes/{recipe_id}/approve", self.recipe_approve)
+        app.router.add_get("/_next/static/{tail:.*}", self.static_asset)
+        app.router.add_get("/icon.png", self.static_asset)
+        app.router.add_get("/qr-placeholder/{qr_id}", self.qr_placeholder)
+        for path in STUB_PAGES:
+            app.router.add_get(path, self.page)
+        return app
+
+
+def print_ground_truth(profiles, latency_scale=1.0):
+    """Print the expected latency percentiles of every route (server side, before client overhead)"""
+    print(f"{'Route':<16} {'p50':<9} {'p90':<9} {'p95':<9} {'p99':<9} {'p99.9':<9} {'Errors %':<8}")
+    print("-" * 72)
+    for route, profile in profiles.items():
+        values = [ground_truth_percentile(profile, p) * latency_scale for p in (50, 90, 95, 99, 99.9)]
+        print(f"{route:<16} " + " ".join(f"{value:<9.1f}" for value in values) + f" {profile.error_rate * 100:<8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline stand-in for the app's API routes and pages")
+    parser.add_argument("--port", type=int, default=STUB_PORT)
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="Multiply every injected latency (0 disables latency injection)")
+    parser.add_argument("--error-rate", type=float, help="Override the error rate of every route")
+    parser.add_argument("--slow-rate", type=float, help="Override the slow-tail probability of every route")
+    parser.add_argument("--slow-ms", type=float, help="Override the slow-tail extra latency of every route")
+    parser.add_argument("--profiles", help="JSON file mapping route names to latency profile fields")
+    parser.add_argument("--seed", type=int, default=STUB_SEED)
+    parser.add_argument("--no-compression", action="store_true", help="Never gzip responses")
+    parser.add_argument("--first-hit-ms", type=float, default=0,
+                        help="Extra latency of the first request to each route (cold_start_test.py)")
+    parser.add_argument("--middleware", action="store_true",
+                        help="Simulate updateSession on the paths the middleware matcher includes")
+    parser.add_argument("--ground-truth", action="store_true", help="Print expected percentiles and exit")
+    args = parser.parse_args()
+
+    profiles = dict(ROUTE_PROFILES)
+    if args.profiles:
+        with open(args.profiles, encoding='utf-8') as f:
+            for route, fields in json.load(f).items():
+                profiles[route] = replace(profiles.get(route, LatencyProfile(100)), **fields)
+    overrides = {"error_rate": args.error_rate, "slow_rate": args.slow_rate, "slow_ms": args.slow_ms}
+    overrides = {field: value for field, value in overrides.items() if value is not None}
+    if overrides:
+        profiles = {route: replace(profile, **overrides) for route, profile in profiles.items()}
+
+    if args.ground_truth:
+        print_ground_truth(profiles, args.latency_scale)
+        return
+
+    server = StubServer(profiles=profiles, latency_scale=args.latency_scale, seed=args.seed,
+                        compress=not args.no_compression, first_hit_ms=args.first_hit_ms, middleware=args.middleware)
+    print(f"🧪 Stub server on http://localhost:{args.port} (latency scale {args.latency_scale})")
+    print(f"   Profiles: {json.dumps({route: asdict(p) for route, p in profiles.items()})}")
+    web.run_app(server.build_app(), port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,489 @@
+"""
+Traffic Trace Record and Replay
+Turns HAR files or access logs into a compact trace and replays it at original or scaled speed
+
+Synthetic endpoint lists issue requests in a fixed order at a steady rate. Real usage is bursty
+and ordered: a node admin creates a QR code and a courier scans it seconds later, a page load
+fires its API calls together. A trace keeps that shape.
+
+record: converts the sources into a trace (JSON Lines: a header, then one request per line)
+
+- HAR files, e.g. from Playwright (browser.new_context(record_har_path="session.har")) or the
+  browser dev tools. Each file is one session. Responses with content let created IDs be followed.
+- access logs in the common/combined format (nginx, Apache, most proxies). A session is one client
+  address and user agent. Logs carry neither bodies nor responses, so writes replay without a body
+  and created IDs cannot be followed.
+
+Static assets (/_next/, files with an extension) are skipped unless --include-static is given.
+A login request with the email of a ROLE_CREDENTIALS account is stored as that role, without the
+password. A session already logged in when the recording started gets the role of its auth cookie
+(or --role), and is logged in again before the replay starts. Recorded cookies are never replayed.
+
+    {"trace": 1, "sources": ["courier.har"], "requests": 42, "duration_ms": 61234.5,
+     "sessions": {"s1": {"role": "admin_node"}, "s2": {"role": null}}}
+    {"t": 0.0, "s": "s1", "m": "POST", "p": "/api/qr/create", "b": {...}, "st": 200,
+     "ids": {"data.qr_id": "3f2c..."}}
+    {"t": 8421.3, "s": "s2", "m": "POST", "p": "/api/qr/scan/3f2c...", "b": {...}, "st": 200,
+     "needs": ["3f2c..."]}
+
+t is the offset from the first request (ms), st the recorded status. ids are values a response
+created that later requests use (by their path in the JSON response), and needs lists the created
+values a request uses.
+
+replay: re-issues the trace against the server as an open model, each request at t / speed after
+the start, over one cookie jar per session:
+
+- created IDs are rewritten on the fly: when a producing request completes, its recorded IDs are
+  mapped to the ones the server returned now, and later paths and bodies use the new values
+- a request waits for the requests it depends on (the producers of its IDs, its session's login),
+  so a 10x replay never scans a QR code before it exists
+
+Latency is measured from the moment a request is sent. How late requests went out compared to
+their schedule (dependency waits, a saturated client) is reported as start lag: with a large lag
+the replay did not reach the requested speed.
+
+    python traffic_replay.py record courier.har admin.har -o traces/qr_flow.jsonl
+    python traffic_replay.py record --access-log access.log --role admin_node -o traces/prod.jsonl
+    python traffic_replay.py replay traces/prod.jsonl --speed 10
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from auth_sessions import ROLE_CREDENTIALS, session_role
+from http_timing import aiohttp_trace_config, finish_aiohttp_timing, phase_row
+from latency_histogram import LatencyHistogram
+from live_metrics import add_live_arguments, start_live_metrics
+from load_test import BASE_URL, REQUEST_TIMEOUT, LoadTester
+from scenario import lookup
+from server_timing import server_timing_row
+
+# Configuration
+TRACE_DIR = "traces"
+TRACE_VERSION = 1
+REPLAY_SPEED = 1.0  # 1 = original inter-arrival times, 10 = ten times as fast
+DEPENDENCY_TIMEOUT = 30  # Seconds a request waits for the request that creates its IDs
+LOGIN_PATH = "/api/login"
+STATIC_PATH = re.compile(r"^/_next/|\.[a-z0-9]{2,5}$", re.IGNORECASE)
+ID_SEGMENT = re.compile(r"^(?:[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|\d+)$", re.IGNORECASE)
+ID_VALUE = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.IGNORECASE)
+ACCESS_LOG_LINE = re.compile(
+    r'^(?P<client>\S+) \S+ \S+ \[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<path>\S+)[^"]*" (?P<status>\d{3}) \S+'
+    r'(?: "[^"]*" "(?P<agent>[^"]*)")?')
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+
+def request_name(method, path):
+    """Result name of a request: the route, with IDs and the query string taken out"""
+    segments = [":id" if ID_SEGMENT.match(segment) else segment for segment in urlsplit(path).path.split("/")]
+    return f"{method} {'/'.join(segments)}"
+
+
+def _created_ids(payload, prefix=""):
+    """(dotted path, value) of every UUID in a JSON response"""
+    if isinstance(payload, dict):
+        for key, value in payload.items():
+            yield from _created_ids(value, f"{prefix}{key}.")
+    elif isinstance(payload, str) and ID_VALUE.match(payload):
+        yield prefix.rstrip("."), payload
+
+
+def _rewrite(value, mapping):
+    """value with every recorded ID replaced by the ID it maps to in this replay"""
+    if isinstance(value, str):
+        for recorded, live in mapping.items():
+            if recorded in value:
+                value = value.replace(recorded, live)
+        return value
+    if isinstance(value, list):
+        return [_rewrite(item, mapping) for item in value]
+    if isinstance(value, dict):
+        return {key: _rewrite(item, mapping) for key, item in value.items()}
+    return value
+
+
+def _login_role(body):
+    """Role whose account a recorded login body signs in to, or None"""
+    if isinstance(body, dict):
+        for role, account in ROLE_CREDENTIALS.items():
+            if body.get("email") == account["email"]:
+                return role
+    return None
+
+
+# Recording
+
+def read_har(path, session_id, include_static=False):
+    """Requests of one HAR file as trace entries (absolute times) plus the session's role"""
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)["log"]["entries"]
+    origins = Counter(urlsplit(entry["request"]["url"]).netloc for entry in entries)
+    origin = origins.most_common(1)[0][0] if origins else None  # The app, not third-party hosts
+
+    requests, role = [], None
+    for entry in entries:
+        request, response = entry["request"], entry.get("response") or {}
+        url = urlsplit(request["url"])
+        path = url.path + (f"?{url.query}" if url.query else "")
+        if url.netloc != origin or (not include_static and STATIC_PATH.search(url.path)):
+            continue
+        if not requests and role is None:
+            role = session_role(request.get("cookies") or [])  # Logged in before the recording started
+
+        body, text = None, (request.get("postData") or {}).get("text")
+        if text:
+            try:
+                body = json.loads(text)
+            except ValueError:
+                body = text
+        content = response.get("content") or {}
+        response_text = content.get("text")
+        if response_text and content.get("encoding") == "base64":
+            response_text = base64.b64decode(response_text).decode("utf-8", "replace")
+        try:
+            payload = json.loads(response_text) if response_text else None
+        except ValueError:
+            payload = None
+
+        requests.append({
+            "time": datetime.fromisoformat(entry["startedDateTime"].replace("Z", "+00:00")).timestamp(),
+            "s": session_id, "m": request["method"], "p": path, "b": body, "st": response.get("status"),
+            "_created": dict(_created_ids(payload)) if request["method"] in WRITE_METHODS else {},
+        })
+    return requests, role
+
+
+def read_access_log(path, include_static=False):
+    """Requests of a common/combined access log as trace entries; sessions by client and user agent"""
+    requests, sessions = [], {}
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            match = ACCESS_LOG_LINE.match(line)
+            if not match or (not include_static and STATIC_PATH.search(urlsplit(match["path"]).path)):
+                continue
+            client = (match["client"], match["agent"])
+            session_id = sessions.setdefault(client, f"s{len(sessions) + 1}")
+            requests.append({
+                "time": datetime.strptime(match["time"], "%d/%b/%Y:%H:%M:%S %z").timestamp(),
+                "s": session_id, "m": match["method"], "p": match["path"], "b": None, "st": int(match["status"]),
+                "_created": {},
+            })
+
+    # The log has one-second resolution: spread each second's requests evenly over that second
+    per_second = Counter(request["time"] for request in requests)
+    seen = Counter()
+    for request in requests:
+        second = request["time"]
+        request["time"] = second + seen[second] / per_second[second]
+        seen[second] += 1
+    return requests, {session_id: None for session_id in sessions.values()}
+
+
+def build_trace(requests, roles, sources, default_role=None):
+    """Header and entries of a trace from recorded requests sorted into one timeline"""
+    requests = sorted(requests, key=lambda request: request["time"])
+    start = requests[0]["time"] if requests else 0
+    producers = {}  # created ID -> (producing entry, JSON path)
+    logged_in = set()
+    entries = []
+    for request in requests:
+        entry = {"t": round((request["time"] - start) * 1000, 1), "s": request["s"], "m": request["m"],
+                 "p": request["p"], "b": request["b"], "st": request["st"]}
+        if request["p"] == LOGIN_PATH and request["m"] == "POST":
+            logged_in.add(request["s"])
+            role = _login_role(request["b"])
+            if role:
+                entry["b"], entry["login"] = None, role  # Credentials come from ROLE_CREDENTIALS at replay
+
+        text = request["p"] + json.dumps(request["b"])
+        needs = [value for value in producers if value in text]
+        if needs:
+            entry["needs"] = needs
+            for value in needs:
+                producer, dotted = producers[value]
+                producer.setdefault("ids", {})[dotted] = value
+        for dotted, value in request["_created"].items():
+            producers.setdefault(value, (entry, dotted))
+        entries.append(entry)
+
+    sessions = {}
+    for entry in entries:
+        if entry["s"] not in sessions:
+            role = roles.get(entry["s"])
+            if role is None and entry["s"] not in logged_in:
+                role = default_role  # Sessions that sign in during the trace start logged out
+            sessions[entry["s"]] = {"role": role}
+    header = {
+        "trace": TRACE_VERSION,
+        "sources": sources,
+        "recorded": datetime.now().isoformat(),
+        "requests": len(entries),
+        "duration_ms": entries[-1]["t"] if entries else 0,
+        "sessions": sessions,
+    }
+    return header, entries
+
+
+def save_trace(path, header, entries):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(header) + "\n")
+        for entry in entries:
+            f.write(json.dumps({key: value for key, value in entry.items() if value is not None},
+                               separators=(",", ":")) + "\n")
+    return path
+
+
+def load_trace(path):
+    with open(path, encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        if header.get("trace") != TRACE_VERSION:
+            raise ValueError(f"{path} is not a version {TRACE_VERSION} trace")
+        entries = [json.loads(line) for line in f if line.strip()]
+    return header, entries
+
+
+# Replay
+
+class TraceReplayer(LoadTester):
+    def __init__(self, header, entries, base_url=BASE_URL, speed=REPLAY_SPEED):
+        super().__init__(base_url=base_url)
+        self.header = header
+        self.entries = entries
+        self.speed = speed
+        self.lag = LatencyHistogram()  # Actual minus scheduled start per request (ms)
+        self.ids = {}  # Recorded ID -> ID created by this replay
+        self.rewritten = 0  # Requests sent with at least one rewritten ID
+        self.mismatches = Counter()  # (name, recorded status, replayed status)
+        self.unresolved = Counter()  # Names of requests whose IDs were never created in this replay
+        self._created = {}  # Recorded ID -> Event set once its producer has completed
+        self._logins = {}  # Session -> Event set once its latest login request has completed
+
+    async def _open_trace_sessions(self, connector):
+        """One cookie jar per trace session, logged in as the session's role where it has one"""
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        sessions = {}
+        for session_id in self.header["sessions"]:
+            sessions[session_id] = aiohttp.ClientSession(
+                connector=connector, connector_owner=False, timeout=timeout,
+                cookie_jar=aiohttp.CookieJar(unsafe=True), trace_configs=[aiohttp_trace_config()])
+
+        async def login(session_id, role):
+            try:
+                async with sessions[session_id].post(f"{self.base_url}{LOGIN_PATH}", json=ROLE_CREDENTIALS[role]) as response:
+                    await response.read()
+                    return response.status in [200, 201]
+            except Exception:
+                return False
+
+        roles = {session_id: info.get("role") for session_id, info in self.header["sessions"].items() if info.get("role")}
+        logins = await asyncio.gather(*(login(session_id, role) for session_id, role in roles.items()))
+        print(f"  🔐 {len(sessions)} sessions, {sum(logins)}/{len(roles)} logged in before the replay "
+              f"({', '.join(f'{role} x{count}' for role, count in Counter(roles.values()).items()) or 'no roles'})")
+        return sessions
+
+    async def _send_entry(self, session, entry, scheduled_start, after_login=None, login_done=None):
+        """Wait for the entry's dependencies, rewrite its IDs, send it and record the sample"""
+        name = request_name(entry["m"], entry["p"])
+        if after_login is not None:
+            await after_login.wait()
+        for value in entry.get("needs", []):
+            try:
+                await asyncio.wait_for(self._created[value].wait(), DEPENDENCY_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
+        missing = [value for value in entry.get("needs", []) if value not in self.ids]
+        if missing:
+            self.unresolved[name] += 1
+        mapping = {value: self.ids[value] for value in entry.get("needs", []) if value in self.ids}
+        if mapping:
+            self.rewritten += 1
+        path = _rewrite(entry["p"], mapping)
+        body = ROLE_CREDENTIALS[entry["login"]] if entry.get("login") else _rewrite(entry.get("b"), mapping)
+
+        start_time = time.perf_counter()
+        self.lag.record(max(0.0, (start_time - scheduled_start) * 1000))
+        timing, payload = {}, None
+        try:
+            kwargs = {"json": body} if isinstance(body, (dict, list)) else {"data": body}
+            async with session.request(entry["m"], f"{self.base_url}{path}", trace_request_ctx=timing, **kwargs) as response:
+                raw = await response.read()
+            response_time_ms = (time.perf_counter() - start_time) * 1000
+            if entry.get("ids"):
+                try:
+                    payload = json.loads(raw)
+                except ValueError:
+                    payload = None
+
+            recorded = entry.get("st")
+            if response.status == recorded and response.status >= 400:
+                status = f"Expected {response.status}"  # Failed the same way when it was recorded
+            elif response.status < 400:
+                status = "OK"
+            elif response.status in [401, 403]:
+                status = f"Auth Issue ({response.status})"
+            else:
+                status = f"Error {response.status}"
+            if recorded and response.status != recorded:
+                self.mismatches[(name, recorded, response.status)] += 1
+            self._record({
+                "Type": "Replay",
+                "Name": name,
+                "Load Time (ms)": round(response_time_ms, 2),
+                "Size (KB)": round(len(raw) / 1024, 2),
+                "Status": status,
+                "Virtual User": entry["s"],
+                "Timestamp": datetime.now().isoformat(),
+                **phase_row(finish_aiohttp_timing(timing)),
+                **server_timing_row(response.headers),
+            })
+        except Exception as e:
+            self._record({
+                "Type": "Replay",
+                "Name": name,
+                "Load Time (ms)": -1,
+                "Size (KB)": -1,
+                "Status": f"Error: {type(e).__name__}",
+                "Virtual User": entry["s"],
+                "Timestamp": datetime.now().isoformat(),
+            })
+        finally:
+            for dotted, recorded_id in (entry.get("ids") or {}).items():
+                live = lookup(payload, dotted) if payload else None
+                if live:
+                    self.ids[recorded_id] = str(live)
+                self._created[recorded_id].set()  # Dependants go ahead even if the ID was not created
+            if login_done is not None:
+                login_done.set()
+
+    async def replay(self):
+        """Send every entry at its (scaled) offset from the start; returns once all have completed"""
+        self.mode = "replay"
+        recorded_s = self.header["duration_ms"] / 1000
+        print(f"\n🎞️  Replaying {len(self.entries)} requests from {len(self.header['sessions'])} sessions "
+              f"({recorded_s:.1f}s recorded) at {self.speed:g}x: about {recorded_s / self.speed:.1f}s")
+        self._created = {value: asyncio.Event() for entry in self.entries for value in (entry.get("ids") or {}).values()}
+        connector = self._new_connector()
+        sessions = await self._open_trace_sessions(connector)
+
+        in_flight = set()
+        start = time.perf_counter()
+        try:
+            for entry in self.entries:
+                scheduled = start + entry["t"] / 1000 / self.speed
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                after_login, login_done = self._logins.get(entry["s"]), None
+                if entry["m"] == "POST" and entry["p"] == LOGIN_PATH:
+                    login_done = self._logins[entry["s"]] = asyncio.Event()  # Later requests of the session wait for it
+                task = asyncio.create_task(self._send_entry(sessions[entry["s"]], entry, scheduled, after_login, login_done))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+            if in_flight:
+                await asyncio.gather(*in_flight)
+        finally:
+            self.duration = time.perf_counter() - start
+            await asyncio.gather(*(session.close() for session in sessions.values()))
+            await connector.close()
+
+    def print_summary(self):
+        """Load summary per route, then how faithfully the trace was replayed"""
+        super().print_summary()
+        if not self.lag.count:
+            return
+        recorded_s = self.header["duration_ms"] / 1000
+        print(f"\n🎞️  REPLAY FIDELITY ({self.speed:g}x):")
+        print(f"  Recorded {recorded_s:.1f}s, replayed in {self.duration:.1f}s "
+              f"(target {recorded_s / self.speed:.1f}s)")
+        print(f"  Start lag vs schedule: p50 {self.lag.percentile(50):.1f}ms, p95 {self.lag.percentile(95):.1f}ms, "
+              f"max {self.lag.max:.1f}ms")
+        print(f"  Created IDs followed: {len(self.ids)}/{len(self._created)}, {self.rewritten} requests rewritten")
+        for name, count in self.unresolved.most_common():
+            print(f"  ⚠️  {name}: {count} requests sent with a recorded ID this replay never created")
+        if self.mismatches:
+            print("\n  Status differs from the recording:")
+            for (name, recorded, replayed), count in self.mismatches.most_common(10):
+                print(f"    {name[:50]:<50} {recorded} -> {replayed}  x{count}")
+
+
+def record_main(args):
+    requests, roles = [], {}
+    for index, path in enumerate(args.har, start=1):
+        har_requests, role = read_har(path, f"s{index}", args.include_static)
+        requests += har_requests
+        roles[f"s{index}"] = role
+        print(f"📼 {path}: {len(har_requests)} requests{f', logged in as {role}' if role else ''}")
+    if args.access_log:
+        log_requests, log_roles = read_access_log(args.access_log, args.include_static)
+        offset = len(roles)
+        for request in log_requests:
+            request["s"] = f"s{int(request['s'][1:]) + offset}"
+        requests += log_requests
+        roles.update({f"s{int(session_id[1:]) + offset}": role for session_id, role in log_roles.items()})
+        print(f"📼 {args.access_log}: {len(log_requests)} requests from {len(log_roles)} clients")
+    if not requests:
+        print("❌ No requests recorded")
+        return 1
+
+    header, entries = build_trace(requests, roles, args.har + ([args.access_log] if args.access_log else []), args.role)
+    output = args.output or os.path.join(TRACE_DIR, f"trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl")
+    save_trace(output, header, entries)
+    followed = sum(len(entry.get("ids", {})) for entry in entries)
+    print(f"✅ {len(entries)} requests, {len(header['sessions'])} sessions, {header['duration_ms'] / 1000:.1f}s, "
+          f"{followed} created IDs followed -> {output}")
+    return 0
+
+
+async def replay_main(args):
+    header, entries = load_trace(args.trace)
+    replayer = TraceReplayer(header, entries, args.base_url, args.speed)
+    replayer.live = start_live_metrics(args, tool="traffic_replay", mode=f"{args.speed:g}x")
+    try:
+        await replayer.replay()
+    finally:
+        if replayer.live:
+            replayer.live.stop()
+    replayer.save_results(filename=f"replay_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+    replayer.print_summary()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record HAR files or access logs as traces and replay them")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="Convert HAR files and/or an access log into a trace")
+    record.add_argument("har", nargs="*", default=[], help="HAR files, one session each")
+    record.add_argument("--access-log", help="Access log in the common or combined format")
+    record.add_argument("--role", choices=sorted(ROLE_CREDENTIALS),
+                        help="Role of sessions that neither log in nor carry a recognisable auth cookie")
+    record.add_argument("--include-static", action="store_true", help="Keep /_next/ and other static asset requests")
+    record.add_argument("-o", "--output", help=f"Trace file (default: {TRACE_DIR}/trace_<timestamp>.jsonl)")
+
+    replay = commands.add_parser("replay", help="Replay a trace against the server")
+    replay.add_argument("trace")
+    replay.add_argument("--speed", type=float, default=REPLAY_SPEED,
+                        help="Inter-arrival time divisor: 1 = as recorded, 2 = twice as fast, 10 = ten times")
+    replay.add_argument("--base-url", default=BASE_URL)
+    add_live_arguments(replay)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        return record_main(args)
+    return asyncio.run(replay_main(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())